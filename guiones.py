@@ -1,11 +1,38 @@
 import digi3d
 import digi3d.relations
-import random
+import collections
+import colorsys
+import datetime
+import functools
+import hashlib
+import heapq
+import inspect
+import itertools
+import math
+import mmap
+import numbers
+import operator
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import types
+import weakref
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    # Sin numpy los controles de calidad recorren los vértices uno a uno
+    np = None
 
 # Utilidades --------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=4096)
 def texto_a_color(texto):
-	'Convierte un texto a color en formato hexadecimal de HTML'
+	'Convierte un texto a color en formato hexadecimal de HTML. Se memoriza porque las reglas de representación convierten los mismos textos al dibujar cada geometría'
 	palabras = texto.split()
 	if len(palabras) == 1:
 		if palabras[0] == '#':
@@ -26,6 +53,60 @@ def texto_a_color(texto):
 
 	return '#ff0000ff'
 
+@functools.lru_cache(maxsize=4096)
+def texto_a_real(texto):
+	'Convierte un parámetro de una regla de representación a número real. Se memoriza para no volver a convertirlo al dibujar cada geometría'
+	return float(texto)
+
+@functools.lru_cache(maxsize=4096)
+def texto_a_entero(texto):
+	'Convierte un parámetro de una regla de representación a número entero. Se memoriza para no volver a convertirlo al dibujar cada geometría'
+	return int(texto)
+
+# Niveles de saturación y brillo que alterna color_segun_valor para distinguir valores con tonos próximos
+saturaciones_paleta = (0.85, 0.65, 0.5)
+brillos_paleta = (0.95, 0.8, 0.65)
+
+# Dirección de memoria del texto por defecto de un objeto (por ejemplo <Objeto object at 0x7f51e0175440>), que cambia en cada sesión
+direccion_memoria = re.compile(r' at 0x[0-9A-Fa-f]+')
+
+def texto_canonico(valor):
+	''' Devuelve un texto que representa al valor de un atributo y que no depende de la sesión: str() para textos, números y fechas, texto vacío para None
+		y los textos de los elementos ordenados para listas, tuplas y conjuntos. Con cualquier otro tipo de valor se utiliza str(), salvo que incluya
+		una dirección de memoria (por ejemplo el de los objetos de Digi3D.NET sin texto propio), en cuyo caso se utiliza el nombre del tipo.
+	'''
+	if valor is None:
+		return ''
+
+	if isinstance(valor, (str, numbers.Number, datetime.date, datetime.time)):
+		return str(valor)
+
+	if isinstance(valor, (list, tuple, set, frozenset)):
+		return repr(tuple(sorted(texto_canonico(elemento) for elemento in valor)))
+
+	texto = str(valor)
+	if direccion_memoria.search(texto):
+		return '<{}>'.format(type(valor).__name__)
+
+	return texto
+
+def color_segun_valor(valor):
+	''' Devuelve un color en formato hexadecimal de HTML derivado del valor, el mismo en todas las sesiones y equipos.
+		El tono es el CRC32 del texto canónico del valor (ver texto_canonico) multiplicado por la razón áurea (módulo 1), de manera que valores parecidos
+		(por ejemplo identificadores consecutivos) quedan repartidos por todo el círculo cromático. No se memoriza nada, por muchos valores distintos que haya.
+	'''
+	codigo = zlib.crc32(texto_canonico(valor).encode('utf-8'))
+	tono = (codigo * 0.6180339887498949) % 1.0
+	saturacion = saturaciones_paleta[(codigo >> 8) % len(saturaciones_paleta)]
+	brillo = brillos_paleta[(codigo >> 16) % len(brillos_paleta)]
+	r, g, b = colorsys.hsv_to_rgb(tono, saturacion, brillo)
+	return "#" + f"{round(r * 255):02x}" + f"{round(g * 255):02x}" + f"{round(b * 255):02x}" + "ff"
+
+@functools.lru_cache(maxsize=1024)
+def separa_atributos_y_valores(atributos_y_valores):
+	'Separa el texto atributo1 valor1 atributo2 valor2 ... atributoN valorN en una tupla con sus palabras. Se memoriza para no volver a separarlo al dibujar cada geometría'
+	return tuple(atributos_y_valores.split(' '))
+
 def localiza_codigo_en_geometria(geometria, codigo_buscado):
 	'Localiza un código por su nombre en una geometría y lo devuelve o devuelve None si no se localiza'
 	for codigoGeometria in geometria.codes:
@@ -70,6 +151,7 @@ def es_area(g):
 
     return False
 
+@functools.lru_cache(maxsize=65536)
 def compara_codigos_con_comodines(codigo_a, codigo_b):
     ''' Compara dos códigos utilizando comodines.
         El comodín * indica que el resto de la cadena es válido.
@@ -77,7 +159,44 @@ def compara_codigos_con_comodines(codigo_a, codigo_b):
 
         Ej: 12?45 devuelve verdadero para 12a45, 12b45, 12045, 12945, etc.
             12* devuelve verdadero para cualquier código que comience con 12, como por ejemplo 12abcdefg 
+
+        Los patrones se compilan una sola vez con compila_patron_codigo y el resultado de cada comparación se memoriza.
+    '''
+    if not tiene_comodines(codigo_a):
+        return bool(compila_patron_codigo(codigo_b)(codigo_a))
+
+    if not tiene_comodines(codigo_b):
+        return bool(compila_patron_codigo(codigo_a)(codigo_b))
+
+    return compara_codigos_con_comodines_caracter_a_caracter(codigo_a, codigo_b)
+
+def tiene_comodines(codigo):
+    'Indica si el código contiene alguno de los comodines * o ?'
+    return '*' in codigo or '?' in codigo
+
+@functools.lru_cache(maxsize=4096)
+def compila_patron_codigo(patron):
+    ''' Compila un patrón con comodines en una función que recibe un nombre de código sin comodines e indica si coincide con el patrón.
+        Se obtiene el mismo resultado que con compara_codigos_con_comodines: el patrón se compara hasta el primer *, a partir del cual
+        el código tiene que tener al menos un carácter más. Sin *, el código tiene que tener la misma longitud que el patrón.
     '''
+    posicion_asterisco = patron.find('*')
+    fijo = patron if posicion_asterisco < 0 else patron[:posicion_asterisco]
+    longitud = len(fijo)
+
+    if '?' not in fijo:
+        if posicion_asterisco < 0:
+            return fijo.__eq__
+        return lambda codigo: len(codigo) > longitud and codigo.startswith(fijo)
+
+    expresion = ''.join('.' if caracter == '?' else re.escape(caracter) for caracter in fijo)
+    if posicion_asterisco >= 0:
+        expresion += '.+'
+
+    return re.compile(expresion, re.DOTALL).fullmatch
+
+def compara_codigos_con_comodines_caracter_a_caracter(codigo_a, codigo_b):
+    'Compara carácter a carácter dos códigos que pueden contener comodines cualquiera de los dos'
     tamanoCodigoA = len(codigo_a)
     tamanoCodigoB = len(codigo_b)
     for i in range(min(tamanoCodigoA, tamanoCodigoB)):
@@ -113,33 +232,57 @@ def tiene_el_codigo_con_comodines(g, nombre_código):
             return True
     return False
 
+def codigo_tiene_etiqueta(nombre_codigo, etiqueta, tabla_codigos):
+    'Indica si el código tiene asignada la etiqueta en la tabla de códigos pasada por parámetros'
+    return nombre_codigo in tabla_codigos and tabla_codigos[nombre_codigo].contains_tag(etiqueta)
+
 def tiene_algun_codigo_de_etiqueta(g, etiqueta):
     'Analiza si la geometría tiene algún código de entre los códigos (de la tabla de códigos activa) que tienen asignada una determinada etiqueta'
+    estado = estado_vista()
 
-    tabla_codigos = digi3d.current_view().digi_tab
-
-    for codigo in tabla_codigos:
-        if not tabla_codigos[codigo].contains_tag(etiqueta):
-            continue
-    
-        if tiene_el_codigo(g, codigo):
+    for codigo in g.codes:
+        if estado.codigo_tiene_etiqueta(codigo.name, etiqueta):
             return True
 
     return False
 
+@functools.lru_cache(maxsize=1024)
+def compila_codigo_o_etiqueta(nombre_codigo_o_etiqueta):
+    ''' Devuelve una función que recibe el nombre de un código e indica si coincide con alguno de los códigos o etiquetas de nombre_codigo_o_etiqueta
+        (separados por espacios). Se memoriza para cada nombre de código la comparación con los patrones, pero no la consulta de las etiquetas,
+        que se resuelven con los índices de la ventana de dibujo (ver EstadoVista.codigo_tiene_etiqueta).
+    '''
+    patrones = nombre_codigo_o_etiqueta.split()
+    etiquetas = [codigo[1:] for codigo in patrones if codigo[0] == '#']
+
+    # Las etiquetas también se comparan como códigos, igual que hacía la versión que comparaba patrón a patrón
+    conjunto = compila_conjunto_patrones(patrones)
+    resultados = {}
+
+    def coincide(nombre_codigo):
+        resultado = resultados.get(nombre_codigo)
+        if resultado is None:
+            resultado = resultados[nombre_codigo] = conjunto.coincide(nombre_codigo)
+
+        if resultado or not etiquetas:
+            return resultado
+
+        estado = estado_vista()
+        return any(estado.codigo_tiene_etiqueta(nombre_codigo, etiqueta) for etiqueta in etiquetas)
+
+    return coincide
+
 def tiene_el_codigo_o_etiqueta(g, nombre_codigo_o_etiqueta):
     ''' Indica si la entidad tiene el código pasado por parámetro.
         Si el código pasado es una etiqueta, se devuelve verdadero si la geometría tiene un código de entre los que tienen asignada dicha etiqueta en la tabla de códigos activa.
         Si el código pasado no es una etiqueta, se busca con comodines, de manera que se puede poner por ejemplo 0204*
     '''
-    for codigo in nombre_codigo_o_etiqueta.split():
-        if codigo[0] == '#':
-            if tiene_algun_codigo_de_etiqueta(g, codigo[1:]):
-                return True
+    coincide = compila_codigo_o_etiqueta(nombre_codigo_o_etiqueta)
 
-        if tiene_el_codigo_con_comodines(g, codigo):
+    for codigo in g.codes:
+        if coincide(codigo.name):
             return True
-        
+
     return False
 
 def tiene_algun_codigo(g, códigos):
@@ -157,41 +300,134 @@ def tiene_algun_codigo_con_comodines(g, códigos_con_comodines):
     '''Indica si la entidad tiene alguno de los códigos pasados por parámetro.
     Argumentos:
         entidad: Entidad sobre la que realizar la consulta.
-        códigos: conjunto de códigos.
+        códigos: conjunto de códigos (admiten comodines), cadena con los códigos separados por espacios o un ConjuntoPatronesCodigo.
     Observaciones:
         Esta función devuelve verdadero si se encuentra al menos un código de los pasados por parámetros
         de entre los códigos que tiene la entidad.
     '''
+    conjunto = compila_conjunto_patrones(códigos_con_comodines)
+
     for codigo in g.codes:
-        for codigoComparar in códigos_con_comodines:
-            if compara_codigos_con_comodines(codigo, codigoComparar):
-                return True
+        if conjunto.coincide(codigo.name):
+            return True
 
     return False
 
+class NodoPatrones:
+    'Nodo del árbol de prefijos de ConjuntoPatronesCodigo'
+    __slots__ = ('hijos', 'fin', 'asterisco')
+
+    def __init__(self):
+        self.hijos = {}
+        self.fin = False
+        self.asterisco = False
+
+class ConjuntoPatronesCodigo:
+    ''' Conjunto de patrones con comodines compilado en un árbol de prefijos, de manera que cada código se compara con todos los patrones en una sola pasada.
+        El resultado es el mismo que comparar el código con cada patrón con compara_codigos_con_comodines y se memoriza para cada código.
+    '''
+    maximo_resultados = 4096
+
+    def __init__(self, patrones):
+        self.patrones = tuple(patrones)
+        self.raiz = NodoPatrones()
+        self.resultados = {}
+
+        for patron in self.patrones:
+            nodo = self.raiz
+            for caracter in patron:
+                if caracter == '*':
+                    nodo.asterisco = True
+                    break
+                nodo = nodo.hijos.setdefault(caracter, NodoPatrones())
+            else:
+                nodo.fin = True
+
+    def coincide(self, codigo):
+        'Indica si el código coincide con alguno de los patrones del conjunto'
+        resultado = self.resultados.get(codigo)
+        if resultado is not None:
+            return resultado
+
+        if tiene_comodines(codigo):
+            resultado = any(compara_codigos_con_comodines(codigo, patron) for patron in self.patrones)
+        else:
+            resultado = self.recorre(codigo)
+
+        if len(self.resultados) >= self.maximo_resultados:
+            self.resultados.clear()
+        self.resultados[codigo] = resultado
+
+        return resultado
+
+    def recorre(self, codigo):
+        'Recorre el árbol de prefijos con un código sin comodines'
+        activos = [self.raiz]
+
+        for caracter in codigo:
+            siguientes = []
+            for nodo in activos:
+                if nodo.asterisco:
+                    # Tras un * basta con que quede al menos un carácter en el código
+                    return True
+
+                hijo = nodo.hijos.get(caracter)
+                if hijo is not None:
+                    siguientes.append(hijo)
+
+                hijo = nodo.hijos.get('?')
+                if hijo is not None:
+                    siguientes.append(hijo)
+
+            if not siguientes:
+                return False
+            activos = siguientes
+
+        return any(nodo.fin for nodo in activos)
+
+def compila_conjunto_patrones(patrones):
+    'Devuelve el ConjuntoPatronesCodigo de los patrones pasados por parámetro (lista, conjunto o cadena separada por espacios). Los conjuntos compilados se reutilizan entre llamadas'
+    if isinstance(patrones, ConjuntoPatronesCodigo):
+        return patrones
+
+    if isinstance(patrones, str):
+        patrones = patrones.split()
+
+    return compila_conjunto_patrones_ordenados(tuple(sorted(set(patrones))))
+
+@functools.lru_cache(maxsize=1024)
+def compila_conjunto_patrones_ordenados(patrones):
+    'Compila una tupla ordenada y sin repeticiones de patrones'
+    return ConjuntoPatronesCodigo(patrones)
+
+@functools.lru_cache(maxsize=4096)
+def convierte_texto(tipo, texto):
+	'Convierte el texto al tipo indicado. Se memoriza porque el texto es un parámetro que se repite en todas las llamadas a la regla o control'
+	return tipo(texto)
+
 def compara_valor_menor_texto(valor, texto):
 	'Convierte el argumento texto al tipo del argumento valor y devuelve verdadero si el valor es menor que el texto'
-	return valor < type(valor)(texto)
+	return valor < convierte_texto(type(valor), texto)
 
 def compara_valor_menor_igual_texto(valor, texto):
 	'Convierte el argumento texto al tipo del argumento valor y devuelve verdadero si el valor es menor o igual que el texto'
-	return valor <= type(valor)(texto)
+	return valor <= convierte_texto(type(valor), texto)
 
 def compara_valor_igual_texto(valor, texto):
 	'Convierte el argumento texto al tipo del argumento valor y devuelve verdadero si son iguales'
-	return valor == type(valor)(texto)
+	return valor == convierte_texto(type(valor), texto)
 
 def compara_valor_mayor_igual_texto(valor, texto):
 	'Convierte el argumento texto al tipo del argumento valor y devuelve verdadero si el valor es mayor o igual que el texto'
-	return valor >= type(valor)(texto)
+	return valor >= convierte_texto(type(valor), texto)
 
 def compara_valor_mayor_texto(valor, texto):
 	'Convierte el argumento texto al tipo del argumento valor y devuelve verdadero si el valor es mayor que el texto'
-	return valor > type(valor)(texto)
+	return valor > convierte_texto(type(valor), texto)
 
 def compara_valor_distinto_texto(valor, texto):
 	'Convierte el argumento texto al tipo del argumento valor y devuelve verdadero si son distintos'
-	return valor != type(valor)(texto)
+	return valor != convierte_texto(type(valor), texto)
 
 # Utilidades que actúan con secuencias de geometrías  --------------------------------------------------------------------------
 
@@ -223,7 +459,11 @@ def que_tengan_el_codigo_con_comodines(geometrías, nombre_codigo_con_comodines)
         geometrías: Geometrías a analizar.
         código: Código a localizar
     '''
-    return filter(lambda geometría : tiene_el_codigo_con_comodines(geometría, nombre_codigo_con_comodines), geometrías)
+    if nombre_codigo_con_comodines[:1] == '#' or ' ' in nombre_codigo_con_comodines:
+        return filter(lambda geometría : tiene_el_codigo_con_comodines(geometría, nombre_codigo_con_comodines), geometrías)
+
+    # Sin espacios ni etiquetas, comparar con comodines equivale a la función compilada de compila_codigo_o_etiqueta, que memoriza el resultado por código
+    return que_tengan_el_codigo_o_etiqueta(geometrías, nombre_codigo_con_comodines)
 
 def que_tengan_el_codigo_o_etiqueta(geometrías, nombre_codigo_o_etiqueta):
     '''Devuelve el subconjunto de las geometrías pasadas por parámetro que tienen el código indicado.
@@ -241,6 +481,23 @@ def que_tengan_algun_codigo(geometrías, nombres_codigos):
     '''
     return filter(lambda geometría : tiene_algun_codigo(geometría, nombres_codigos), geometrías)
 
+def geometrias_con_codigo_o_etiqueta(nombre_codigo_o_etiqueta, vista=None):
+    '''Devuelve, en el orden del archivo de dibujo, las geometrías no eliminadas que tienen el código o etiqueta indicado.
+    A diferencia de que_tengan_el_codigo_o_etiqueta, no recorre todo el archivo de dibujo, sino que consulta el índice de códigos de la ventana de dibujo.
+    Argumentos:
+        nombre_codigo_o_etiqueta: Códigos (admiten comodines) o etiquetas precedidas de # separados por espacios.
+        vista: Ventana de dibujo. Si no se indica se utiliza la ventana activa.
+    '''
+    return no_eliminadas(estado_vista(vista).geometrias_con_codigo_o_etiqueta(nombre_codigo_o_etiqueta))
+
+def geometrias_con_algun_codigo(nombres_codigos, vista=None):
+    '''Devuelve, en el orden del archivo de dibujo, las geometrías no eliminadas que tienen alguno de los códigos indicados consultando el índice de códigos.
+    Argumentos:
+        nombres_codigos: conjunto de nombres de código (sin comodines).
+        vista: Ventana de dibujo. Si no se indica se utiliza la ventana activa.
+    '''
+    return no_eliminadas(estado_vista(vista).geometrias_con_codigos(nombres_codigos))
+
 def que_tengan_algun_codigo_de_etiqueta(geometrías, etiqueta):
     '''Devuelve el subconjunto de las geometrías pasadas por parámetro que tienen el código indicado.
     Argumentos:
@@ -250,12 +507,16 @@ def que_tengan_algun_codigo_de_etiqueta(geometrías, etiqueta):
     return filter(lambda geometría : tiene_algun_codigo_de_etiqueta(geometría, etiqueta), geometrías)
 
 def alguna_geometria(geometría_analizando, callback_incluir_geometria, callback_condicion):
-    'Itera por todas las geometrías del archivo de dibujo y devuelve verdadero si se localiza una con la que devuelvan True tanto la función callback_incluir_geometria como la función callback_concicion'
-    for g in no_eliminadas(digi3d.current_view()):
+    ''' Itera por las geometrías del archivo de dibujo y devuelve verdadero si se localiza una con la que devuelvan True tanto la función callback_incluir_geometria como la función callback_concicion.
+        Solo se analizan las geometrías cuya caja envolvente toca la de la geometría que se está analizando, de manera que callback_condicion
+        tiene que ser una relación que exija contacto entre las dos geometrías (adyacente, dentro, cruza, no disjunta, etc).
+        Las geometrías se analizan de la más cercana a la más lejana.
+    '''
+    for g in geometrias_cercanas_a(geometría_analizando):
         # No contamos la geometría que se está analizando
         if g == geometría_analizando:
-            pass
-        
+            continue
+
         if not callback_incluir_geometria(g):
             continue
 
@@ -286,78 +547,1275 @@ def cuyas_maximas_minimas_solapen_con(geometrías, geometria):
     '''
     return filter(lambda g : g.maxmin_overlaps_2d(geometria), geometrías)
 
+# Índices del archivo de dibujo  --------------------------------------------------------------------------
+
+# Margen con el que se amplían las cajas envolventes al consultar el índice espacial, para no perder geometrías que se tocan dentro de la tolerancia de Digi3D.NET
+tolerancia_cajas = 0.001
+
+def caja_2d(g):
+    'Devuelve la caja envolvente 2D de la geometría como una tupla (x mínima, y mínima, x máxima, y máxima)'
+    minimo = g.min
+    maximo = g.max
+    return (minimo[0], minimo[1], maximo[0], maximo[1])
+
+def amplia_caja(caja, margen):
+    'Devuelve la caja envolvente ampliada en todas las direcciones con el margen pasado por parámetros'
+    return (caja[0] - margen, caja[1] - margen, caja[2] + margen, caja[3] + margen)
+
+def cajas_se_tocan(a, b):
+    'Devuelve verdadero si las dos cajas envolventes se solapan o se tocan en el borde'
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+def distancia_entre_cajas(a, b):
+    'Devuelve la distancia 2D entre dos cajas envolventes (0 si se solapan o se tocan)'
+    dx = max(a[0] - b[2], b[0] - a[2], 0.0)
+    dy = max(a[1] - b[3], b[1] - a[3], 0.0)
+    return math.hypot(dx, dy)
+
+def numero_geometrias_vista(vista):
+    'Devuelve el número de geometrías (eliminadas incluidas) que tiene la ventana de dibujo'
+    try:
+        return len(vista)
+    except TypeError:
+        return sum(1 for _ in vista)
+
+class IndiceEspacial:
+    ''' Rejilla regular sobre las cajas envolventes 2D de las geometrías.
+        Cada geometría se registra en todas las celdas que toca su caja envolvente. Las geometrías que ocuparían demasiadas celdas
+        (curvas de nivel o límites muy largos) se guardan aparte y se comparan siempre.
+    '''
+    maximo_celdas_por_geometria = 64
+
+    def __init__(self, tamano_celda):
+        self.tamano_celda = tamano_celda
+        self.celdas = {}
+        self.grandes = []
+        self.cajas = {}
+        # Rango de celdas ocupadas (columna mínima, fila mínima, columna máxima, fila máxima)
+        self.extension = None
+
+    @staticmethod
+    def calcula_tamano_celda(cajas):
+        'Calcula un tamaño de celda adecuado: la mediana del tamaño de las cajas, sin bajar del que reparte una geometría por celda'
+        if not cajas:
+            return 1.0
+
+        dimensiones = sorted(max(caja[2] - caja[0], caja[3] - caja[1]) for caja in cajas)
+        mediana = dimensiones[len(dimensiones) // 2]
+
+        ancho = max(caja[2] for caja in cajas) - min(caja[0] for caja in cajas)
+        alto = max(caja[3] for caja in cajas) - min(caja[1] for caja in cajas)
+        reparto = math.sqrt(ancho * alto / len(cajas))
+
+        tamano = max(mediana, reparto)
+        return tamano if tamano > 0 else 1.0
+
+    def rango_celdas(self, caja):
+        'Devuelve los índices de celda (columna mínima, fila mínima, columna máxima, fila máxima) que cubre la caja'
+        t = self.tamano_celda
+        return (math.floor(caja[0] / t), math.floor(caja[1] / t), math.floor(caja[2] / t), math.floor(caja[3] / t))
+
+    def anade(self, g, caja=None):
+        'Registra la geometría en el índice'
+        if caja is None:
+            caja = caja_2d(g)
+        self.cajas[g] = caja
+
+        i0, j0, i1, j1 = self.rango_celdas(caja)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > self.maximo_celdas_por_geometria:
+            self.grandes.append(g)
+            return
+
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                self.celdas.setdefault((i, j), []).append(g)
+
+        if self.extension is None:
+            self.extension = (i0, j0, i1, j1)
+        else:
+            e = self.extension
+            self.extension = (min(e[0], i0), min(e[1], j0), max(e[2], i1), max(e[3], j1))
+
+    def consulta(self, caja):
+        'Devuelve (sin repetir) las geometrías registradas cuya caja envolvente toca la caja pasada por parámetros'
+        vistas = set()
+        cajas = self.cajas
+
+        for g in self.grandes:
+            if cajas_se_tocan(cajas[g], caja):
+                yield g
+
+        i0, j0, i1, j1 = self.rango_celdas(caja)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self.celdas):
+            # La caja consultada cubre más celdas de las que hay ocupadas: es más rápido recorrer las ocupadas
+            celdas = (geometrias for (i, j), geometrias in self.celdas.items() if i0 <= i <= i1 and j0 <= j <= j1)
+        else:
+            celdas = (self.celdas.get((i, j), ()) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1))
+
+        for geometrias in celdas:
+            for g in geometrias:
+                if g in vistas:
+                    continue
+                vistas.add(g)
+                if cajas_se_tocan(cajas[g], caja):
+                    yield g
+
+    def celdas_anillo(self, anillo, rango, limites):
+        ''' Devuelve las listas de geometrías de las celdas ocupadas del anillo que está a anillo celdas del rango de celdas pasado por parámetros (el propio rango si anillo es 0),
+            sin salirse del rango de celdas límites.
+        '''
+        a0, b0, a1, b1 = rango[0] - anillo, rango[1] - anillo, rango[2] + anillo, rango[3] + anillo
+        l0, l1, l2, l3 = limites
+        celdas = self.celdas
+
+        if anillo == 0:
+            i0, j0, i1, j1 = max(a0, l0), max(b0, l1), min(a1, l2), min(b1, l3)
+            if (i1 - i0 + 1) * (j1 - j0 + 1) > len(celdas):
+                return [geometrias for (i, j), geometrias in celdas.items() if i0 <= i <= i1 and j0 <= j <= j1]
+            return [celdas[(i, j)] for i in range(i0, i1 + 1) for j in range(j0, j1 + 1) if (i, j) in celdas]
+
+        resultado = []
+        columnas = range(max(a0, l0), min(a1, l2) + 1)
+        for j in (b0, b1):
+            if l1 <= j <= l3:
+                resultado.extend(celdas[(i, j)] for i in columnas if (i, j) in celdas)
+
+        filas = range(max(b0 + 1, l1), min(b1 - 1, l3) + 1)
+        for i in (a0, a1):
+            if l0 <= i <= l2:
+                resultado.extend(celdas[(i, j)] for j in filas if (i, j) in celdas)
+
+        return resultado
+
+    def consulta_por_cercania(self, caja, caja_busqueda=None):
+        ''' Devuelve (sin repetir) las geometrías registradas ordenadas de menor a mayor distancia entre su caja envolvente y la caja pasada por parámetros.
+            Si se indica caja_busqueda, solo se devuelven las geometrías cuya caja envolvente toca esa caja.
+            Las celdas se exploran por anillos alrededor de la caja, de manera que si se deja de consumir el iterador no se visitan las celdas lejanas.
+        '''
+        cajas = self.cajas
+        pendientes = []
+        vistas = set()
+        contador = itertools.count()
+
+        def registra(g):
+            if g in vistas:
+                return
+            vistas.add(g)
+
+            caja_geometria = cajas[g]
+            if caja_busqueda is None or cajas_se_tocan(caja_geometria, caja_busqueda):
+                heapq.heappush(pendientes, (distancia_entre_cajas(caja, caja_geometria), next(contador), g))
+
+        for g in self.grandes:
+            registra(g)
+
+        limites = self.extension
+        if limites is not None and caja_busqueda is not None:
+            b = self.rango_celdas(caja_busqueda)
+            limites = (max(limites[0], b[0]), max(limites[1], b[1]), min(limites[2], b[2]), min(limites[3], b[3]))
+
+        if limites is not None and limites[0] <= limites[2] and limites[1] <= limites[3]:
+            rango = self.rango_celdas(caja)
+
+            # Los anillos anteriores a este no tienen ninguna celda dentro de los límites
+            anillo = max(0, limites[0] - rango[2], rango[0] - limites[2], limites[1] - rango[3], rango[1] - limites[3])
+
+            while anillo == 0 or not (rango[0] - anillo < limites[0] and rango[1] - anillo < limites[1] and rango[2] + anillo > limites[2] and rango[3] + anillo > limites[3]):
+                for geometrias in self.celdas_anillo(anillo, rango, limites):
+                    for g in geometrias:
+                        registra(g)
+
+                # Las geometrías de los anillos siguientes están al menos a esta distancia de la caja
+                distancia_minima = anillo * self.tamano_celda
+                while pendientes and pendientes[0][0] <= distancia_minima:
+                    yield heapq.heappop(pendientes)[2]
+
+                anillo += 1
+
+        while pendientes:
+            yield heapq.heappop(pendientes)[2]
+
+class EstadoVista:
+    ''' Datos derivados del archivo de dibujo que comparten todos los controles de calidad de una misma ejecución.
+        Digi3D.NET no modifica las geometrías almacenadas: al editar una geometría marca la original como eliminada y añade una nueva al final del
+        archivo de dibujo. Por eso basta con comparar el número de geometrías para saber qué geometrías hay que incorporar a los índices, y las
+        geometrías eliminadas se descartan al consultarlos.
+        Las etiquetas de los códigos se consultan en la tabla de códigos una sola vez por sincronización (al añadir geometrías) y por ejecución de los
+        controles de calidad por lotes (ver descarta_etiquetas), de manera que los cambios en las etiquetas se tienen en cuenta a partir de entonces.
+    '''
+    def __init__(self, vista):
+        self.vista = vista
+        self.numero_geometrias = 0
+        self.geometrias = []
+        self.posiciones = {}
+        self.indice_espacial = None
+        self.geometrias_por_codigo = {}
+        self.consultas_codigo = {}
+        self.tabla_codigos = None
+        self.etiquetas_codigos = {}
+        self.codigos_por_etiqueta = {}
+        self.intersecciones = {}
+        self.diferencias_z = {}
+
+    def sincroniza(self):
+        'Incorpora a los índices las geometrías añadidas al archivo de dibujo desde la última sincronización'
+        numero_geometrias = numero_geometrias_vista(self.vista)
+        if numero_geometrias == self.numero_geometrias:
+            return
+
+        if numero_geometrias < self.numero_geometrias:
+            # Se han descartado geometrías del archivo de dibujo: hay que reconstruir los índices
+            self.__init__(self.vista)
+
+        nuevas = list(itertools.islice(self.vista, self.numero_geometrias, None))
+        self.numero_geometrias += len(nuevas)
+        self.anade_geometrias(nuevas)
+
+    def anade_geometrias(self, geometrias):
+        'Incorpora a los índices las geometrías pasadas por parámetro'
+        if not geometrias:
+            return
+
+        for g in geometrias:
+            self.posiciones[g] = len(self.geometrias)
+            self.geometrias.append(g)
+
+            # Una geometría puede tener el mismo código varias veces, pero solo debe aparecer una vez en su lista
+            for nombre_codigo in set(codigo.name for codigo in g.codes):
+                self.geometrias_por_codigo.setdefault(nombre_codigo, []).append(g)
+
+        self.descarta_etiquetas()
+        self.intersecciones.clear()
+        self.diferencias_z.clear()
+
+        if self.indice_espacial is None or len(self.geometrias) > 2 * len(self.indice_espacial.cajas):
+            # El tamaño de celda se calcula con las geometrías disponibles. Si el archivo de dibujo ha crecido mucho desde entonces
+            # (por ejemplo si se ha comenzado a digitalizar en un archivo vacío), se recalcula con todas ellas
+            cajas = [caja_2d(g) for g in self.geometrias]
+            self.indice_espacial = IndiceEspacial(IndiceEspacial.calcula_tamano_celda(cajas))
+            geometrias = self.geometrias
+        else:
+            cajas = [caja_2d(g) for g in geometrias]
+
+        for g, caja in zip(geometrias, cajas):
+            self.indice_espacial.anade(g, caja)
+
+    def descarta_etiquetas(self):
+        'Descarta las etiquetas consultadas en la tabla de códigos y las geometrías de cada código o etiqueta, para volver a consultarlas'
+        self.tabla_codigos = None
+        self.etiquetas_codigos.clear()
+        self.codigos_por_etiqueta.clear()
+        self.consultas_codigo.clear()
+
+    def codigo_tiene_etiqueta(self, nombre_codigo, etiqueta):
+        'Indica si el código tiene asignada la etiqueta en la tabla de códigos de la ventana de dibujo. Se memoriza hasta la llamada a descarta_etiquetas'
+        clave = (nombre_codigo, etiqueta)
+        resultado = self.etiquetas_codigos.get(clave)
+
+        if resultado is None:
+            if self.tabla_codigos is None:
+                self.tabla_codigos = self.vista.digi_tab
+            resultado = self.etiquetas_codigos[clave] = codigo_tiene_etiqueta(nombre_codigo, etiqueta, self.tabla_codigos)
+
+        return resultado
+
+    def codigos_con_etiqueta(self, etiqueta):
+        'Devuelve la tupla ordenada de los nombres de los códigos del archivo de dibujo que tienen asignada la etiqueta. Se memoriza hasta la llamada a descarta_etiquetas'
+        codigos = self.codigos_por_etiqueta.get(etiqueta)
+
+        if codigos is None:
+            codigos = tuple(sorted(nombre for nombre in self.geometrias_por_codigo if self.codigo_tiene_etiqueta(nombre, etiqueta)))
+            self.codigos_por_etiqueta[etiqueta] = codigos
+
+        return codigos
+
+    def geometrias_con_codigos(self, nombres_codigos):
+        'Devuelve, en el orden del archivo de dibujo y sin repetir, las geometrías (eliminadas incluidas) que tienen alguno de los códigos pasados por parámetro'
+        listas = [self.geometrias_por_codigo[nombre] for nombre in nombres_codigos if nombre in self.geometrias_por_codigo]
+
+        if len(listas) == 1:
+            return listas[0]
+
+        # Una geometría con varios códigos aparece en varias listas
+        return sorted(set(itertools.chain.from_iterable(listas)), key=self.posiciones.__getitem__)
+
+    def geometrias_con_codigo_o_etiqueta(self, nombre_codigo_o_etiqueta):
+        'Devuelve, en el orden del archivo de dibujo, las geometrías (eliminadas incluidas) que tienen el código o etiqueta pasado por parámetro'
+        if nombre_codigo_o_etiqueta not in self.consultas_codigo:
+            coincide = compila_codigo_o_etiqueta(nombre_codigo_o_etiqueta)
+            nombres = [nombre for nombre in self.geometrias_por_codigo if coincide(nombre)]
+            self.consultas_codigo[nombre_codigo_o_etiqueta] = self.geometrias_con_codigos(nombres)
+
+        return self.consultas_codigo[nombre_codigo_o_etiqueta]
+
+estado_vista_actual = None
+
+def estado_vista(vista=None):
+    'Devuelve los índices de la ventana de dibujo pasada por parámetros (o de la activa), actualizados con las últimas geometrías añadidas'
+    global estado_vista_actual
+
+    if vista is None:
+        vista = digi3d.current_view()
+
+    if estado_vista_actual is None or estado_vista_actual.vista is not vista and estado_vista_actual.vista != vista:
+        estado_vista_actual = EstadoVista(vista)
+        cache_relaciones.limpia()
+        cache_mdt.limpia()
+        metricas_geometrias.limpia()
+
+    estado_vista_actual.sincroniza()
+    return estado_vista_actual
+
+def invalida_estado_vista():
+    'Descarta los índices calculados y las proyecciones sobre los MDTs, de manera que se vuelvan a calcular en la siguiente consulta (por ejemplo tras cargar otro MDT)'
+    global estado_vista_actual
+    estado_vista_actual = None
+    cache_relaciones.limpia()
+    cache_mdt.limpia()
+    metricas_geometrias.limpia()
+
+def geometrias_que_tocan_caja(geometria, margen=None):
+    'Devuelve las geometrías no eliminadas del archivo de dibujo cuya caja envolvente toca la de la geometría pasada por parámetros ampliada con un margen'
+    if margen is None:
+        margen = tolerancia_cajas
+
+    indice = estado_vista().indice_espacial
+    if indice is None:
+        return iter(())
+
+    caja = amplia_caja(caja_2d(geometria), margen)
+    return no_eliminadas(indice.consulta(caja))
+
+def geometrias_cercanas_a(geometria, margen=None):
+    ''' Devuelve las mismas geometrías que geometrias_que_tocan_caja, pero ordenadas de menor a mayor distancia entre su caja envolvente y la de la geometría.
+        Las geometrías se obtienen del índice espacial a medida que se consumen, de manera que si se deja de iterar al encontrar la primera que cumple una condición
+        el tiempo depende de la densidad de geometrías alrededor y no del tamaño del archivo de dibujo.
+    '''
+    if margen is None:
+        margen = tolerancia_cajas
+
+    indice = estado_vista().indice_espacial
+    if indice is None:
+        return iter(())
+
+    caja = caja_2d(geometria)
+    return no_eliminadas(indice.consulta_por_cercania(caja, amplia_caja(caja, margen)))
+
+class CacheLRU:
+    ''' Diccionario de tamaño limitado: al superar el tamaño máximo se descartan los elementos usados hace más tiempo.
+        Se puede utilizar desde varios hilos.
+    '''
+    def __init__(self, maximo_elementos):
+        self.maximo_elementos = maximo_elementos
+        self.elementos = collections.OrderedDict()
+        self.cerrojo = threading.Lock()
+
+    def limpia(self):
+        'Descarta todos los elementos memorizados'
+        with self.cerrojo:
+            self.elementos.clear()
+
+    def obtiene(self, clave, calcula):
+        'Devuelve el valor memorizado con la clave indicada. Si no está memorizado lo calcula llamando a la función calcula y lo memoriza'
+        elementos = self.elementos
+
+        with self.cerrojo:
+            if clave in elementos:
+                elementos.move_to_end(clave)
+                return elementos[clave]
+
+        # El cálculo se hace fuera del cerrojo: si dos hilos calculan a la vez la misma clave, el resultado es el mismo
+        valor = calcula()
+
+        with self.cerrojo:
+            elementos[clave] = valor
+            if len(elementos) > self.maximo_elementos:
+                elementos.popitem(last=False)
+
+        return valor
+
+def huella_geometria(g):
+    'Devuelve un valor que cambia si se modifica la geometría (número de vértices y caja envolvente), para descartar resultados memorizados obsoletos'
+    return (len(g), tuple(g.min), tuple(g.max))
+
+# Métricas derivadas de una geometría que memoriza MetricasGeometrias. El área y el perímetro se calculan con la calculadora geográfica
+# de la ventana de dibujo, que en archivos en coordenadas geográficas los devuelve en metros
+calculos_metricas = {
+    'area': lambda g: digi3d.current_view().geographic_calculator.calculate_area(g),
+    'perimetro': lambda g: digi3d.current_view().geographic_calculator.perimeter_2d(g),
+    'z_minima': lambda g: g.min[2],
+    'z_maxima': lambda g: g.max[2],
+    'altura': lambda g: g.max[2] - g.min[2],
+    'ancho': lambda g: g.max[0] - g.min[0],
+    'alto': lambda g: g.max[1] - g.min[1],
+    'numero_huecos': lambda g: len(g.holes),
+    'numero_vertices': len,
+}
+
+# Métricas que se memorizan. El resto son tan baratas como calcular la huella con la que se comprueba si lo memorizado sigue siendo válido,
+# de manera que se calculan en cada lectura
+metricas_memorizadas = {'area', 'perimetro'}
+
+class MetricasGeometrias:
+    ''' Memoriza para cada geometría las métricas de metricas_memorizadas, compartidas por los controles de calidad y las reglas de representación.
+        Las geometrías se referencian de manera débil, de manera que sus métricas desaparecen con ellas, y las métricas memorizadas se descartan
+        cuando cambia la huella de la geometría: cada métrica se calcula una sola vez por modificación, la lean cuantos controles y reglas la lean.
+        Si la geometría no admite referencias débiles, se memoriza en una cache de tamaño limitado con la huella como parte de la clave.
+    '''
+    def __init__(self, maximo_sin_referencia_debil=4096):
+        self.metricas = weakref.WeakKeyDictionary()
+        self.sin_referencia_debil = CacheLRU(maximo_sin_referencia_debil)
+        self.cerrojo = threading.Lock()
+
+    def limpia(self):
+        'Descarta todas las métricas memorizadas'
+        with self.cerrojo:
+            self.metricas = weakref.WeakKeyDictionary()
+        self.sin_referencia_debil.limpia()
+
+    def valores(self, g):
+        'Devuelve el diccionario de métricas memorizadas para la huella actual de la geometría'
+        huella = huella_geometria(g)
+
+        with self.cerrojo:
+            try:
+                huella_memorizada, valores = self.metricas.get(g, (None, None))
+                if huella_memorizada != huella:
+                    valores = {}
+                    self.metricas[g] = (huella, valores)
+                return valores
+            except TypeError:
+                pass
+
+        return self.sin_referencia_debil.obtiene((g, huella), dict)
+
+    def obtiene(self, g, metrica):
+        'Devuelve el valor de la métrica de calculos_metricas indicada para la geometría, calculándolo solo si no está memorizado'
+        if metrica not in metricas_memorizadas:
+            return calculos_metricas[metrica](g)
+
+        valores = self.valores(g)
+
+        if metrica not in valores:
+            valores[metrica] = calculos_metricas[metrica](g)
+
+        return valores[metrica]
+
+metricas_geometrias = MetricasGeometrias()
+
+def metrica_geometria(g, metrica):
+    'Devuelve el valor de la métrica de calculos_metricas indicada para la geometría, memorizado si está en metricas_memorizadas (ver MetricasGeometrias)'
+    return metricas_geometrias.obtiene(g, metrica)
+
+# Relaciones de digi3d.relations para las que relación(a, b) es igual a relación(b, a)
+relaciones_simetricas = frozenset([
+    'AreaArea.adjacent', 'AreaArea.disjoint', 'AreaArea.equal', 'AreaArea.join',
+    'LineLine.across', 'LineLine.disjoint', 'LineLine.equal', 'LineLine.join', 'LineLine.overlap', 'LineLine.endpoint_join_endpoint',
+    'PointPoint.coincident', 'PointPoint.disjoint',
+])
+
+class CacheRelaciones:
+    ''' Memoriza los resultados de las relaciones de digi3d.relations entre pares de geometrías durante una ejecución de los controles de calidad.
+        La clave es (relación, geometría a, huella de a, geometría b, huella de b). En las relaciones simétricas se ordena el par, de manera que
+        (a, b) y (b, a) comparten el resultado. Cuando se supera el tamaño máximo se descartan los resultados usados hace más tiempo.
+    '''
+    maximo_resultados = 100000
+
+    def __init__(self):
+        self.resultados = CacheLRU(self.maximo_resultados)
+        self.funciones = {}
+
+    def limpia(self):
+        'Descarta todos los resultados memorizados'
+        self.resultados.limpia()
+
+    def funcion(self, nombre_relacion):
+        'Devuelve la función de digi3d.relations con el nombre indicado, por ejemplo AreaArea.adjacent'
+        funcion = self.funciones.get(nombre_relacion)
+
+        if funcion is None:
+            clase, predicado = nombre_relacion.split('.')
+            funcion = getattr(getattr(digi3d.relations, clase), predicado)
+            self.funciones[nombre_relacion] = funcion
+
+        return funcion
+
+    def evalua(self, nombre_relacion, a, b):
+        'Devuelve el resultado de la relación entre las geometrías a y b, evaluándola solo si no se había evaluado antes'
+        if nombre_relacion in relaciones_simetricas and id(b) < id(a):
+            a, b = b, a
+
+        clave = (nombre_relacion, a, huella_geometria(a), b, huella_geometria(b))
+        return self.resultados.obtiene(clave, lambda: self.funcion(nombre_relacion)(a, b))
+
+cache_relaciones = CacheRelaciones()
+
+def relacion(nombre_relacion, a, b):
+    'Evalúa la relación de digi3d.relations indicada (por ejemplo AreaArea.adjacent) entre las geometrías a y b memorizando el resultado en cache_relaciones'
+    return cache_relaciones.evalua(nombre_relacion, a, b)
+
+def calcula_intersecciones_entre_geometrias(geometrias):
+    ''' Calcula con un barrido las intersecciones entre todas las geometrías pasadas por parámetro y devuelve un diccionario que asocia a cada geometría
+        el diccionario {coordenada: {geometría: vértice}} que devolvería digi3d.get_intersections al compararla con las demás.
+        Las geometrías se recorren ordenadas por su X mínima manteniendo una lista de geometrías activas (las que aún pueden solapar en X). Cada geometría
+        se compara con digi3d.get_intersections solo con las activas cuya caja envolvente solapa con la suya y consigo misma, de manera que cada par
+        se calcula una sola vez.
+    '''
+    cajas = {g: caja_2d(g) for g in geometrias}
+    ordenadas = sorted(geometrias, key=lambda g: cajas[g][0])
+
+    resultado = {g: {} for g in geometrias}
+    activas = []
+
+    for g in ordenadas:
+        # Se descartan las geometrías que terminan antes de que empiece esta
+        x_minima = cajas[g][0] - tolerancia_cajas
+        activas = [otra for otra in activas if cajas[otra][2] >= x_minima]
+
+        candidatos = [otra for otra in activas if g.maxmin_overlaps_2d(otra)]
+        candidatos.append(g)
+
+        intersecciones = digi3d.get_intersections(g, candidatos)
+        for coordenada in intersecciones:
+            geometrias_en_coordenada = intersecciones[coordenada]
+            for otra in geometrias_en_coordenada:
+                resultado[otra].setdefault(coordenada, {}).update(geometrias_en_coordenada)
+
+        activas.append(g)
+
+    return resultado
+
+def intersecciones_con_codigo_o_etiqueta(geometria, adding_geometry, nombre_codigo_o_etiqueta):
+    ''' Devuelve el diccionario {coordenada: {geometría: vértice}} de las intersecciones de la geometría con las geometrías no eliminadas que tienen el código
+        o etiqueta indicado, igual que digi3d.get_intersections.
+        Si la geometría ya está almacenada y tiene el código, se utiliza un único barrido que calcula las intersecciones entre todas las geometrías con el código y que
+        se reutiliza para el resto de geometrías. Si no (por ejemplo porque el usuario la está digitalizando), se calculan solo las de esta geometría.
+    '''
+    estado = estado_vista()
+
+    if adding_geometry:
+        # En modo interactivo se pasan las geometrías más cercanas primero, para que el primer error comunicado sea el de la geometría más próxima
+        coincide = compila_codigo_o_etiqueta(nombre_codigo_o_etiqueta)
+        candidatos = [g for g in geometrias_cercanas_a(geometria) if any(coincide(codigo.name) for codigo in g.codes)]
+        return digi3d.get_intersections(geometria, cuyas_maximas_minimas_solapen_con(candidatos, geometria))
+
+    if geometria.deleted or geometria not in estado.posiciones or not tiene_el_codigo_o_etiqueta(geometria, nombre_codigo_o_etiqueta):
+        candidatos = geometrias_con_codigo_o_etiqueta(nombre_codigo_o_etiqueta)
+        candidatos = cuyas_maximas_minimas_solapen_con(candidatos, geometria)
+        return digi3d.get_intersections(geometria, candidatos)
+
+    coincide = compila_codigo_o_etiqueta(nombre_codigo_o_etiqueta)
+    clave = (nombre_codigo_o_etiqueta, coincide)
+    if clave not in estado.intersecciones:
+        estado.intersecciones[clave] = calcula_intersecciones_entre_geometrias(list(geometrias_con_codigo_o_etiqueta(nombre_codigo_o_etiqueta)))
+
+    intersecciones = {}
+    for coordenada, geometrias_en_coordenada in estado.intersecciones[clave][geometria].items():
+        # Las geometrías eliminadas después de calcular el barrido no cuentan
+        vigentes = {g: vertice for g, vertice in geometrias_en_coordenada.items() if not g.deleted}
+        if len(vigentes) < len(geometrias_en_coordenada) and len(vigentes) == 1:
+            continue
+        intersecciones[coordenada] = vigentes
+
+    return intersecciones
+
+def diferencias_z_en_cruces(geometria, adding_geometry, nombre_codigo_o_etiqueta):
+    ''' Devuelve una lista de tuplas (coordenada de la geometría en el cruce, diferencia en valor absoluto de la coordenada Z) con una tupla por cada
+        cruce y cada otra geometría que llega a él, con las geometrías no eliminadas que tienen el código o etiqueta indicado.
+        La lista se memoriza, de manera que los distintos controles al_tocar_lineas_* configurados en un código la calculan una sola vez. Si después se
+        elimina alguna de las otras geometrías, se vuelve a calcular.
+    '''
+    estado = estado_vista()
+    clave = (geometria, huella_geometria(geometria), nombre_codigo_o_etiqueta)
+
+    memorizado = estado.diferencias_z.get(clave)
+    if memorizado is not None and not any(otra_geometria.deleted for otra_geometria in memorizado[1]):
+        return memorizado[0]
+
+    diferencias = []
+    otras_geometrias = []
+
+    intersecciones = intersecciones_con_codigo_o_etiqueta(geometria, adding_geometry, nombre_codigo_o_etiqueta)
+    for coordenadas_interseccion in intersecciones:
+        geometrias_que_llegan_a_esta_interseccion = intersecciones[coordenadas_interseccion]
+        vertice_geometria_analizando = geometrias_que_llegan_a_esta_interseccion[geometria]
+        coordenada_de_geometria_analizando = geometria[vertice_geometria_analizando]
+        coordenada_z_comparar = coordenada_de_geometria_analizando[2]
+
+        for otra_geometria in geometrias_que_llegan_a_esta_interseccion:
+            if otra_geometria == geometria:
+                continue
+
+            vertice_otra_geometria = geometrias_que_llegan_a_esta_interseccion[otra_geometria]
+            coordenada_z_otra_geometria = otra_geometria[vertice_otra_geometria][2]
+
+            diferencias.append((coordenada_de_geometria_analizando, abs(coordenada_z_otra_geometria - coordenada_z_comparar)))
+            otras_geometrias.append(otra_geometria)
+
+    estado.diferencias_z[clave] = (diferencias, otras_geometrias)
+    return diferencias
+
+# Comprobaciones de los controles al_tocar_lineas_debe_haber_una_diferencia_de_z_*: función que indica si la diferencia en Z es un error y mensaje del error
+comprobaciones_diferencia_z = {
+    'inferior_a': (operator.ge, "Las geometrías se tocan con una diferencia en la coordenada Z de {} (superior o igual a {})"),
+    'inferior_o_igual_a': (operator.gt, "Las geometrías se tocan con una diferencia en la coordenada Z de {} (superior a {})"),
+    'superior_a': (operator.le, "Las geometrías se tocan con una diferencia en la coordenada Z de {} (inferior o igual a {})"),
+    'superior_o_igual_a': (operator.lt, "Las geometrías se tocan con una diferencia en la coordenada Z de {} (inferior a {})"),
+    'igual_a': (operator.ne, "Intersección en la que la diferencia en coordenada Z es {} (distinto a {})"),
+}
+
+def evalua_diferencias_z_en_cruces(geometria, adding_geometry, nombre_codigo_o_etiqueta, comprobaciones):
+    ''' Evalúa de una sola vez varias comprobaciones de diferencia de Z en los cruces de la geometría con las geometrías que tienen el código o etiqueta indicado.
+        Argumentos:
+            comprobaciones: lista de tuplas (comprobación, tolerancia), donde comprobación es una clave de comprobaciones_diferencia_z (inferior_a, igual_a, etc).
+        Devuelve una lista con los errores de cada comprobación, en el mismo orden, iguales a los de la función al_tocar_lineas_debe_haber_una_diferencia_de_z_<comprobación>.
+        En modo interactivo cada comprobación se queda con su primer error.
+    '''
+    errores = [[] for _ in comprobaciones]
+    pendientes = len(comprobaciones)
+
+    for coordenada, diferenciaZ in diferencias_z_en_cruces(geometria, adding_geometry, nombre_codigo_o_etiqueta):
+        for errores_comprobacion, (comprobacion, tolerancia) in zip(errores, comprobaciones):
+            if adding_geometry and errores_comprobacion:
+                continue
+
+            es_error, mensaje = comprobaciones_diferencia_z[comprobacion]
+            if es_error(diferenciaZ, tolerancia):
+                errores_comprobacion.append(digi3d.GeometryError(mensaje.format(diferenciaZ, tolerancia), coordenada))
+
+                if adding_geometry:
+                    # Si estamos en modo interactivo, nos sobra con informarle al usuario del primer error
+                    pendientes -= 1
+                    if pendientes == 0:
+                        return errores
+
+    return errores
+
+# Número de vértices del primer bloque de ZetasGeometria. Cada bloque duplica el tamaño del anterior
+tamano_bloque_zetas = 256
+
+class ZetasGeometria:
+    ''' Coordenadas Z de los vértices de una geometría en arrays de numpy, que se construyen por bloques a medida que se recorren:
+        si un control de calidad encuentra un error en los primeros vértices, no se convierten los demás.
+    '''
+    def __init__(self, g):
+        self.vertices = iter(g)
+        self.bloques = []
+        self.completa = False
+
+    def recorre(self):
+        'Devuelve un iterador de tuplas (índice del primer vértice del bloque, array con las coordenadas Z del bloque)'
+        inicio = 0
+
+        for numero_bloque in itertools.count():
+            if numero_bloque == len(self.bloques):
+                if self.completa:
+                    return
+
+                tamano = tamano_bloque_zetas << min(numero_bloque, 10)
+                bloque = np.fromiter((c[2] for c in itertools.islice(self.vertices, tamano)), dtype=np.float64)
+                self.completa = len(bloque) < tamano
+                if not len(bloque):
+                    return
+                self.bloques.append(bloque)
+
+            bloque = self.bloques[numero_bloque]
+            yield inicio, bloque
+            inicio += len(bloque)
+
+# Última geometría cuyas coordenadas Z se han recorrido en cada hilo. Los controles de calidad de una geometría se ejecutan seguidos,
+# de manera que comparten sus ZetasGeometria, y en memoria solo hay las de una geometría por hilo
+zetas_recientes = threading.local()
+
+def zetas_geometria(g):
+    'Devuelve las ZetasGeometria de la geometría, que se reutilizan mientras se sigan consultando las de la misma geometría sin modificar'
+    clave = (g, huella_geometria(g))
+
+    if getattr(zetas_recientes, 'clave', None) != clave:
+        zetas_recientes.clave = clave
+        zetas_recientes.zetas = ZetasGeometria(g)
+
+    return zetas_recientes.zetas
+
+def vertices_con_salto_z(g, es_error, todos=False):
+    ''' Devuelve los índices de los vértices para los que es_error(z del vértice, z del vértice anterior) es verdadero (por ejemplo operator.le).
+        Si todos es falso, solo se devuelve el primero. Con numpy la comparación se realiza de manera vectorizada por bloques de vértices.
+    '''
+    if np is not None:
+        indices = []
+        z_anterior = None
+
+        for inicio, z in zetas_geometria(g).recorre():
+            if z_anterior is not None and es_error(z[0], z_anterior):
+                indices.append(inicio)
+            indices.extend(int(i) + inicio + 1 for i in np.flatnonzero(es_error(z[1:], z[:-1])))
+
+            if indices and not todos:
+                return indices[:1]
+            z_anterior = z[-1]
+
+        return indices
+
+    indices = []
+    zPrevia = None
+    for i, coordenada in enumerate(g):
+        zActual = coordenada[2]
+        if zPrevia is not None and es_error(zActual, zPrevia):
+            indices.append(i)
+            if not todos:
+                break
+        zPrevia = zActual
+
+    return indices
+
+def vertices_con_z_distinta(g, z, todos=False):
+    'Devuelve los índices de los vértices cuya coordenada Z es distinta de z. Si todos es falso, solo se devuelve el primero'
+    if np is not None:
+        indices = []
+
+        for inicio, zetas in zetas_geometria(g).recorre():
+            indices.extend(int(i) + inicio for i in np.flatnonzero(zetas != z))
+
+            if indices and not todos:
+                return indices[:1]
+
+        return indices
+
+    indices = []
+    for i, coordenada in enumerate(g):
+        if coordenada[2] != z:
+            indices.append(i)
+            if not todos:
+                break
+
+    return indices
+
+class CacheMdt:
+    ''' Proyecciones sobre los MDTs cargados en Digi3D.NET memorizadas por coordenada (X, Y) durante una ejecución por lotes de los controles de calidad,
+        en la que varios controles y las geometrías que comparten vértices proyectan las mismas coordenadas.
+        Fuera de una ejecución por lotes (ver con_cache_mdt) no se memoriza nada: entre dos llamadas de Digi3D.NET el usuario puede cargar o descargar MDTs,
+        y no hay manera de saber si una proyección memorizada sigue siendo válida. Al empezar y al terminar cada ejecución se descartan las proyecciones.
+    '''
+    maximo_proyecciones = 65536
+
+    def __init__(self):
+        self.proyecciones = CacheLRU(self.maximo_proyecciones)
+        self.ejecuciones = 0
+        self.cerrojo = threading.Lock()
+
+    def limpia(self):
+        'Descarta todas las proyecciones memorizadas'
+        self.proyecciones.limpia()
+
+    def inicia_ejecucion(self):
+        'Activa la memorización hasta la llamada a termina_ejecucion correspondiente'
+        with self.cerrojo:
+            if self.ejecuciones == 0:
+                self.proyecciones.limpia()
+            self.ejecuciones += 1
+
+    def termina_ejecucion(self):
+        with self.cerrojo:
+            self.ejecuciones -= 1
+            if self.ejecuciones == 0:
+                self.proyecciones.limpia()
+
+    def proyecta(self, coordenada, vista):
+        'Devuelve la coordenada Z de la proyección de la coordenada sobre los MDTs cargados en la ventana de dibujo (None si no hay MDT en esa posición)'
+        if self.ejecuciones == 0:
+            return vista.project(coordenada)
+
+        return self.proyecciones.obtiene((coordenada[0], coordenada[1]), lambda: vista.project(coordenada))
+
+cache_mdt = CacheMdt()
+
+def con_cache_mdt(funcion):
+    'Decorador de las funciones que ejecutan los controles de calidad por lotes: mientras se ejecutan, las proyecciones sobre el MDT se memorizan en cache_mdt'
+    @functools.wraps(funcion)
+    def ejecuta_con_cache_mdt(*argumentos, **opciones):
+        cache_mdt.inicia_ejecucion()
+        try:
+            return funcion(*argumentos, **opciones)
+        finally:
+            cache_mdt.termina_ejecucion()
+
+    return ejecuta_con_cache_mdt
+
+class MdtLocal:
+    ''' MDT leído de un archivo local, que se puede utilizar en lugar de los MDTs cargados en Digi3D.NET (por ejemplo para ejecutar los controles de calidad sin la aplicación).
+        Admite mallas ESRI ASCII (.asc) y mallas binarias de float32 (.flt) acompañadas de su cabecera (.hdr). Las mallas binarias se leen a través de mmap,
+        de manera que solo se cargan en memoria las zonas del MDT que se consultan.
+    '''
+    def __init__(self, ruta):
+        raiz, extension = os.path.splitext(ruta)
+        self.archivo = None
+        self.mapa = None
+
+        if extension.lower() == '.asc':
+            with open(ruta, encoding='ascii') as f:
+                cabecera, valores = self.lee_cabecera(f)
+                valores += [float(valor) for valor in f.read().split()]
+            self.inicializa(cabecera)
+
+            if np is not None:
+                self.valores = np.array(valores, dtype=np.float64).reshape(self.filas, self.columnas)
+            else:
+                self.valores = valores
+                self.valor = lambda fila, columna: valores[fila * self.columnas + columna]
+        else:
+            with open(raiz + '.hdr', encoding='ascii') as f:
+                cabecera, _ = self.lee_cabecera(f)
+            self.inicializa(cabecera)
+
+            formato = '>f4' if cabecera.get('byteorder', 'lsbfirst').lower() in ('msbfirst', 'm') else '<f4'
+
+            if np is not None:
+                self.valores = np.memmap(raiz + '.flt', dtype=formato, mode='r', shape=(self.filas, self.columnas))
+            else:
+                self.archivo = open(raiz + '.flt', 'rb')
+                self.mapa = mmap.mmap(self.archivo.fileno(), 0, access=mmap.ACCESS_READ)
+                formato_struct = formato[0] + 'f'
+                self.valor = lambda fila, columna: struct.unpack_from(formato_struct, self.mapa, (fila * self.columnas + columna) * 4)[0]
+
+    @staticmethod
+    def lee_cabecera(f):
+        'Lee las líneas "clave valor" de la cabecera de una malla ESRI. Devuelve la cabecera (con las claves en minúsculas) y los valores de la malla que estuvieran en la última línea leída'
+        cabecera = {}
+        for linea in f:
+            partes = linea.split()
+            if not partes:
+                continue
+            if not partes[0][0].isalpha():
+                return cabecera, [float(valor) for valor in partes]
+            cabecera[partes[0].lower()] = partes[1]
+
+        return cabecera, []
+
+    def inicializa(self, cabecera):
+        'Calcula la geometría de la malla a partir de la cabecera'
+        self.columnas = int(cabecera['ncols'])
+        self.filas = int(cabecera['nrows'])
+        self.tamano_celda = float(cabecera['cellsize'])
+        self.sin_dato = float(cabecera['nodata_value']) if 'nodata_value' in cabecera else None
+
+        medio = 0.0 if 'xllcenter' in cabecera else self.tamano_celda / 2
+
+        # Coordenadas del centro de la celda de la primera columna y de la primera fila (la fila superior)
+        self.x0 = float(cabecera.get('xllcenter', cabecera.get('xllcorner'))) + medio
+        self.y0 = float(cabecera.get('yllcenter', cabecera.get('yllcorner'))) + medio + (self.filas - 1) * self.tamano_celda
+
+    def cierra(self):
+        'Libera el archivo del MDT'
+        if self.mapa is not None:
+            self.mapa.close()
+            self.archivo.close()
+        self.mapa = self.archivo = self.valores = None
+
+    def posicion(self, x, y):
+        ''' Devuelve la posición en la malla (fila y columna no enteras) de la coordenada, ajustada a los centros de las celdas de los bordes.
+            Devuelve None si la coordenada queda fuera de la malla.
+        '''
+        columna = (x - self.x0) / self.tamano_celda
+        fila = (self.y0 - y) / self.tamano_celda
+
+        if not (-0.5 <= columna <= self.columnas - 0.5 and -0.5 <= fila <= self.filas - 0.5):
+            return None
+
+        return min(max(fila, 0.0), self.filas - 1.0), min(max(columna, 0.0), self.columnas - 1.0)
+
+    def proyecta(self, coordenada):
+        'Devuelve la coordenada Z del MDT interpolada bilinealmente en la coordenada, o None si la coordenada está fuera del MDT o en una zona sin datos (igual que el método project de la ventana de dibujo)'
+        posicion = self.posicion(coordenada[0], coordenada[1])
+        if posicion is None:
+            return None
+
+        if np is not None:
+            z = self.proyecta_bloque(np.array([[coordenada[0], coordenada[1]]], dtype=np.float64))[0]
+            return None if z != z else float(z)
+
+        fila, columna = posicion
+        i0 = min(int(fila), max(self.filas - 2, 0))
+        j0 = min(int(columna), max(self.columnas - 2, 0))
+        i1 = min(i0 + 1, self.filas - 1)
+        j1 = min(j0 + 1, self.columnas - 1)
+        fy = fila - i0
+        fx = columna - j0
+
+        esquinas = [self.valor(i0, j0), self.valor(i0, j1), self.valor(i1, j0), self.valor(i1, j1)]
+
+        if any(z == self.sin_dato or z != z for z in esquinas):
+            return None
+
+        z00, z01, z10, z11 = esquinas
+        return (z00 * (1 - fx) + z01 * fx) * (1 - fy) + (z10 * (1 - fx) + z11 * fx) * fy
+
+    def proyecta_bloque(self, xy):
+        ''' Versión vectorizada de proyecta (requiere numpy): recibe un array de n filas con las coordenadas X e Y en las dos primeras columnas
+            y devuelve un array con la coordenada Z interpolada de cada una (NaN fuera del MDT o en zonas sin datos).
+        '''
+        columna = (xy[:, 0] - self.x0) / self.tamano_celda
+        fila = (self.y0 - xy[:, 1]) / self.tamano_celda
+        dentro = (columna >= -0.5) & (columna <= self.columnas - 0.5) & (fila >= -0.5) & (fila <= self.filas - 0.5)
+
+        columna = np.clip(columna, 0.0, self.columnas - 1.0)
+        fila = np.clip(fila, 0.0, self.filas - 1.0)
+        i0 = np.minimum(fila.astype(np.intp), max(self.filas - 2, 0))
+        j0 = np.minimum(columna.astype(np.intp), max(self.columnas - 2, 0))
+        i1 = np.minimum(i0 + 1, self.filas - 1)
+        j1 = np.minimum(j0 + 1, self.columnas - 1)
+        fy = fila - i0
+        fx = columna - j0
+
+        z00 = self.valores[i0, j0].astype(np.float64)
+        z01 = self.valores[i0, j1].astype(np.float64)
+        z10 = self.valores[i1, j0].astype(np.float64)
+        z11 = self.valores[i1, j1].astype(np.float64)
+
+        zetas = (z00 * (1 - fx) + z01 * fx) * (1 - fy) + (z10 * (1 - fx) + z11 * fx) * fy
+
+        if self.sin_dato is not None:
+            dentro &= (z00 != self.sin_dato) & (z01 != self.sin_dato) & (z10 != self.sin_dato) & (z11 != self.sin_dato)
+
+        zetas[~dentro] = np.nan
+        return zetas
+
+mdt_local = None
+
+def establece_mdt_local(ruta):
+    ''' Hace que los controles de calidad que proyectan sobre el MDT utilicen el MDT local almacenado en la ruta indicada (.asc o .flt) en lugar de los MDTs cargados en Digi3D.NET.
+        Si la ruta es None se vuelven a utilizar los MDTs cargados en Digi3D.NET.
+    '''
+    global mdt_local
+
+    if mdt_local is not None:
+        mdt_local.cierra()
+
+    mdt_local = MdtLocal(ruta) if ruta is not None else None
+    cache_mdt.limpia()
+
+def primer_vertice_con_diferencia_z_mdt(geometria, es_error, distancia, partes_enteras=False):
+    ''' Devuelve una tupla (índice del vértice, diferencia) con el primer vértice de la geometría para el que es_error(diferencia en Z con el MDT, distancia) es verdadero, o None si no hay ninguno.
+        Los vértices sin MDT debajo no se tienen en cuenta. Si partes_enteras es verdadero se comparan las partes enteras de las coordenadas Z.
+        Los vértices se proyectan de uno en uno, de manera que no se proyecta ningún vértice posterior al primer error. Sobre un MDT local con numpy
+        se proyectan de manera vectorizada por bloques de tamaño creciente (ver tamano_bloque_zetas), y no se proyecta ningún bloque posterior al primer error.
+    '''
+    if mdt_local is not None and np is not None:
+        vertices = iter(geometria)
+        inicio = 0
+
+        for numero_bloque in itertools.count():
+            bloque = np.array([(c[0], c[1], c[2]) for c in itertools.islice(vertices, tamano_bloque_zetas << min(numero_bloque, 10))], dtype=np.float64)
+            if not len(bloque):
+                return None
+
+            proyectadas = mdt_local.proyecta_bloque(bloque)
+            if partes_enteras:
+                diferencias = np.abs(np.trunc(proyectadas) - np.trunc(bloque[:, 2]))
+            else:
+                diferencias = np.abs(proyectadas - bloque[:, 2])
+
+            # Las diferencias de los vértices sin MDT debajo son NaN, y ninguna comparación con NaN es verdadera
+            indices = np.flatnonzero(es_error(diferencias, distancia))
+            if len(indices):
+                vertice = int(indices[0])
+                return inicio + vertice, int(diferencias[vertice]) if partes_enteras else float(diferencias[vertice])
+
+            inicio += len(bloque)
+
+    if mdt_local is not None:
+        proyecta = mdt_local.proyecta
+    else:
+        vista = digi3d.current_view()
+        proyecta = lambda coordenada: cache_mdt.proyecta(coordenada, vista)
+
+    for vertice, coordenada in enumerate(geometria):
+        z_proyectada = proyecta(coordenada)
+
+        if z_proyectada is None:
+            continue
+
+        if partes_enteras:
+            diferencia = abs(int(z_proyectada) - int(coordenada[2]))
+        else:
+            diferencia = abs(z_proyectada - coordenada[2])
+
+        if es_error(diferencia, distancia):
+            return vertice, diferencia
+
+    return None
+
+# Margen relativo alrededor de la distancia umbral dentro del cual se confirma la distancia con la calculadora geográfica
+margen_confirmacion_distancia = 0.01
+
+def escala_local(coordenada, calculadora, incremento=0.001):
+    ''' Devuelve los metros que hay en una unidad de coordenadas en X y en Y en el entorno de la coordenada, según la calculadora geográfica.
+        Permite convertir una distancia en metros a un radio de búsqueda en las unidades del archivo de dibujo, que pueden ser grados.
+    '''
+    x, y, z = coordenada[0], coordenada[1], coordenada[2]
+    escala_x = calculadora.calculate_distance_2d(coordenada, (x + incremento, y, z)) / incremento
+    escala_y = calculadora.calculate_distance_2d(coordenada, (x, y + incremento, z)) / incremento
+    return escala_x, escala_y
+
+def radio_busqueda_distancia(distancia, escala_minima):
+    'Devuelve el radio de búsqueda en coordenadas de la ventana de dibujo que garantiza encontrar las geometrías a menos de distancia, con la escala local mínima indicada'
+    return distancia / escala_minima * (1 + margen_confirmacion_distancia) + tolerancia_cajas
+
+def geometrias_a_menor_distancia_que(geometria, nombre_codigo_o_etiqueta, calculadora, distancia, vista=None, por_cercania=False):
+    ''' Devuelve, en el orden del archivo de dibujo, las geometrías con el código o etiqueta indicado (excluyendo la propia geometría) que tienen algún vértice
+        a una distancia inferior a distancia de algún vértice de la geometría pasada por parámetros. Si por_cercania es verdadero se devuelven de la más cercana
+        a la más lejana, calculándolas a medida que se consumen.
+        Los candidatos se obtienen del índice espacial con un radio de búsqueda conservador. La distancia entre dos puntos solo se calcula con la
+        calculadora geográfica si la distancia plana escalada está cerca de la distancia umbral.
+    '''
+    escala_x, escala_y = escala_local(geometria[0], calculadora)
+    escala_minima = min(escala_x, escala_y)
+    escala_maxima = max(escala_x, escala_y)
+
+    if escala_minima <= 0:
+        # No se puede estimar un radio de búsqueda: se comparan todas las geometrías con el código
+        candidatos = geometrias_con_codigo_o_etiqueta(nombre_codigo_o_etiqueta, vista)
+    else:
+        estado = estado_vista(vista)
+        radio = radio_busqueda_distancia(distancia, escala_minima)
+        coincide = compila_codigo_o_etiqueta(nombre_codigo_o_etiqueta)
+
+        if por_cercania:
+            candidatos = (g for g in geometrias_cercanas_a(geometria, radio) if any(coincide(codigo.name) for codigo in g.codes))
+        else:
+            candidatos = [g for g in geometrias_que_tocan_caja(geometria, radio) if any(coincide(codigo.name) for codigo in g.codes)]
+            candidatos.sort(key=estado.posiciones.__getitem__)
+
+    limite_inferior = distancia * (1 - margen_confirmacion_distancia)
+    limite_superior = distancia * (1 + margen_confirmacion_distancia)
+
+    for otra_geometria in candidatos:
+        if otra_geometria == geometria:
+            continue
+
+        if escala_minima > 0 and len(geometria) == 1 and len(otra_geometria) == 1:
+            a = geometria[0]
+            b = otra_geometria[0]
+            distancia_plana = math.hypot(b[0] - a[0], b[1] - a[1])
+
+            if distancia_plana * escala_maxima < limite_inferior:
+                yield otra_geometria
+                continue
+
+            if distancia_plana * escala_minima > limite_superior:
+                continue
+
+        if distancia_menor_que(geometria, otra_geometria, calculadora, distancia):
+            yield otra_geometria
+
+# Ejecución diferida de controles de calidad en modo interactivo  --------------------------------------------------------------------------
+
+# Tiempo máximo en segundos que puede bloquear cada control de calidad a Digi3D.NET al almacenar una geometría, por nombre de control.
+# Los controles que no aparecen utilizan presupuesto_por_defecto (None: se espera siempre a que terminen, como hasta ahora).
+# Se leen al definir los controles de calidad: los controles sin presupuesto se registran en Digi3D.NET sin ningún envoltorio
+presupuestos_controles = {}
+presupuesto_por_defecto = None
+
+# Duración estimada en segundos de cada control de calidad con presupuesto al almacenar una geometría: media móvil exponencial de sus evaluaciones,
+# en la que la última pesa peso_ultima_duracion, de manera que una evaluación lenta aislada no aplaza el control indefinidamente
+duraciones_controles = {}
+peso_ultima_duracion = 0.3
+
+# Número de veces seguidas que se aplaza un control de calidad. Al llegar a maximo_aplazamientos se vuelve a evaluar al almacenar la geometría
+# para medir de nuevo su duración
+aplazamientos_controles = {}
+maximo_aplazamientos = 5
+
+# Segundos que puede esperar una evaluación aplazada. Las que llevan más tiempo se evalúan en la siguiente llamada de Digi3D.NET a un control
+# con presupuesto aunque se supere su presupuesto
+maximo_segundos_aplazado = 30.0
+
+# Evaluaciones aplazadas de controles de calidad con presupuesto: la clave es (geometría, índice del código, nombre del control) y el valor la función
+# del control, sus parámetros adicionales y el instante (time.monotonic) en el que se aplazó. Una geometría solo tiene una evaluación pendiente por código y control
+controles_diferidos = collections.OrderedDict()
+cerrojo_controles_diferidos = threading.Lock()
+
+# Mensaje del error con el que se comunica a Digi3D.NET que una evaluación aplazada ha detectado errores en otra geometría
+mensaje_error_diferido = 'El control de calidad {} se aplazó al almacenar la geometría relacionada y ha detectado {} errores en ella'
+
+def presupuesto_control(nombre_control):
+    'Devuelve el tiempo máximo en segundos configurado para el control de calidad, o None si no tiene límite'
+    return presupuestos_controles.get(nombre_control, presupuesto_por_defecto)
+
+def evalua_midiendo_duracion(control, geometry, code_index, parametros):
+    'Evalúa el control de calidad como al almacenar una geometría y actualiza su duración estimada en duraciones_controles'
+    inicio = time.perf_counter()
+    try:
+        return control(geometry, True, code_index, *parametros)
+    finally:
+        duracion = time.perf_counter() - inicio
+        anterior = duraciones_controles.get(control.__name__)
+        duraciones_controles[control.__name__] = duracion if anterior is None else anterior + peso_ultima_duracion * (duracion - anterior)
+        aplazamientos_controles[control.__name__] = 0
+
+def evalua_controles_diferidos(limite=None, evaluadas=()):
+    ''' Evalúa en el hilo actual las evaluaciones aplazadas, de la más antigua a la más reciente, y devuelve una lista de tuplas
+        (geometría, índice del código, nombre del control, lista de errores) con las que han detectado algún error.
+        Si se indica limite (instante de time.perf_counter), a partir de ese instante solo se evalúan las que llevan esperando más de maximo_segundos_aplazado.
+        Se descartan las de las geometrías eliminadas y las de evaluadas: un conjunto de tuplas (geometría, índice del código, nombre del control)
+        cuyo resultado ya se ha obtenido de otra manera.
+    '''
+    resultados = []
+
+    while True:
+        with cerrojo_controles_diferidos:
+            if not controles_diferidos:
+                return resultados
+
+            clave, (control, parametros, instante) = next(iter(controles_diferidos.items()))
+            if limite is not None and time.perf_counter() >= limite and time.monotonic() - instante <= maximo_segundos_aplazado:
+                return resultados
+
+            del controles_diferidos[clave]
+
+        geometry, code_index, nombre_control = clave
+        if geometry.deleted or clave in evaluadas:
+            continue
+
+        errores = errores_como_lista(evalua_midiendo_duracion(control, geometry, code_index, parametros))
+        if errores:
+            resultados.append((geometry, code_index, nombre_control, errores))
+
+def con_presupuesto_de_tiempo(control):
+    ''' Decorador para controles de calidad. Si el control tiene presupuesto (ver presupuestos_controles) y su duración estimada al almacenar una geometría
+        supera el presupuesto, al almacenar las siguientes geometrías no se evalúa: se aplaza en controles_diferidos y Digi3D.NET no espera por él.
+        Tras maximo_aplazamientos aplazamientos seguidos se vuelve a evaluar para medir de nuevo su duración.
+        Las evaluaciones aplazadas se hacen en el hilo de Digi3D.NET en las siguientes llamadas a controles con presupuesto al almacenar geometrías,
+        mientras quede presupuesto o si llevan esperando más de maximo_segundos_aplazado. Sus errores se comunican con un digi3d.GeometryRelationError
+        con la geometría en la que se han detectado, que se puede centrar desde el panel de tareas.
+        Al ejecutar los controles desde el menú el control se evalúa como siempre, y se descarta la evaluación aplazada que tuviera la geometría.
+        Si el control no tiene presupuesto se devuelve sin envolver.
+    '''
+    if presupuesto_control(control.__name__) is None:
+        return control
+
+    @functools.wraps(control)
+    def control_con_presupuesto(geometry, adding_geometry, code_index, *parametros):
+        clave = (geometry, code_index, control.__name__)
+
+        if not adding_geometry:
+            with cerrojo_controles_diferidos:
+                controles_diferidos.pop(clave, None)
+            return control(geometry, adding_geometry, code_index, *parametros)
+
+        presupuesto = presupuesto_control(control.__name__)
+        limite = time.perf_counter() + presupuesto
+
+        # Primero las evaluaciones aplazadas anteriormente, para que la de esta geometría, si se aplaza, espere su turno
+        errores_diferidos = [digi3d.GeometryRelationError(g, mensaje_error_diferido.format(nombre_control, len(errores)))
+                             for g, _, nombre_control, errores in evalua_controles_diferidos(limite)]
+
+        if duraciones_controles.get(control.__name__, 0.0) > presupuesto and aplazamientos_controles.get(control.__name__, 0) < maximo_aplazamientos:
+            aplazamientos_controles[control.__name__] = aplazamientos_controles.get(control.__name__, 0) + 1
+            with cerrojo_controles_diferidos:
+                controles_diferidos.setdefault(clave, (control, parametros, time.monotonic()))
+            resultado = None
+        else:
+            resultado = evalua_midiendo_duracion(control, geometry, code_index, parametros)
+
+        if not errores_diferidos:
+            return resultado
+
+        return errores_como_lista(resultado) + errores_diferidos
+
+    # Digi3D.NET y el Editor de Tablas de Códigos obtienen de la firma los parámetros que muestran en el cuadro de diálogo de configuración del control
+    control_con_presupuesto.__signature__ = inspect.signature(control)
+    return control_con_presupuesto
+
+def recoge_errores_diferidos(evaluadas=()):
+    ''' Evalúa en el hilo actual todas las evaluaciones aplazadas de controles de calidad y devuelve los errores que detectan,
+        como una lista de tuplas (geometría, índice del código, nombre del control, lista de errores).
+        Las evaluaciones de las geometrías que se han eliminado mientras tanto se descartan, igual que las de evaluadas: un conjunto de tuplas
+        (geometría, índice del código, nombre del control) cuyo resultado ya se ha obtenido de otra manera.
+        Hay que llamarla desde el hilo de Digi3D.NET, porque los controles de calidad utilizan digi3d. La llaman ejecuta_controles_de_calidad
+        y EjecucionIncremental.ejecuta.
+    '''
+    return evalua_controles_diferidos(evaluadas=evaluadas)
+
 # Controles de calidad  --------------------------------------------------------------------------
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_area_debe_ser_adyacente_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es un área, comunica un error si no se localiza ningún área en el archivo de dibujo que sea adyacente al área que se está analizando'
     if not es_area(geometry):
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.AreaArea.adjacent(área, geometry)):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('AreaArea.adjacent', área, geometry)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_area_debe_estar_completamente_dentro_de_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es un área, comunica un error si no se localiza en el archivo de dibujo otro área que dentro de la cual esté la geometría que se está analizando (no se admite que determinados vértices de este área coincidan con la del otro área)'
     if not es_area(geometry):
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.AreaArea.completely_within(geometry, área)):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('AreaArea.completely_within', geometry, área)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_area_debe_estar_dentro_de_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es un área, comunica un error si no se localiza en el archivo de dibujo otro área que dentro de la cual esté la geometría que se está analizando (se admite que determinados vértices de este área coincidan con la del otro área)'
     if not es_area(geometry):
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.AreaArea.within(geometry, área)):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('AreaArea.within', geometry, área)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_area_debe_ser_estar_separado_de_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es un área, comunica un error si se localiza en el archivo de dibujo otra área que no sea disjunta (es decir, que solape, cruce, esté en el interior...) de la geometría ques e está analizando'
     if not es_area(geometry):
         return
 
-    if algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: not digi3d.relations.AreaArea.disjoint(área, geometry)):
+    if algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: not relacion('AreaArea.disjoint', área, geometry)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_area_debe_ser_igual_a_otra_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es un área, comunica un error si no se localiza en el archivo de dibujo otro área que sea idéntica a la geometría que se está analizando'
     if not es_area(geometry):
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.AreaArea.equal(área, geometry)):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('AreaArea.equal', área, geometry)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_area_debe_unirse_con_otra_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es un área, comunica un error si no se localiza en el archivo de dibujo un área que se una con la geometría que se está analizando'
     if not es_area(geometry):
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.AreaArea.join(área, geometry)):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('AreaArea.join', área, geometry)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_area_debe_solapar_otra_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es un área, comunica un error si no se localiza en el archivo de dibujo un área que solape el área que se está analizando.'
     if not es_area(geometry):
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.AreaArea.overlap(geometry, área)[0]):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('AreaArea.overlap', geometry, área)[0]):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_area_no_puede_solapar_otra_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es un área, comunica un error si se localiza en el archivo de dibujo un área que solape el área que se está analizando.'
     if not es_area(geometry):
         return
 
-    if algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.AreaArea.overlap(geometry, área)[0]):
+    if algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('AreaArea.overlap', geometry, área)[0]):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
@@ -413,201 +1871,223 @@ def atributo_bbdd_debe_ser_mayor_o_igual(geometry, adding_geometry, code_index,
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_ser_adyacente_a_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error si no se localiza en el archivo de dibujo un área que solape dicha línea.'
     if type(geometry) is not digi3d.Line:
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.LineArea.adjacent(geometry, área)):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('LineArea.adjacent', geometry, área)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_estar_completamente_dentro_de_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error si no se localiza en el archivo de dibujo un área que solape dicha línea. '
     if type(geometry) is not digi3d.Line:
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.LineArea.within(geometry, área)):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('LineArea.within', geometry, área)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_cruzar_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error si esta no cruza ningún área del archivo de dibujo. '
     if type(geometry) is not digi3d.Line:
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.LineArea.across(geometry, área)):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('LineArea.across', geometry, área)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_cruzar_linea(geometry, adding_geometry, code_index, código_o_etiqueta_lineas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error si esta no cruza ningún área del archivo de dibujo.'
     if type(geometry) is not digi3d.Line:
         return
 
-    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: digi3d.relations.LineLine.across(geometry, línea)):
+    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: relacion('LineLine.across', geometry, línea)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_estar_separado_de_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error si esta toca (cruza, está dentro, etc) algún área del archivo de dibujo.'
     if type(geometry) is not digi3d.Line:
         return
 
-    if algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: not digi3d.relations.LineArea.disjoint(geometry, área)):
+    if algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: not relacion('LineArea.disjoint', geometry, área)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_estar_separado_de_linea(geometry, adding_geometry, code_index, código_o_etiqueta_lineas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error si se encuentra en el archivo de dibujo otra línea que no sea disjunta con esta.'
     if type(geometry) is not digi3d.Line:
         return
 
-    if alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: not digi3d.relations.LineLine.disjoint(geometry, línea)):
+    if alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: not relacion('LineLine.disjoint', geometry, línea)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_ser_igual_a_linea(geometry, adding_geometry, code_index, código_o_etiqueta_lineas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error si se encuentra en el archivo de dibujo otra línea que no sea igual que esta.'
     if type(geometry) is not digi3d.Line:
         return
 
-    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: digi3d.relations.LineLine.equal(geometry, línea)):
+    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: relacion('LineLine.equal', geometry, línea)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_unirse_con_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error si esta no se une con algún área del archivo de dibujo.'
     if type(geometry) is not digi3d.Line:
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.LineArea.join(geometry, área)):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('LineArea.join', geometry, área)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_unirse_con_linea(geometry, adding_geometry, code_index, código_o_etiqueta_lineas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error ésta no se une con ninguna línea del archivo de dibujo.'
     if type(geometry) is not digi3d.Line:
         return
 
-    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: digi3d.relations.LineLine.join(geometry, línea)):
+    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: relacion('LineLine.join', geometry, línea)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_solapar_linea(geometry, adding_geometry, code_index, código_o_etiqueta_lineas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error ésta no solapa con ninguna línea del archivo de dibujo.'
     if type(geometry) is not digi3d.Line:
         return
 
-    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: digi3d.relations.LineLine.overlap(geometry, línea)):
+    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: relacion('LineLine.overlap', geometry, línea)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_terminar_dentro_de_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error si esta no termina dentro de un área del archivo de dibujo.'
     if type(geometry) is not digi3d.Line:
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.LineArea.terminates_within(geometry, área)):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('LineArea.terminates_within', geometry, área)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_terminar_en_borde_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error si esta no termina en el borde de un área del archivo de dibujo.'
     if type(geometry) is not digi3d.Line:
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.LineArea.endpoint_join(geometry, área)):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('LineArea.endpoint_join', geometry, área)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_terminar_en_extremo_de_linea(geometry, adding_geometry, code_index, código_o_etiqueta_lineas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error ésta no termina en el extremo de otra línea del archivo de dibujo.'
     if type(geometry) is not digi3d.Line:
         return
 
-    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: digi3d.relations.LineLine.endpoint_join_endpoint(geometry, línea)):
+    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: relacion('LineLine.endpoint_join_endpoint', geometry, línea)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_debe_terminar_en_linea(geometry, adding_geometry, code_index, código_o_etiqueta_lineas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error ésta no termina en otra línea del archivo de dibujo.'
     if type(geometry) is not digi3d.Line:
         return
 
-    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: digi3d.relations.LineLine.endpoint_join_excluding_endpoints(geometry, línea)):
+    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: relacion('LineLine.endpoint_join_excluding_endpoints', geometry, línea)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_punto_debe_coincidir_con_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es un punto, comunica un error si este no coincide con un área del archivo de dibujo.'
     if type(geometry) is not digi3d.Point:
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.PointArea.coincident(geometry, área)):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('PointArea.coincident', geometry, área)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_punto_debe_coincidir_con_extremo_linea(geometry, adding_geometry, code_index, código_o_etiqueta_lineas_analizar, mensaje):
     'Si la geometría que se está analizando es un punto, comunica un error si este no termina en el extremo de otra línea del archivo de dibujo.'
     if type(geometry) is not digi3d.Point:
         return
 
-    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: digi3d.relations.PointLine.coincident_and_terminate(geometry, línea)):
+    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: relacion('PointLine.coincident_and_terminate', geometry, línea)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_punto_debe_coincidir_con_linea(geometry, adding_geometry, code_index, código_o_etiqueta_lineas_analizar, mensaje):
     'Si la geometría que se está analizando es un punto, comunica un error si este no termina en una línea (excluyendo sus extremos) del archivo de dibujo.'
     if type(geometry) is not digi3d.Point:
         return
 
-    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: digi3d.relations.PointLine.coincident(geometry, línea)):
+    if not alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: relacion('PointLine.coincident', geometry, línea)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_punto_debe_coincidir_con_punto(geometry, adding_geometry, code_index, código_o_etiqueta_puntos_analizar, mensaje):
     'Si la geometría que se está analizando es un punto, comunica un error si este no coincide con otro punto del archivo de dibujo.'
     if type(geometry) is not digi3d.Point:
         return
 
-    if not algun_punto_con_codigo(geometry, código_o_etiqueta_puntos_analizar, lambda punto: digi3d.relations.PointPoint.coincident(geometry, punto)):
+    if not algun_punto_con_codigo(geometry, código_o_etiqueta_puntos_analizar, lambda punto: relacion('PointPoint.coincident', geometry, punto)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_punto_debe_estar_separado_de_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es un punto, comunica un error si este no es disjunto con algún área del archivo de dibujo.'
     if type(geometry) is not digi3d.Point:
         return
 
-    if algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: not digi3d.relations.PointArea.disjoint(geometry, área)):
+    if algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: not relacion('PointArea.disjoint', geometry, área)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_punto_debe_estar_separado_de_linea(geometry, adding_geometry, code_index, código_o_etiqueta_lineas_analizar, mensaje):
     'Si la geometría que se está analizando es un punto, comunica un error si este no es disjunto con alguna línea del archivo de dibujo.'
     if type(geometry) is not digi3d.Point:
         return
 
-    if alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: not digi3d.relations.PointLine.disjoint(geometry, línea)):
+    if alguna_linea_con_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: not relacion('PointLine.disjoint', geometry, línea)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_punto_debe_estar_separado_de_punto(geometry, adding_geometry, code_index, código_o_etiqueta_puntos_analizar, mensaje):
     'Si la geometría que se está analizando es un punto, comunica un error si este no es disjunto con otro punto del archivo de dibujo.'
     if type(geometry) is not digi3d.Point:
         return
 
-    if algun_punto_con_codigo(geometry, código_o_etiqueta_puntos_analizar, lambda punto: not digi3d.relations.PointPoint.disjoint(geometry, punto)):
+    if algun_punto_con_codigo(geometry, código_o_etiqueta_puntos_analizar, lambda punto: not relacion('PointPoint.disjoint', geometry, punto)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_punto_debe_estar_en_el_interior_de_area(geometry, adding_geometry, code_index, código_o_etiqueta_areas_analizar, mensaje):
     'Si la geometría que se está analizando es un punto, comunica un error si este no está en el interior de algún área del archivo de dibujo.'
     if type(geometry) is not digi3d.Point:
         return
 
-    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: digi3d.relations.PointArea.within(geometry, área)):
+    if not algun_area_con_codigo(geometry, código_o_etiqueta_areas_analizar, lambda área: relacion('PointArea.within', geometry, área)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
@@ -656,7 +2136,7 @@ def debe_tener_area_igual_o_mayor(geometry, adding_geometry, code_index, area_mi
     '''Si el archivo de dibujo está en coordenadas geográficas, el valor devuelto por la propiedad .area de la geometría estará
     calculado con las coordenadas en grados. Para solucionar este problema, utilizamos la calculadora geográfica de la ventana de 
     dibujo que sabe en qué sistema de coordenadas, está y en caso de ser geográfico, calcula el área en metros cuadrados'''
-    if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) < area_minima:
+    if abs(metrica_geometria(geometry, 'area')) < area_minima:
         return digi3d.GeometryError('Las geometrías con el código {} deben ser tener un área mayor o igual que {}'.format(geometry.codes[0].name, area_minima))
 
 @quality_control()
@@ -666,7 +2146,7 @@ def debe_tener_perimetro_mayor_o_igual(geometry, adding_geometry, code_index, pe
     '''Si el archivo de dibujo está en coordenadas geográficas, el valor devuelto por la propiedad .perimeter_2d de la geometría estará
     calculado con las coordenadas en grados. Para solucionar este problema, utilizamos la calculadora geográfica de la ventana de 
     dibujo que sabe en qué sistema de coordenadas está, y en caso de ser geográfico, calcula el área en metros cuadrados'''
-    if digi3d.current_view().geographic_calculator.perimeter_2d(geometry) >= perimetro:
+    if metrica_geometria(geometry, 'perimetro') >= perimetro:
         return
     return digi3d.GeometryError('Las geometrías con el código {} deben ser tener un perímetro mayor o igual que {}'.format(geometry.codes[0].name, perimetro))
 
@@ -677,7 +2157,7 @@ def debe_tener_perimetro_mayor(geometry, adding_geometry, code_index, perimetro)
     '''Si el archivo de dibujo está en coordenadas geográficas, el valor devuelto por la propiedad .perimeter_2d de la geometría estará
     calculado con las coordenadas en grados. Para solucionar este problema, utilizamos la calculadora geográfica de la ventana de 
     dibujo que sabe en qué sistema de coordenadas está, y en caso de ser geográfico, calcula el área en metros cuadrados'''
-    if digi3d.current_view().geographic_calculator.perimeter_2d(geometry) > perimetro:
+    if metrica_geometria(geometry, 'perimetro') > perimetro:
         return
     return digi3d.GeometryError('Las geometrías con el código {} deben ser tener un perímetro mayor que {}'.format(geometry.codes[0].name, perimetro))
 
@@ -687,334 +2167,154 @@ def debe_tener_todos_los_vertices_con_la_misma_coordenada_z(geometry, adding_geo
     if digi3d.same_coordinates(geometry.min[2], geometry.max[2]):
         return
     
-    zInicial = geometry[0][2]
-    for coordenada in geometry:
-        if coordenada[2] != zInicial:
-            return digi3d.GeometryError('Las geometrías con este código deben tener todos los vértices con la misma coordenada Z', coordenada)
+    for vertice in vertices_con_z_distinta(geometry, geometry[0][2]):
+        return digi3d.GeometryError('Las geometrías con este código deben tener todos los vértices con la misma coordenada Z', geometry[vertice])
         
 @quality_control()
 def debe_tener_coordenadas_z_crecientes(geometry, adding_geometry, code_index):
     'Comunica un error si se localiza un vértice cuya coordenada Z sea inferior o igual a la coordenada Z del vértice anterior.'
-    zPrevia = None
-
-    for coordenada in geometry:
-        if zPrevia is None:
-            zPrevia = coordenada[2]
-            continue
-
-        zActual = coordenada[2]
-
-        if zActual <= zPrevia:
-            return digi3d.GeometryError("Vértice con la Z inferior o igual al anterior", coordenada)
-
-        zPrevia = zActual
+    for vertice in vertices_con_salto_z(geometry, operator.le):
+        return digi3d.GeometryError("Vértice con la Z inferior o igual al anterior", geometry[vertice])
 
 @quality_control()
 def debe_tener_coordenadas_z_crecientes_moderado(geometry, adding_geometry, code_index):
     'Comunica un error si se localiza un vértice cuya coordenada Z sea inferior a la coordenada Z del vértice anterior.'
-    zPrevia = geometry[0][2]
-
-    for coordenada in geometry:
-        zActual = coordenada[2]
-
-        if zActual < zPrevia:
-            return digi3d.GeometryError("Vértice con la Z inferior al anterior", coordenada)
-
-        zPrevia = zActual
+    for vertice in vertices_con_salto_z(geometry, operator.lt):
+        return digi3d.GeometryError("Vértice con la Z inferior al anterior", geometry[vertice])
 
 @quality_control()
 def debe_tener_coordenadas_z_decrecientes(geometry, adding_geometry, code_index):
     'Comunica un error si se localiza un vértice cuya coordenada Z sea superior o igual a la coordenada Z del vértice anterior.'
-    zPrevia = None
-
-    for coordenada in geometry:
-        if zPrevia is None:
-            zPrevia = coordenada[2]
-            continue
-            
-        zActual = coordenada[2]
-
-        if zActual >= zPrevia:
-            return digi3d.GeometryError("Vértice con la Z superior o igual al anterior", coordenada)
-
-        zPrevia = zActual
+    for vertice in vertices_con_salto_z(geometry, operator.ge):
+        return digi3d.GeometryError("Vértice con la Z superior o igual al anterior", geometry[vertice])
 
 @quality_control()
 def debe_tener_coordenadas_z_decrecientes_moderado(geometry, adding_geometry, code_index):
     'Comunica un error si se localiza un vértice cuya coordenada Z sea superior a la coordenada Z del vértice anterior.'
-    zPrevia = geometry[0][2]
+    for vertice in vertices_con_salto_z(geometry, operator.gt):
+        return digi3d.GeometryError("Vértice con la Z superior al anterior", geometry[vertice])
 
-    for coordenada in geometry:
-        zActual = coordenada[2]
+@quality_control()
+@con_presupuesto_de_tiempo
+def al_tocar_lineas_debe_haber_una_diferencia_de_z_inferior_a(geometry, adding_geometry, code_index, código_o_etiqueta_analizar, tolerancia):
+    'Comunica un error si se localiza un cruce con otra línea y la diferencia en coordenadas Z entre las dos líneas es superior a una tolerancia.'
+    return evalua_diferencias_z_en_cruces(geometry, adding_geometry, código_o_etiqueta_analizar, [('inferior_a', tolerancia)])[0]
 
-        if zActual > zPrevia:
-            return digi3d.GeometryError("Vértice con la Z superior al anterior", coordenada)
+@quality_control()
+@con_presupuesto_de_tiempo
+def al_tocar_lineas_debe_haber_una_diferencia_de_z_inferior_o_igual_a(geometry, adding_geometry, code_index, código_o_etiqueta_analizar, tolerancia):
+    'Comunica un error si se localiza un cruce con otra línea y la diferencia en coordenadas Z entre las dos líneas es superior a una tolerancia.'
+    return evalua_diferencias_z_en_cruces(geometry, adding_geometry, código_o_etiqueta_analizar, [('inferior_o_igual_a', tolerancia)])[0]
 
-        zPrevia = zActual
+@quality_control()
+@con_presupuesto_de_tiempo
+def al_tocar_lineas_debe_haber_una_diferencia_de_z_superior_a(geometry, adding_geometry, code_index, código_o_etiqueta_analizar, tolerancia):
+    'Comunica un error si se localiza un cruce con otra línea y la diferencia en coordenadas Z entre las dos líneas es superior a una tolerancia.'
+    return evalua_diferencias_z_en_cruces(geometry, adding_geometry, código_o_etiqueta_analizar, [('superior_a', tolerancia)])[0]
 
 @quality_control()
-def al_tocar_lineas_debe_haber_una_diferencia_de_z_inferior_a(geometry, adding_geometry, code_index, código_o_etiqueta_analizar, tolerancia):
+@con_presupuesto_de_tiempo
+def al_tocar_lineas_debe_haber_una_diferencia_de_z_superior_o_igual_a(geometry, adding_geometry, code_index, código_o_etiqueta_analizar, tolerancia):
+    'Comunica un error si se localiza un cruce con otra línea y la diferencia en coordenadas Z entre las dos líneas es superior a una tolerancia.'
+    return evalua_diferencias_z_en_cruces(geometry, adding_geometry, código_o_etiqueta_analizar, [('superior_o_igual_a', tolerancia)])[0]
+
+@quality_control()
+@con_presupuesto_de_tiempo
+def al_tocar_lineas_debe_haber_una_diferencia_de_z_igual_a(geometry, adding_geometry, code_index, código_o_etiqueta_analizar, tolerancia):
     'Comunica un error si se localiza un cruce con otra línea y la diferencia en coordenadas Z entre las dos líneas es superior a una tolerancia.'
-    candidatos = no_eliminadas(digi3d.current_view())
+    return evalua_diferencias_z_en_cruces(geometry, adding_geometry, código_o_etiqueta_analizar, [('igual_a', tolerancia)])[0]
+
+@quality_control()
+@con_presupuesto_de_tiempo
+def si_es_linea_no_puede_cruzar_linea(geometry, adding_geometry, code_index, código_o_etiqueta_lineas_analizar, mensaje):
+    'Si la geometría que se está analizando es una línea, comunica un error si esta se cruza con otra línea.'
+    if type(geometry) is not digi3d.Line:
+        return
+
+    if adding_geometry:
+        # En modo interactivo nos basta con el primer cruce: analizamos primero las líneas más cercanas
+        coincide = compila_codigo_o_etiqueta(código_o_etiqueta_lineas_analizar)
+        candidatos = (g for g in geometrias_cercanas_a(geometry) if any(coincide(codigo.name) for codigo in g.codes))
+    else:
+        candidatos = geometrias_con_codigo_o_etiqueta(código_o_etiqueta_lineas_analizar)
     candidatos = cuyas_maximas_minimas_solapen_con(candidatos, geometry)
-    candidatos = que_tengan_el_codigo_o_etiqueta(candidatos, código_o_etiqueta_analizar)
 
     errores_detectados = []
 
-    intersecciones = digi3d.get_intersections(geometry, candidatos)
-    for coordenadas_interseccion in intersecciones:
-        geometrias_que_llegan_a_esta_interseccion = intersecciones[coordenadas_interseccion]
-        vertice_geometria_analizando = geometrias_que_llegan_a_esta_interseccion[geometry]
-        coordenada_de_geometria_analizando = geometry[vertice_geometria_analizando]
-        coordenada_z_comparar = coordenada_de_geometria_analizando[2]
-
-        for otra_geometria in geometrias_que_llegan_a_esta_interseccion:
-            if otra_geometria == geometry:
-                continue
+    for candidato in candidatos:
+        if candidato == geometry:
+            continue
 
-            vertice_otra_geometria = geometrias_que_llegan_a_esta_interseccion[otra_geometria]
-            coordenada_z_otra_geometria = otra_geometria[vertice_otra_geometria][2]
+        vertices_de_cruce = digi3d.relations.LineLine.get_cross_vertices(geometry, candidato, adding_geometry)
+        if len(vertices_de_cruce) == 0:
+            continue
+        
+        if adding_geometry:
+            return digi3d.GeometryRelationError(candidato, mensaje, geometry[vertices_de_cruce[0]])
 
-            diferenciaZ = abs(coordenada_z_otra_geometria - coordenada_z_comparar)
-            if diferenciaZ >= tolerancia:
-                errores_detectados.append(digi3d.GeometryError("Las geometrías se tocan con una diferencia en la coordenada Z de {} (superior o igual a {})".format(diferenciaZ, tolerancia), coordenada_de_geometria_analizando))
+        for vertice in vertices_de_cruce:
+            errores_detectados.append(digi3d.GeometryRelationError(candidato, mensaje, geometry[vertice]))
 
-                if adding_geometry:
-                    # Si estamos en modo interactivo, nos sobra con informarle al usuario del primer error
-                    return errores_detectados
+    if len(errores_detectados) == 0:
+        return
 
-    return errores_detectados
+    return errores_detectados  
 
 @quality_control()
-def al_tocar_lineas_debe_haber_una_diferencia_de_z_inferior_o_igual_a(geometry, adding_geometry, code_index, código_o_etiqueta_analizar, tolerancia):
-    'Comunica un error si se localiza un cruce con otra línea y la diferencia en coordenadas Z entre las dos líneas es superior a una tolerancia.'
-    candidatos = no_eliminadas(digi3d.current_view())
-    candidatos = cuyas_maximas_minimas_solapen_con(candidatos, geometry)
-    candidatos = que_tengan_el_codigo_o_etiqueta(candidatos, código_o_etiqueta_analizar)
-    
-    errores_detectados = []
-
-    intersecciones = digi3d.get_intersections(geometry, candidatos)
-    for coordenadas_interseccion in intersecciones:
-        geometrias_que_llegan_a_esta_interseccion = intersecciones[coordenadas_interseccion]
-        vertice_geometria_analizando = geometrias_que_llegan_a_esta_interseccion[geometry]
-        coordenada_de_geometria_analizando = geometry[vertice_geometria_analizando]
-        coordenada_z_comparar = coordenada_de_geometria_analizando[2]
+@con_presupuesto_de_tiempo
+def no_puede_estar_a_menor_distancia_que(geometry, adding_geometry, code_index, código_o_etiqueta_puntos_analizar, distancia):
+    'Si la geometría que se está analizando es de tipo punto, comprueba su distancia al resto de puntos del archivo de dibujo y devuelve error en caso de que esta sea inferior al parámetro distancia'
+    if type(geometry) is not digi3d.Point:
+        return
 
-        for otra_geometria in geometrias_que_llegan_a_esta_interseccion:
-            if otra_geometria == geometry:
-                continue
+    v = digi3d.current_view()
 
-            vertice_otra_geometria = geometrias_que_llegan_a_esta_interseccion[otra_geometria]
-            coordenada_z_otra_geometria = otra_geometria[vertice_otra_geometria][2]
+    # No podemos calcular la distancia entre puntos sin más, porque puede que la ventana de dibujo esté en coordenadas elipsoidales, de manera que las
+    # coordenadas que nos van a llegar no son ortométricas, sino ángulos. La ventana de dibujo proporciona una calculadora geográfica que calcula 
+    # distancias correctamente
+    calculadora  = v.geographic_calculator
 
-            diferenciaZ = abs(coordenada_z_otra_geometria - coordenada_z_comparar)
-            if diferenciaZ > tolerancia:
-                errores_detectados.append(digi3d.GeometryError("Las geometrías se tocan con una diferencia en la coordenada Z de {} (superior a {})".format(diferenciaZ, tolerancia), coordenada_de_geometria_analizando))
+    lista_de_puntos_cercanos = []
+    
+    for otra_geometria in geometrias_a_menor_distancia_que(geometry, código_o_etiqueta_puntos_analizar, calculadora, distancia, v, por_cercania=adding_geometry):
+        lista_de_puntos_cercanos.append(otra_geometria)
 
-                if adding_geometry:
-                    # Si estamos en modo interactivo, nos sobra con informarle al usuario del primer error
-                    return errores_detectados
+        if adding_geometry:
+            # Estamos en modo interactivo: El usuario está digitalizando una geometría, de manera que con detectar el primer error es suficiente
+            break
 
-    return errores_detectados
-
-@quality_control()
-def al_tocar_lineas_debe_haber_una_diferencia_de_z_superior_a(geometry, adding_geometry, code_index, código_o_etiqueta_analizar, tolerancia):
-    'Comunica un error si se localiza un cruce con otra línea y la diferencia en coordenadas Z entre las dos líneas es superior a una tolerancia.'
-    candidatos = no_eliminadas(digi3d.current_view())
-    candidatos = cuyas_maximas_minimas_solapen_con(candidatos, geometry)
-    candidatos = que_tengan_el_codigo_o_etiqueta(candidatos, código_o_etiqueta_analizar)
-    
-    errores_detectados = []
-
-    intersecciones = digi3d.get_intersections(geometry, candidatos)
-    for coordenadas_interseccion in intersecciones:
-        geometrias_que_llegan_a_esta_interseccion = intersecciones[coordenadas_interseccion]
-        vertice_geometria_analizando = geometrias_que_llegan_a_esta_interseccion[geometry]
-        coordenada_de_geometria_analizando = geometry[vertice_geometria_analizando]
-        coordenada_z_comparar = coordenada_de_geometria_analizando[2]
-
-        for otra_geometria in geometrias_que_llegan_a_esta_interseccion:
-            if otra_geometria == geometry:
-                continue
-
-            vertice_otra_geometria = geometrias_que_llegan_a_esta_interseccion[otra_geometria]
-            coordenada_z_otra_geometria = otra_geometria[vertice_otra_geometria][2]
-
-            diferenciaZ = abs(coordenada_z_otra_geometria - coordenada_z_comparar)
-            if diferenciaZ <= tolerancia:
-                errores_detectados.append(digi3d.GeometryError("Las geometrías se tocan con una diferencia en la coordenada Z de {} (inferior o igual a {})".format(diferenciaZ, tolerancia), coordenada_de_geometria_analizando))
-
-                if adding_geometry:
-                    # Si estamos en modo interactivo, nos sobra con informarle al usuario del primer error
-                    return errores_detectados
-
-    return errores_detectados
-
-@quality_control()
-def al_tocar_lineas_debe_haber_una_diferencia_de_z_superior_o_igual_a(geometry, adding_geometry, code_index, código_o_etiqueta_analizar, tolerancia):
-    'Comunica un error si se localiza un cruce con otra línea y la diferencia en coordenadas Z entre las dos líneas es superior a una tolerancia.'
-    candidatos = no_eliminadas(digi3d.current_view())
-    candidatos = cuyas_maximas_minimas_solapen_con(candidatos, geometry)
-    candidatos = que_tengan_el_codigo_o_etiqueta(candidatos, código_o_etiqueta_analizar)
-    
-    errores_detectados = []
-
-    intersecciones = digi3d.get_intersections(geometry, candidatos)
-    for coordenadas_interseccion in intersecciones:
-        geometrias_que_llegan_a_esta_interseccion = intersecciones[coordenadas_interseccion]
-        vertice_geometria_analizando = geometrias_que_llegan_a_esta_interseccion[geometry]
-        coordenada_de_geometria_analizando = geometry[vertice_geometria_analizando]
-        coordenada_z_comparar = coordenada_de_geometria_analizando[2]
-
-        for otra_geometria in geometrias_que_llegan_a_esta_interseccion:
-            if otra_geometria == geometry:
-                continue
-
-            vertice_otra_geometria = geometrias_que_llegan_a_esta_interseccion[otra_geometria]
-            coordenada_z_otra_geometria = otra_geometria[vertice_otra_geometria][2]
-
-            diferenciaZ = abs(coordenada_z_otra_geometria - coordenada_z_comparar)
-            if diferenciaZ < tolerancia:
-                errores_detectados.append(digi3d.GeometryError("Las geometrías se tocan con una diferencia en la coordenada Z de {} (inferior a {})".format(diferenciaZ, tolerancia), coordenada_de_geometria_analizando))
-
-                if adding_geometry:
-                    # Si estamos en modo interactivo, nos sobra con informarle al usuario del primer error
-                    return errores_detectados
-
-    return errores_detectados
-
-@quality_control()
-def al_tocar_lineas_debe_haber_una_diferencia_de_z_igual_a(geometry, adding_geometry, code_index, código_o_etiqueta_analizar, tolerancia):
-    'Comunica un error si se localiza un cruce con otra línea y la diferencia en coordenadas Z entre las dos líneas es superior a una tolerancia.'
-    candidatos = no_eliminadas(digi3d.current_view())
-    candidatos = cuyas_maximas_minimas_solapen_con(candidatos, geometry)
-    candidatos = que_tengan_el_codigo_o_etiqueta(candidatos, código_o_etiqueta_analizar)
-    
-    errores_detectados = []
-
-    intersecciones = digi3d.get_intersections(geometry, candidatos)
-    for coordenadas_interseccion in intersecciones:
-        geometrias_que_llegan_a_esta_interseccion = intersecciones[coordenadas_interseccion]
-        vertice_geometria_analizando = geometrias_que_llegan_a_esta_interseccion[geometry]
-        coordenada_de_geometria_analizando = geometry[vertice_geometria_analizando]
-        coordenada_z_comparar = coordenada_de_geometria_analizando[2]
-
-        for otra_geometria in geometrias_que_llegan_a_esta_interseccion:
-            if otra_geometria == geometry:
-                continue
-
-            vertice_otra_geometria = geometrias_que_llegan_a_esta_interseccion[otra_geometria]
-            coordenada_z_otra_geometria = otra_geometria[vertice_otra_geometria][2]
-
-            diferenciaZ = abs(coordenada_z_otra_geometria - coordenada_z_comparar)
-            if diferenciaZ != tolerancia:
-                errores_detectados.append(digi3d.GeometryError("Intersección en la que la diferencia en coordenada Z es {} (distinto a {})".format(diferenciaZ, tolerancia), coordenada_de_geometria_analizando))
-
-                if adding_geometry:
-                    # Si estamos en modo interactivo, nos sobra con informarle al usuario del primer error
-                    return errores_detectados
-
-    return errores_detectados
-
-@quality_control()
-def si_es_linea_no_puede_cruzar_linea(geometry, adding_geometry, code_index, código_o_etiqueta_lineas_analizar, mensaje):
-    'Si la geometría que se está analizando es una línea, comunica un error si esta se cruza con otra línea.'
-    if type(geometry) is not digi3d.Line:
-        return
-
-    candidatos = no_eliminadas(digi3d.current_view())
-    candidatos = cuyas_maximas_minimas_solapen_con(candidatos, geometry)
-    candidatos = que_tengan_el_codigo_o_etiqueta(candidatos, código_o_etiqueta_lineas_analizar)
-
-    errores_detectados = []
-
-    for candidato in candidatos:
-        if candidato == geometry:
-            continue
-
-        vertices_de_cruce = digi3d.relations.LineLine.get_cross_vertices(geometry, candidato, adding_geometry)
-        if len(vertices_de_cruce) == 0:
-            continue
-        
-        if adding_geometry:
-            return digi3d.GeometryRelationError(candidato, mensaje, geometry[vertices_de_cruce[0]])
-
-        for vertice in vertices_de_cruce:
-            errores_detectados.append(digi3d.GeometryRelationError(candidato, mensaje, geometry[vertice]))
-
-    if len(errores_detectados) == 0:
-        return
-
-    return errores_detectados  
-
-@quality_control()
-def no_puede_estar_a_menor_distancia_que(geometry, adding_geometry, code_index, código_o_etiqueta_puntos_analizar, distancia):
-    'Si la geometría que se está analizando es de tipo punto, comprueba su distancia al resto de puntos del archivo de dibujo y devuelve error en caso de que esta sea inferior al parámetro distancia'
-    if type(geometry) is not digi3d.Point:
-        return
-
-    v = digi3d.current_view()
-
-    # No podemos calcular la distancia entre puntos sin más, porque puede que la ventana de dibujo esté en coordenadas elipsoidales, de manera que las
-    # coordenadas que nos van a llegar no son ortométricas, sino ángulos. La ventana de dibujo proporciona una calculadora geográfica que calcula 
-    # distancias correctamente
-    calculadora  = v.geographic_calculator
-
-    lista_de_puntos_cercanos = []
-    
-    for otra_geometria in que_tengan_el_codigo_o_etiqueta(no_eliminadas(v), código_o_etiqueta_puntos_analizar):
-        if otra_geometria == geometry:
-            continue
-
-        if distancia_menor_que(geometry, otra_geometria, calculadora, distancia):
-            lista_de_puntos_cercanos.append(otra_geometria)
-
-            if adding_geometry:
-                # Estamos en modo interactivo: El usuario está digitalizando una geometría, de manera que con detectar el primer error es suficiente
-                break
-
-    if( len(lista_de_puntos_cercanos) > 0):
-        return digi3d.GeometryRelationError(lista_de_puntos_cercanos, 'Este punto está muy cerca de estos puntos')
+    if( len(lista_de_puntos_cercanos) > 0):
+        return digi3d.GeometryRelationError(lista_de_puntos_cercanos, 'Este punto está muy cerca de estos puntos')
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def si_es_linea_solo_puede_continuar_con_lineas_con_codigo(geometry, adding_geometry, code_index, código_o_etiqueta_lineas_analizar, mensaje):
     'Si la geometría que se está analizando es una línea, comunica un error ésta continua con otra que no tenga el código o códigos especificados.'
     if type(geometry) is not digi3d.Line:
         return
 
-    if alguna_linea_sin_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: digi3d.relations.LineLine.endpoint_join_endpoint(geometry, línea)):
+    if alguna_linea_sin_codigo(geometry, código_o_etiqueta_lineas_analizar, lambda línea: relacion('LineLine.endpoint_join_endpoint', geometry, línea)):
         return digi3d.GeometryError(mensaje)
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def marcar_error_si_diferencia_z_al_proyectar_mdt_superior_a(geometry, adding_geometry, code_index, distancia):
     'Proyecta los vértices de la geometría contra los MDTs cargados y genera un error si la diferencia en la coordenada Z entre un vértice y algún MDT es superior a una distancia'
-    v = digi3d.current_view()
-
-    for coordenada in geometry:
-        z_proyectada = v.project(coordenada)
-
-        if z_proyectada is None:
-            continue
+    error = primer_vertice_con_diferencia_z_mdt(geometry, operator.gt, distancia)
 
-        distancia_calculada = abs(z_proyectada - coordenada[2])
-        if distancia_calculada > distancia:
-            return digi3d.GeometryError('Vértice de la geometría con una diferencia en Z con respecto al MDT de: {} que es superior a: {}'.format(distancia_calculada, distancia), coordenada)
+    if error is not None:
+        vertice, distancia_calculada = error
+        return digi3d.GeometryError('Vértice de la geometría con una diferencia en Z con respecto al MDT de: {} que es superior a: {}'.format(distancia_calculada, distancia), geometry[vertice])
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def marcar_error_si_diferencia_z_al_proyectar_mdt_inferior_a(geometry, adding_geometry, code_index, distancia):
     'Proyecta los vértices de la geometría contra los MDTs cargados y genera un error si la diferencia en la coordenada Z entre un vértice y algún MDT es inferior a una distancia'
-    v = digi3d.current_view()
-
-    for coordenada in geometry:
-        z_proyectada = v.project(coordenada)
+    error = primer_vertice_con_diferencia_z_mdt(geometry, operator.lt, distancia)
 
-        if z_proyectada is None:
-            continue
-
-        distancia_calculada = abs(z_proyectada - coordenada[2])
-        if distancia_calculada < distancia:
-            return digi3d.GeometryError('Vértice de la geometría con una diferencia en Z con respecto al MDT de: {} que es inferior a: {}'.format(distancia_calculada, distancia), coordenada)
+    if error is not None:
+        vertice, distancia_calculada = error
+        return digi3d.GeometryError('Vértice de la geometría con una diferencia en Z con respecto al MDT de: {} que es inferior a: {}'.format(distancia_calculada, distancia), geometry[vertice])
 
 @quality_control()
 def la_coordenada_z_del_primer_vertice_debe_ser_el_de_una_curva_maestra(geometry, adding_geometry, code_index):
@@ -1031,7 +2331,8 @@ def la_coordenada_z_del_primer_vertice_debe_ser_el_de_una_curva_fina(geometry, a
 @quality_control()
 def debe_tener_ancho_y_alto_mayor_o_igual_valor_o_linea(geometry, adding_geometry, code_index, ancho, alto):
     'Comunica un error si el ancho y el largo no son mayores que los parámetros'
-    ancho_geometria, alto_geometria, _ = geometry.max - geometry.min
+    ancho_geometria = metrica_geometria(geometry, 'ancho')
+    alto_geometria = metrica_geometria(geometry, 'alto')
 
     if min(ancho_geometria, alto_geometria) >= ancho and max(ancho_geometria, alto_geometria) >= alto:
         return
@@ -1039,724 +2340,966 @@ def debe_tener_ancho_y_alto_mayor_o_igual_valor_o_linea(geometry, adding_geometr
     return digi3d.GeometryError('Esta geometría tiene un ancho inferior a {} y un largo inferior a {} y por lo tanto debería haberse digitalizado como una línea')
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def marcar_error_si_diferencia_z_de_zetas_absolutas_al_proyectar_mdt_es_superior_a_valor(geometry, adding_geometry, code_index, distancia):
     'Proyecta los vértices de la geometría contra los MDTs cargados y genera un error si la diferencia entre el valor absoluto de la Z de algún vértice y el valor absoluto de la proyección en el MDT es superior a una distancia'
-    v = digi3d.current_view()
-
-    for coordenada in geometry:
-        z_proyectada = v.project(coordenada)
+    error = primer_vertice_con_diferencia_z_mdt(geometry, operator.gt, distancia, partes_enteras=True)
 
-        if z_proyectada is None:
-            continue
-
-        distancia_calculada = abs(int(z_proyectada) - int(coordenada[2]))
-        if distancia_calculada > distancia:
-            return digi3d.GeometryError('Vértice de la geometría con una diferencia en Z con respecto al MDT de: {} que es superior a: {}'.format(distancia_calculada, distancia), coordenada)
+    if error is not None:
+        vertice, distancia_calculada = error
+        return digi3d.GeometryError('Vértice de la geometría con una diferencia en Z con respecto al MDT de: {} que es superior a: {}'.format(distancia_calculada, distancia), geometry[vertice])
 
 @quality_control()
+@con_presupuesto_de_tiempo
 def marcar_error_si_diferencia_z_de_zetas_absolutas_al_proyectar_mdt_es_interior_a_valor(geometry, adding_geometry, code_index, distancia):
     'Proyecta los vértices de la geometría contra los MDTs cargados y genera un error si la diferencia entre el valor absoluto de la Z de algún vértice y el valor absoluto de la proyección en el MDT es inferios a una distancia'
-    v = digi3d.current_view()
+    error = primer_vertice_con_diferencia_z_mdt(geometry, operator.lt, distancia, partes_enteras=True)
 
-    for coordenada in geometry:
-        z_proyectada = v.project(coordenada)
+    if error is not None:
+        vertice, distancia_calculada = error
+        return digi3d.GeometryError('Vértice de la geometría con una diferencia en Z con respecto al MDT de: {} que es superior a: {}'.format(distancia_calculada, distancia), geometry[vertice])
 
-        if z_proyectada is None:
-            continue
+# Ejecución de controles de calidad sobre todo el archivo de dibujo  --------------------------------------------------------------------------
 
-        distancia_calculada = abs(int(z_proyectada) - int(coordenada[2]))
-        if distancia_calculada < distancia:
-            return digi3d.GeometryError('Vértice de la geometría con una diferencia en Z con respecto al MDT de: {} que es superior a: {}'.format(distancia_calculada, distancia), coordenada)
+class ControlConfigurado:
+    'Control de calidad configurado para un código: la función de control de calidad y los valores de sus parámetros adicionales'
+    def __init__(self, control, parametros):
+        self.funcion = globals()[control] if isinstance(control, str) else control
+        self.nombre = control if isinstance(control, str) else getattr(control, '__name__', repr(control))
+        self.parametros = tuple(parametros)
 
-# Reglas para la representación de geometrías --------------------------------------------------------------------------
+    def ejecuta(self, geometria, adding_geometry, code_index):
+        'Ejecuta el control de calidad sobre la geometría y devuelve la lista de errores detectados'
+        return errores_como_lista(self.funcion(geometria, adding_geometry, code_index, *self.parametros))
 
-# Reglas que cambian el color  --------------------------------------------------------------------------
+def errores_como_lista(resultado):
+    'Convierte el valor devuelto por una función de control de calidad (nada, un error o una lista de errores) en una lista de errores'
+    if resultado is None:
+        return []
 
-@dynamic_representation_rule()
-def asignar_color(geometry, code_drawing, representations, nombre_codigo, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo (admite comodines)'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+    if isinstance(resultado, (list, tuple)):
+        return list(resultado)
 
-	representations[0].color = texto_a_color(color_asignar)
-	return representations
-
-@dynamic_representation_rule()
-def asignar_color_si_atributo_bbdd_menor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor inferior que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
+    return [resultado]
 
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if compara_valor_menor_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
-
-@dynamic_representation_rule()
-def asignar_color_si_atributo_bbdd_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor inferior que igual a valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if compara_valor_menor_igual_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].color = texto_a_color(color_asignar)
+def compila_configuracion_controles(controles_por_codigo):
+    '''Convierte la configuración de controles de calidad en una lista de tuplas (función que indica si un código coincide, lista de ControlConfigurado).
+    Argumentos:
+        controles_por_codigo: diccionario cuya clave es el código (admite comodines y etiquetas precedidas de #) y cuyo valor es una lista de tuplas
+                              (función de control de calidad o su nombre, parámetro1, parámetro2, ...).
+    '''
+    configuracion = []
 
-	return representations
+    for nombre_codigo_o_etiqueta, controles in controles_por_codigo.items():
+        controles_configurados = [ControlConfigurado(control[0], control[1:]) for control in controles]
+        configuracion.append((compila_codigo_o_etiqueta(nombre_codigo_o_etiqueta), controles_configurados))
 
-@dynamic_representation_rule()
-def asignar_color_si_atributo_bbdd_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene el valor valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+    return configuracion
 
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
+def tareas_control_de_calidad(controles_por_codigo):
+    '''Devuelve, en el orden del archivo de dibujo, las tuplas (geometría, índice del código, ControlConfigurado) que hay que evaluar para aplicar
+    la configuración de controles de calidad a todas las geometrías no eliminadas de la ventana de dibujo activa.
+    '''
+    configuracion = compila_configuracion_controles(controles_por_codigo)
+    controles_por_nombre = {}
+
+    for g in no_eliminadas(list(estado_vista().geometrias)):
+        for code_index, codigo in enumerate(g.codes):
+            controles = controles_por_nombre.get(codigo.name)
+
+            if controles is None:
+                controles = [control for coincide, controles_configurados in configuracion if coincide(codigo.name) for control in controles_configurados]
+                controles_por_nombre[codigo.name] = controles
+
+            for control in controles:
+                yield g, code_index, control
+
+class TokenCancelacion:
+    'Permite cancelar desde otro hilo (por ejemplo desde la interfaz de usuario) una ejecución de controles de calidad en curso'
+    def __init__(self):
+        self.evento = threading.Event()
+
+    def cancela(self):
+        'Solicita la cancelación: las tareas que no han empezado ya no se ejecutan'
+        self.evento.set()
+
+    @property
+    def cancelado(self):
+        return self.evento.is_set()
+
+@con_cache_mdt
+def ejecuta_controles_de_calidad(controles_por_codigo, agrupa_pares_simetricos=False, token=None, cache=None):
+    '''Ejecuta en una sola pasada sobre todo el archivo de dibujo de la ventana activa los controles de calidad configurados para cada código.
+    Todos los controles comparten los índices de la ventana de dibujo (geometrías no eliminadas, códigos, cajas envolventes), que se calculan una sola vez.
+    El resultado es el mismo que el de ejecutar cada control por separado desde el menú de Control de Calidad.
+    Argumentos:
+        controles_por_codigo: diccionario cuya clave es el código (admite comodines y etiquetas precedidas de #) y cuyo valor es una lista de tuplas
+                              (función de control de calidad o su nombre, parámetro1, parámetro2, ...).
+        agrupa_pares_simetricos: si es verdadero, los controles de controles_simetricos evalúan cada par de geometrías una sola vez. Los errores
+                                 son los mismos: cada geometría del par recibe su digi3d.GeometryRelationError con la otra geometría.
+        token: TokenCancelacion con el que se puede cancelar la ejecución. Si se cancela, se devuelven los errores de las tareas que habían terminado.
+        cache: CachePersistente con los controles que no detectaron errores en ejecuciones anteriores, que no se vuelven a evaluar si no ha cambiado
+               la geometría ni sus vecinas. Se actualiza con los controles que no detectan errores en esta ejecución.
+    Los controles se evalúan en el hilo que llama a la función, que tiene que ser el de Digi3D.NET porque los controles utilizan digi3d.
+    Devuelve una lista de tuplas (geometría, índice del código, nombre del control de calidad, lista de errores) con los controles que han detectado algún error,
+    en el orden del archivo de dibujo. Detrás se añaden los errores de las evaluaciones aplazadas al almacenar geometrías (ver con_presupuesto_de_tiempo)
+    de controles que no están en la configuración.
+    '''
+    # Cada ejecución vuelve a consultar las etiquetas en la tabla de códigos, por si se han editado
+    estado_vista().descarta_etiquetas()
+    pares_simetricos = {}
+    resultados = []
+    evaluadas = set()
+
+    for g, code_index, control in tareas_control_de_calidad(controles_por_codigo):
+        if token is not None and token.cancelado:
+            break
+
+        evaluadas.add((g, code_index, control.nombre))
+
+        if agrupa_pares_simetricos and control.nombre in controles_simetricos:
+            errores = evalua_control_simetrico(g, control, pares_simetricos)
+        else:
+            clave = cache.clave(g, code_index, control) if cache is not None else None
+            if clave is not None and cache.sin_errores(clave):
+                continue
 
-	if nombre_atributo not in atributosCodigo:
-		return representations
+            errores = control.ejecuta(g, False, code_index)
+
+            if clave is not None and not errores:
+                cache.anota_sin_errores(clave)
+
+        if errores:
+            resultados.append((g, code_index, control.nombre, errores))
+
+    if cache is not None:
+        cache.guarda()
+
+    if not (token is not None and token.cancelado):
+        resultados.extend(recoge_errores_diferidos(evaluadas))
+
+    return resultados
+
+def errores_solapamiento_areas(a, b):
+    'Devuelve las coordenadas de los errores de cada área del par: una coordenada (None) en cada una si las áreas se solapan'
+    if relacion('AreaArea.overlap', a, b)[0]:
+        return [None], [None]
+    return [], []
+
+def errores_lineas_no_disjuntas(a, b):
+    'Devuelve las coordenadas de los errores de cada línea del par: una coordenada (None) en cada una si las líneas no son disjuntas'
+    if not relacion('LineLine.disjoint', a, b):
+        return [None], [None]
+    return [], []
+
+def errores_cruce_lineas(a, b):
+    'Devuelve las coordenadas de la línea a en las que se cruza con la línea b y las de la línea b en las que se cruza con la línea a'
+    coordenadas = [a[vertice] for vertice in digi3d.relations.LineLine.get_cross_vertices(a, b, False)]
+    if not coordenadas:
+        # Si a no cruza b, b tampoco cruza a
+        return [], []
+    return coordenadas, [b[vertice] for vertice in digi3d.relations.LineLine.get_cross_vertices(b, a, False)]
+
+# Controles de calidad simétricos: para cada uno, función que indica si una geometría puede tener el error, función que indica si una geometría
+# puede ser la otra geometría del par y función que devuelve las coordenadas de los errores de cada geometría del par.
+# Si las coordenadas son None, el control comunica un único digi3d.GeometryError con el mensaje; si no, un digi3d.GeometryRelationError por coordenada
+controles_simetricos = {
+    'si_es_area_no_puede_solapar_otra_area': (es_area, es_area, errores_solapamiento_areas),
+    'si_es_linea_debe_estar_separado_de_linea': (lambda g: type(g) is digi3d.Line, lambda g: type(g) is digi3d.Line, errores_lineas_no_disjuntas),
+    'si_es_linea_no_puede_cruzar_linea': (lambda g: type(g) is digi3d.Line, lambda g: True, errores_cruce_lineas),
+}
+
+def evalua_control_simetrico(geometria, control, pares_simetricos):
+    '''Evalúa un control de controles_simetricos sobre la geometría analizando cada par de geometrías una sola vez.
+    Al evaluar un par se obtienen los errores de las dos geometrías. Si la otra geometría también puede tener este control y aún no se ha analizado,
+    sus errores se guardan para devolverlos cuando se analice, de manera que cada geometría recibe los mismos errores que si se ejecutase el control
+    sobre ella por separado.
+    Argumentos:
+        geometria: Geometría que se está analizando.
+        control: ControlConfigurado cuyos parámetros son (código o etiqueta de las otras geometrías, mensaje).
+        pares_simetricos: diccionario en el que se guardan, para cada control y parámetros, las geometrías ya analizadas durante la ejecución y las
+                          coordenadas de los errores de los pares evaluados pendientes de devolver a la otra geometría.
+    '''
+    admite_geometria, admite_otra_geometria, errores_par = controles_simetricos[control.nombre]
+    nombre_codigo_o_etiqueta, mensaje = control.parametros
 
-	if compara_valor_igual_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].color = texto_a_color(color_asignar)
+    analizadas, pendientes = pares_simetricos.setdefault((control.nombre, control.parametros), (set(), {}))
+    if not admite_geometria(geometria):
+        return []
+    analizadas.add(geometria)
 
-	return representations
+    # Si la geometría analizada no puede ser la otra geometría del par (no tiene el código buscado), las otras geometrías no la evalúan
+    es_candidata = admite_otra_geometria(geometria) and tiene_el_codigo_o_etiqueta(geometria, nombre_codigo_o_etiqueta)
 
-@dynamic_representation_rule()
-def asignar_color_si_atributo_bbdd_mayor_o_igual(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor mayor o igual que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+    candidatos = geometrias_con_codigo_o_etiqueta(nombre_codigo_o_etiqueta)
+    candidatos = cuyas_maximas_minimas_solapen_con(candidatos, geometria)
 
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
+    errores = []
+    for otra_geometria in candidatos:
+        if otra_geometria == geometria or not admite_otra_geometria(otra_geometria):
+            continue
 
-	if nombre_atributo not in atributosCodigo:
-		return representations
+        coordenadas = pendientes.pop((geometria, otra_geometria), None)
+        if coordenadas is None:
+            coordenadas, coordenadas_otra_geometria = errores_par(geometria, otra_geometria)
 
-	if compara_valor_mayor_igual_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].color = texto_a_color(color_asignar)
+            if es_candidata and otra_geometria not in analizadas and admite_geometria(otra_geometria):
+                pendientes[(otra_geometria, geometria)] = coordenadas_otra_geometria
 
-	return representations
+        for coordenada in coordenadas:
+            if coordenada is None:
+                # Los pares que quedan por evaluar se evaluarán al analizar las otras geometrías
+                return [digi3d.GeometryError(mensaje)]
 
-@dynamic_representation_rule()
-def asignar_color_si_atributo_bbdd_mayor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor mayor que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+            errores.append(digi3d.GeometryRelationError(otra_geometria, mensaje, coordenada))
 
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
+    return errores
 
-	if nombre_atributo not in atributosCodigo:
-		return representations
+# Ejecución incremental  --------------------------------------------------------------------------
 
-	if compara_valor_mayor_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].color = texto_a_color(color_asignar)
+@functools.lru_cache(maxsize=None)
+def control_depende_de_otras_geometrias(funcion):
+    'Devuelve verdadero si el control de calidad compara la geometría con otras geometrías (tiene algún parámetro con el código o etiqueta de las otras geometrías)'
+    return any('código_o_etiqueta' in parametro for parametro in inspect.signature(funcion).parameters)
 
-	return representations
+def radio_distancia_minima(g, parametros):
+    'Radio de influencia de no_puede_estar_a_menor_distancia_que'
+    escala_minima = min(escala_local(g[0], digi3d.current_view().geographic_calculator))
+    if escala_minima <= 0:
+        return None
+    return radio_busqueda_distancia(parametros[1], escala_minima)
 
-@dynamic_representation_rule()
-def asignar_color_si_atributo_bbdd_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor nulo'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+# Controles de calidad cuyo resultado puede depender de geometrías más alejadas que las que tocan su caja envolvente: función que recibe la geometría
+# y los parámetros del control y devuelve la distancia a la que puede estar una geometría que influya en el resultado (None si puede estar en cualquier sitio)
+radios_controles = {
+    'no_puede_estar_a_menor_distancia_que': radio_distancia_minima,
+}
 
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
+def radio_influencia_control(control, g):
+    ''' Devuelve la distancia alrededor de la caja envolvente de la geometría dentro de la cual una modificación puede cambiar el resultado del control,
+        None si la modificación puede estar en cualquier sitio o -1 si el control solo depende de la propia geometría.
+    '''
+    if control.nombre in radios_controles:
+        return radios_controles[control.nombre](g, control.parametros)
+
+    if control_depende_de_otras_geometrias(control.funcion):
+        return tolerancia_cajas
+
+    return -1
+
+def firma_geometria(g):
+    'Devuelve los datos de la geometría que cambian al modificarla: su huella y los nombres de sus códigos'
+    return huella_geometria(g), tuple(codigo.name for codigo in g.codes)
+
+def caja_de_firma(firma):
+    'Devuelve la caja envolvente 2D guardada en la firma de una geometría'
+    _, minimo, maximo = firma[0]
+    return (minimo[0], minimo[1], maximo[0], maximo[1])
+
+class EjecucionIncremental:
+    ''' Ejecuciones sucesivas de la misma configuración de controles de calidad sobre la ventana de dibujo activa, que tras la primera solo vuelven a evaluar
+        lo que puede haber cambiado desde la anterior.
+        En cada ejecución se comparan las geometrías con las de la anterior: las cajas envolventes de las geometrías añadidas, eliminadas o modificadas
+        (distinta huella o códigos) son regiones modificadas. Solo se vuelven a evaluar los controles de las geometrías modificadas y los de las geometrías
+        cuya caja envolvente, ampliada con el radio de influencia del control, toca alguna región modificada. El resto reutiliza el resultado anterior.
+        Si en la tabla de códigos ha cambiado alguna de las etiquetas que se consultaron en la ejecución anterior, se vuelven a evaluar todos los controles,
+        porque la modificación afecta a todas las geometrías de los códigos implicados, estén donde estén.
+    '''
+    def __init__(self, controles_por_codigo):
+        self.controles_por_codigo = controles_por_codigo
+        self.firmas = None
+        self.etiquetas = {}
+        self.resultados = {}
+        self.regiones_modificadas = []
+        self.geometrias_modificadas = set()
+
+    def marca_geometria_modificada(self, g):
+        'Obliga a volver a evaluar la geometría y sus vecinas en la próxima ejecución (para modificaciones que no cambian su huella, como las de atributos)'
+        self.geometrias_modificadas.add(g)
+        self.regiones_modificadas.append(caja_2d(g))
+
+    @con_cache_mdt
+    def ejecuta(self, token=None):
+        ''' Ejecuta los controles de calidad y devuelve lo mismo que ejecuta_controles_de_calidad.
+            Si se cancela con el token, se devuelven los resultados obtenidos hasta entonces y la siguiente ejecución vuelve a partir de la anterior.
+        '''
+        estado = estado_vista()
+        estado.descarta_etiquetas()
+        firmas = {g: firma_geometria(g) for g in no_eliminadas(estado.geometrias)}
+
+        completa = self.firmas is None or any(estado.codigo_tiene_etiqueta(nombre_codigo, etiqueta) != tiene
+                                              for (nombre_codigo, etiqueta), tiene in self.etiquetas.items())
+        modificadas = set(self.geometrias_modificadas)
+        regiones = list(self.regiones_modificadas)
+
+        if not completa:
+            for g, firma in firmas.items():
+                anterior = self.firmas.get(g)
+                if anterior == firma:
+                    continue
+
+                modificadas.add(g)
+                regiones.append(caja_de_firma(firma))
+                if anterior is not None:
+                    regiones.append(caja_de_firma(anterior))
+
+            for g, anterior in self.firmas.items():
+                if g not in firmas:
+                    regiones.append(caja_de_firma(anterior))
+
+        cajas = estado.indice_espacial.cajas if estado.indice_espacial is not None else {}
+
+        def afectada(g, control):
+            if g in modificadas:
+                return True
 
-	if nombre_atributo not in atributosCodigo:
-		return representations
+            if not regiones:
+                return False
 
-	if atributosCodigo[nombre_atributo] is None:
-		representations[0].color = texto_a_color(color_asignar)
+            radio = radio_influencia_control(control, g)
+            if radio is None:
+                return True
+            if radio < 0:
+                return False
+
+            caja = amplia_caja(cajas[g] if g in cajas else caja_2d(g), radio)
+            return any(cajas_se_tocan(caja, region) for region in regiones)
+
+        resultados = []
+        resultados_por_tarea = {}
+        evaluadas = set()
+
+        for g, code_index, control in tareas_control_de_calidad(self.controles_por_codigo):
+            if token is not None and token.cancelado:
+                return resultados
+
+            evaluadas.add((g, code_index, control.nombre))
+            clave = (g, code_index, control.nombre, control.parametros)
+
+            if completa or afectada(g, control):
+                errores = control.ejecuta(g, False, code_index)
+            else:
+                errores = self.resultados.get(clave)
+
+            if errores:
+                resultados_por_tarea[clave] = errores
+                resultados.append((g, code_index, control.nombre, errores))
+
+        self.firmas = firmas
+        self.etiquetas = dict(estado.etiquetas_codigos)
+        self.resultados = resultados_por_tarea
+        self.regiones_modificadas = []
+        self.geometrias_modificadas = set()
+
+        resultados.extend(recoge_errores_diferidos(evaluadas))
+        return resultados
+
+# Caché persistente de resultados  --------------------------------------------------------------------------
+
+# Controles de calidad cuyo resultado depende de algo más que las coordenadas, el tipo y los códigos de las geometrías (atributos, MDTs, equidistancia),
+# y que por lo tanto no se guardan en la caché persistente
+controles_sin_cache_persistente = {
+    'debe_tener_asignado_un_atributo',
+    'debe_tener_asignado_un_atributo_con_valor_igual_a',
+    'atributo_bbdd_no_puede_ser_nulo',
+    'atributo_bbdd_debe_ser_igual',
+    'atributo_bbdd_debe_ser_mayor_o_igual',
+    'marcar_error_si_diferencia_z_al_proyectar_mdt_superior_a',
+    'marcar_error_si_diferencia_z_al_proyectar_mdt_inferior_a',
+    'marcar_error_si_diferencia_z_de_zetas_absolutas_al_proyectar_mdt_es_superior_a_valor',
+    'marcar_error_si_diferencia_z_de_zetas_absolutas_al_proyectar_mdt_es_interior_a_valor',
+    'la_coordenada_z_del_primer_vertice_debe_ser_el_de_una_curva_maestra',
+    'la_coordenada_z_del_primer_vertice_debe_ser_el_de_una_curva_fina',
+}
+
+cache_contenido = CacheLRU(65536)
+
+def hash_contenido_geometria(g):
+    'Devuelve un resumen (bytes) del tipo, las coordenadas, los huecos y los nombres de los códigos de la geometría'
+    def calcula():
+        huecos = tuple(tuple((c[0], c[1], c[2]) for c in hueco) for hueco in getattr(g, 'holes', None) or ())
+        contenido = (type(g).__name__, tuple((c[0], c[1], c[2]) for c in g), huecos, tuple(codigo.name for codigo in g.codes), bool(getattr(g, 'closed_2d', False)))
+        return hashlib.blake2b(repr(contenido).encode('utf-8'), digest_size=16).digest()
+
+    return cache_contenido.obtiene((g, huella_geometria(g)), calcula)
+
+def etiquetas_de_parametros(parametros):
+    'Devuelve las etiquetas (sin el # inicial) que aparecen en los parámetros de texto de un control de calidad'
+    return sorted({patron[1:] for parametro in parametros if isinstance(parametro, str) for patron in parametro.split() if patron[0] == '#' and len(patron) > 1})
+
+# Variables del módulo que cambian durante la ejecución (estado de la ventana de dibujo, configuración y medidas de los controles aplazados),
+# que no forman parte de la versión de guiones.py
+variables_sin_version = {
+    'estado_vista_actual',
+    'mdt_local',
+    'presupuestos_controles',
+    'presupuesto_por_defecto',
+    'duraciones_controles',
+    'aplazamientos_controles',
+    'controles_diferidos',
+}
+
+def resumen_codigo(valor):
+    ''' Devuelve un resumen (bytes) del código y los datos de valor: el código compilado con sus constantes (incluido el de las funciones anidadas),
+        las funciones y los métodos de las clases, y el contenido de las colecciones. Del resto de objetos solo se tiene en cuenta el tipo.
+    '''
+    resumen = hashlib.blake2b(type(valor).__name__.encode('utf-8'), digest_size=16)
+    partes = ()
+
+    if isinstance(valor, types.CodeType):
+        resumen.update(valor.co_code)
+        resumen.update(repr(valor.co_names).encode('utf-8'))
+        partes = valor.co_consts
+    elif isinstance(valor, types.FunctionType):
+        partes = (valor.__code__, valor.__defaults__, valor.__kwdefaults__, getattr(valor, '__wrapped__', None))
+    elif isinstance(valor, type):
+        partes = [(nombre, atributo) for nombre, atributo in sorted(vars(valor).items()) if nombre not in ('__dict__', '__weakref__', '__module__')]
+    elif isinstance(valor, property):
+        partes = (valor.fget, valor.fset, valor.fdel)
+    elif isinstance(valor, (staticmethod, classmethod)):
+        partes = (valor.__func__,)
+    elif isinstance(valor, dict):
+        partes = sorted(resumen_codigo(clave) + resumen_codigo(elemento) for clave, elemento in valor.items())
+    elif isinstance(valor, (set, frozenset)):
+        partes = sorted(resumen_codigo(elemento) for elemento in valor)
+    elif isinstance(valor, (list, tuple)):
+        partes = valor
+    elif valor is None or isinstance(valor, (str, bytes, numbers.Number)):
+        resumen.update(repr(valor).encode('utf-8'))
+    elif isinstance(valor, types.BuiltinFunctionType):
+        resumen.update('{}.{}'.format(valor.__module__, valor.__qualname__).encode('utf-8'))
+    elif callable(valor) and hasattr(valor, '__wrapped__'):
+        # Funciones decoradas con functools.lru_cache
+        partes = (valor.__wrapped__,)
+
+    for parte in partes:
+        resumen.update(resumen_codigo(parte))
+
+    return resumen.digest()
+
+def version_guiones():
+    'Devuelve un resumen del código fuente de este archivo, de manera que al modificar los controles de calidad se descarten los resultados guardados'
+    try:
+        with open(__file__, 'rb') as f:
+            return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    except (NameError, OSError):
+        # Sin acceso al archivo (por ejemplo si Digi3D.NET lo ejecuta desde memoria) se utiliza el código compilado de las funciones y las clases
+        # del módulo, con sus constantes (mensajes, umbrales), y las tablas y valores del módulo
+        resumen = hashlib.blake2b(digest_size=16)
+        for nombre, valor in sorted(globals().items()):
+            if nombre.startswith('__') or nombre in variables_sin_version or isinstance(valor, types.ModuleType):
+                continue
+            if isinstance(valor, (types.FunctionType, type)) and valor.__module__ != __name__:
+                continue
 
-	return representations
+            resumen.update(nombre.encode('utf-8'))
+            resumen.update(resumen_codigo(valor))
+        return resumen.hexdigest()
+
+class CachePersistente:
+    ''' Controles de calidad que no detectaron errores, guardados en un archivo SQLite (por ejemplo junto al archivo de dibujo) para no volver a evaluarlos
+        al reabrir el archivo de dibujo si no han cambiado ni la geometría ni sus vecinas.
+        La clave de cada resultado es un resumen del nombre y los parámetros del control, de los códigos que tienen asignada cada etiqueta de los parámetros,
+        del contenido de la geometría y del de las geometrías que pueden influir en el resultado (las que están dentro del radio de influencia del control). Los errores no se guardan: los controles con errores se vuelven a evaluar.
+        Cada resultado lleva la versión de guiones.py que lo calculó, y los de otras versiones se descartan al abrir la caché.
+        Si se superan maximo_resultados, se descartan los usados hace más tiempo.
+    '''
+    maximo_resultados = 1000000
+
+    def __init__(self, ruta, maximo_resultados=None):
+        if maximo_resultados is not None:
+            self.maximo_resultados = maximo_resultados
+
+        self.version = version_guiones()
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute('CREATE TABLE IF NOT EXISTS resultados (clave BLOB PRIMARY KEY, version TEXT NOT NULL, usado REAL NOT NULL)')
+        self.conexion.execute('CREATE INDEX IF NOT EXISTS resultados_usado ON resultados (usado)')
+        self.conexion.execute('DELETE FROM resultados WHERE version <> ?', (self.version,))
+        self.conexion.commit()
+
+        self.usadas = []
+        self.nuevas = []
+
+    def cierra(self):
+        'Guarda los cambios y cierra el archivo'
+        self.guarda()
+        self.conexion.close()
+
+    def clave(self, g, code_index, control):
+        'Devuelve la clave del resultado del control sobre la geometría, o None si ese resultado no se puede guardar'
+        if control.nombre in controles_sin_cache_persistente:
+            return None
+
+        radio = radio_influencia_control(control, g)
+        if radio is None:
+            return None
+
+        resumen = hashlib.blake2b(digest_size=16)
+        resumen.update(repr((control.nombre, control.parametros, code_index)).encode('utf-8'))
+        resumen.update(hash_contenido_geometria(g))
+
+        # Las etiquetas de los parámetros dependen de la tabla de códigos: se incluyen los códigos que tienen asignada cada etiqueta
+        estado = estado_vista()
+        for etiqueta in etiquetas_de_parametros(control.parametros):
+            resumen.update(repr((etiqueta, estado.codigos_con_etiqueta(etiqueta))).encode('utf-8'))
+
+        if radio >= 0:
+            vecinas = sorted(hash_contenido_geometria(otra) for otra in geometrias_que_tocan_caja(g, radio) if otra is not g)
+            for vecina in vecinas:
+                resumen.update(vecina)
+
+        return resumen.digest()
+
+    def sin_errores(self, clave):
+        'Devuelve verdadero si está guardado que el control con esta clave no detectó errores'
+        if self.conexion.execute('SELECT 1 FROM resultados WHERE clave = ?', (clave,)).fetchone() is None:
+            return False
 
-@dynamic_representation_rule()
-def asignar_color_si_atributo_bbdd_no_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo no tiene un valor nulo'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+        self.usadas.append(clave)
+        return True
 
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
+    def anota_sin_errores(self, clave):
+        'Anota que el control con esta clave no ha detectado errores'
+        self.nuevas.append(clave)
 
-	if nombre_atributo not in atributosCodigo:
-		return representations
+    def guarda(self):
+        'Escribe en el archivo los resultados anotados y descarta los usados hace más tiempo si se supera el tamaño máximo'
+        ahora = time.time()
 
-	if atributosCodigo[nombre_atributo] is not None:
-		representations[0].color = texto_a_color(color_asignar)
+        with self.conexion:
+            self.conexion.executemany('INSERT OR REPLACE INTO resultados (clave, version, usado) VALUES (?, ?, ?)', ((clave, self.version, ahora) for clave in self.nuevas))
+            self.conexion.executemany('UPDATE resultados SET usado = ? WHERE clave = ?', ((ahora, clave) for clave in self.usadas))
 
-	return representations
+            sobrantes = self.conexion.execute('SELECT COUNT(*) FROM resultados').fetchone()[0] - self.maximo_resultados
+            if sobrantes > 0:
+                self.conexion.execute('DELETE FROM resultados WHERE clave IN (SELECT clave FROM resultados ORDER BY usado LIMIT ?)', (sobrantes,))
 
-@dynamic_representation_rule()
-def asignar_color_si_multiples_atributos_bbdd_igual_valores(geometry, code_drawing, representations, nombre_codigo, atributos_y_valores, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si los atributos de BBDD coinciden con la lista atributo1 valor1 atributo2 valor2 ... atributoN valorN coinciden'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+        self.usadas = []
+        self.nuevas = []
 
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-	lista_atributos_y_valores = atributos_y_valores.split(' ')
+# Reglas para la representación de geometrías --------------------------------------------------------------------------
 
-	for i in range(0, len(lista_atributos_y_valores), 2):
-		nombre_atributo = lista_atributos_y_valores[i]
-		valor_esperado = lista_atributos_y_valores[i + 1]
+class DespachadorReglas:
+	''' Reglas de representación configuradas, indexadas por el patrón de código de cada regla (su parámetro nombre_codigo).
+		Para cada nombre de código se memorizan las reglas cuyo patrón coincide con él, de manera que al dibujar una geometría solo se ejecutan
+		las reglas que le afectan, en el orden en el que se configuraron.
+	'''
+	def __init__(self, reglas):
+		''' Argumentos:
+				reglas: lista de tuplas (regla de representación o su nombre, nombre_codigo, parámetro2, ...), con los mismos parámetros que la regla.
+		'''
+		self.reglas = []
+		self.patrones = {}
 
-		if nombre_atributo not in atributosCodigo:
-			return representations
-	
-		if compara_valor_distinto_texto(atributosCodigo[nombre_atributo], valor_esperado):
-			return representations
-	
-	representations[0].color = texto_a_color(color_asignar)
-	return representations
+		for regla in reglas:
+			funcion = globals()[regla[0]] if isinstance(regla[0], str) else regla[0]
+			patron = regla[1]
+			self.patrones.setdefault(patron, []).append(len(self.reglas))
+			self.reglas.append((funcion, tuple(regla[1:])))
 
-@dynamic_representation_rule()
-def asignar_color_si_atributo_diccionario_atributos_menor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor inferior que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+		self.reglas_por_codigo = {}
 
-	if nombre_atributo not in geometry.attributes:
-		return representations
+	def reglas_codigo(self, nombre_codigo):
+		'Devuelve las reglas (función, parámetros) cuyo patrón de código coincide con el nombre de código indicado'
+		reglas = self.reglas_por_codigo.get(nombre_codigo)
 
-	if compara_valor_menor_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].color = texto_a_color(color_asignar)
+		if reglas is None:
+			indices = sorted(indice for patron, indices_patron in self.patrones.items() if compara_codigos_con_comodines(nombre_codigo, patron) for indice in indices_patron)
+			reglas = [self.reglas[indice] for indice in indices]
+			self.reglas_por_codigo[nombre_codigo] = reglas
 
-	return representations
+		return reglas
 
-@dynamic_representation_rule()
-def asignar_color_si_atributo_diccionario_atributos_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor inferior que igual a valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+	def aplica(self, geometry, code_drawing, representations):
+		'Aplica a la geometría las reglas configuradas para su código'
+		for funcion, parametros in self.reglas_codigo(code_drawing.name):
+			representations = funcion(geometry, code_drawing, representations, *parametros)
 
-	if nombre_atributo not in geometry.attributes:
 		return representations
 
-	if compara_valor_menor_igual_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].color = texto_a_color(color_asignar)
+despachador_reglas = DespachadorReglas([])
 
-	return representations
+def configura_reglas_representacion(reglas):
+	'Establece las reglas de representación que aplica aplicar_reglas_configuradas (ver DespachadorReglas)'
+	global despachador_reglas
+	despachador_reglas = DespachadorReglas(reglas)
 
 @dynamic_representation_rule()
-def asignar_color_si_atributo_diccionario_atributos_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene el valor valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+def aplicar_reglas_configuradas(geometry, code_drawing, representations):
+	'Aplica las reglas de representación establecidas con configura_reglas_representacion cuyo código (admite comodines) coincide con el código que se está dibujando'
+	return despachador_reglas.aplica(geometry, code_drawing, representations)
 
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if geometry.attributes[nombre_atributo] == valor_esperado:
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+# Motor de reglas por métricas --------------------------------------------------------------------------
+# Las reglas asignar_color_si_*, asignar_color_relleno_si_* y asignar_grosor_si_* combinan una métrica de la geometría, una comparación
+# con un umbral y una salida sobre representations[0]. Las métricas se leen con metrica_geometria, de manera que por muchos umbrales
+# que se configuren sobre el área o el perímetro, se calculan una sola vez por geometría.
 
-@dynamic_representation_rule()
-def asignar_color_si_atributo_diccionario_atributos_mayor_o_igual(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor mayor o igual que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
+# Para cada métrica: función que indica si la métrica es aplicable al tipo de geometría (se comprueba antes que el código, None si
+# es aplicable a todas), función que la calcula y función que convierte el texto del umbral
+metricas_reglas = {
+	'area': (es_area, lambda geometry: abs(metrica_geometria(geometry, 'area')), texto_a_real),
+	'perimetro': (None, lambda geometry: abs(metrica_geometria(geometry, 'perimetro')), texto_a_real),
+	'z_minima': (None, lambda geometry: metrica_geometria(geometry, 'z_minima'), texto_a_real),
+	'z_maxima': (None, lambda geometry: metrica_geometria(geometry, 'z_maxima'), texto_a_real),
+	'altura': (None, lambda geometry: metrica_geometria(geometry, 'altura'), texto_a_real),
+	'numero_huecos': (lambda geometry: type(geometry) is digi3d.Polygon, lambda geometry: metrica_geometria(geometry, 'numero_huecos'), texto_a_entero),
+	'numero_vertices': (None, lambda geometry: metrica_geometria(geometry, 'numero_vertices'), texto_a_entero),
+}
 
-	if compara_valor_mayor_igual_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].color = texto_a_color(color_asignar)
+# Origen de los atributos que comparan las reglas por atributo
+atributos_reglas = {
+	'bbdd': lambda geometry, nombre_codigo: localiza_codigo_en_geometria(geometry, nombre_codigo).attributes,
+	'diccionario_atributos': lambda geometry, nombre_codigo: geometry.attributes,
+}
 
-	return representations
+def establece_color(representacion, valor):
+	representacion.color = texto_a_color(valor)
 
-@dynamic_representation_rule()
-def asignar_color_si_atributo_diccionario_atributos_mayor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor mayor que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+def establece_color_relleno(representacion, valor):
+	representacion.fill_type = digi3d.FillType.Color
+	representacion.fill_color = texto_a_color(valor)
 
-	if nombre_atributo not in geometry.attributes:
-		return representations
+def establece_grosor(representacion, valor):
+	representacion.weight = texto_a_entero(valor)
 
-	if compara_valor_mayor_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].color = texto_a_color(color_asignar)
+salidas_reglas = {
+	'color': establece_color,
+	'color_relleno': establece_color_relleno,
+	'grosor': establece_grosor,
+}
 
-	return representations
+def aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, metrica, comparacion, umbral, salida, valor_salida):
+	''' Aplica a representations[0] la salida indicada si el código coincide con nombre_codigo y comparacion(métrica, umbral) es verdadero.
+		Argumentos:
+			metrica: clave de metricas_reglas.
+			comparacion: función de dos argumentos (operator.lt, operator.le...).
+			salida: clave de salidas_reglas.
+	'''
+	aplicable, calcula, convierte = metricas_reglas[metrica]
 
-@dynamic_representation_rule()
-def asignar_color_si_atributo_diccionario_atributos_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor nulo'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
+	if aplicable is not None and not aplicable(geometry):
 		return representations
 
-	if nombre_atributo not in geometry.attributes:
+	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
 		return representations
 
-	if geometry.attributes[nombre_atributo] is None:
-		representations[0].color = texto_a_color(color_asignar)
+	if comparacion(calcula(geometry), convierte(umbral)):
+		salidas_reglas[salida](representations[0], valor_salida)
 
 	return representations
 
-@dynamic_representation_rule()
-def asignar_color_si_atributo_diccionario_atributos_no_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor que no sea nulo'
+def aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, origen, comparacion, nombre_atributo, valor_esperado, salida, valor_salida):
+	''' Aplica a representations[0] la salida indicada si el código coincide con nombre_codigo, tiene el atributo nombre_atributo y
+		comparacion(valor del atributo, valor_esperado) es verdadero.
+		Argumentos:
+			origen: clave de atributos_reglas.
+			comparacion: función de dos argumentos (compara_valor_menor_texto, operator.is_...).
+			salida: clave de salidas_reglas.
+	'''
 	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
 		return representations
 
-	if nombre_atributo not in geometry.attributes:
+	atributos = atributos_reglas[origen](geometry, nombre_codigo)
+
+	if nombre_atributo not in atributos:
 		return representations
 
-	if geometry.attributes[nombre_atributo] is not None:
-		representations[0].color = texto_a_color(color_asignar)
+	if comparacion(atributos[nombre_atributo], valor_esperado):
+		salidas_reglas[salida](representations[0], valor_salida)
 
 	return representations
 
-@dynamic_representation_rule()
-def asignar_color_si_multiples_atributos_diccionario_atributos_igual_valores(geometry, code_drawing, representations, nombre_codigo, atributos_y_valores, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si los atributos coinciden con la lista atributo1 valor1 atributo2 valor2 ... atributoN valorN coinciden'
+def aplica_regla_atributos_multiples(geometry, code_drawing, representations, nombre_codigo, origen, atributos_y_valores, salida, valor_salida):
+	'Aplica a representations[0] la salida indicada si el código coincide con nombre_codigo y sus atributos coinciden con la lista atributo1 valor1 ... atributoN valorN'
 	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
 		return representations
 
-	lista_atributos_y_valores = atributos_y_valores.split(' ')
+	atributos = atributos_reglas[origen](geometry, nombre_codigo)
+	lista_atributos_y_valores = separa_atributos_y_valores(atributos_y_valores)
 
 	for i in range(0, len(lista_atributos_y_valores), 2):
 		nombre_atributo = lista_atributos_y_valores[i]
 		valor_esperado = lista_atributos_y_valores[i + 1]
 
-		if nombre_atributo not in geometry.attributes:
+		if nombre_atributo not in atributos:
 			return representations
-	
-		if compara_valor_distinto_texto(geometry.attributes[nombre_atributo], valor_esperado):
+
+		if compara_valor_distinto_texto(atributos[nombre_atributo], valor_esperado):
 			return representations
-	
-	representations[0].color = texto_a_color(color_asignar)
+
+	salidas_reglas[salida](representations[0], valor_salida)
 	return representations
 
-@dynamic_representation_rule()
-def asignar_color_si_area_inferior_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar si el área de la geometría es inferior que el valor area'
-	if not es_area(geometry):
-		return representations
+# Reglas que cambian el color  --------------------------------------------------------------------------
 
+@dynamic_representation_rule()
+def asignar_color(geometry, code_drawing, representations, nombre_codigo, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo (admite comodines)'
 	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
 		return representations
 
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) < float(area):
-		representations[0].color = texto_a_color(color_asignar)
-
+	representations[0].color = texto_a_color(color_asignar)
 	return representations
 
 @dynamic_representation_rule()
-def asignar_color_si_area_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar si el área de la geometría es inferior que el valor area'
-	if not es_area(geometry):
-		return representations
+def asignar_color_si_atributo_bbdd_menor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor inferior que valor_esperado'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_menor_texto, nombre_atributo, valor_esperado, 'color', color_asignar)
 
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+@dynamic_representation_rule()
+def asignar_color_si_atributo_bbdd_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor inferior que igual a valor_esperado'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_menor_igual_texto, nombre_atributo, valor_esperado, 'color', color_asignar)
 
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) <= float(area):
-		representations[0].color = texto_a_color(color_asignar)
+@dynamic_representation_rule()
+def asignar_color_si_atributo_bbdd_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene el valor valor_esperado'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_igual_texto, nombre_atributo, valor_esperado, 'color', color_asignar)
 
-	return representations
+@dynamic_representation_rule()
+def asignar_color_si_atributo_bbdd_mayor_o_igual(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor mayor o igual que valor_esperado'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_mayor_igual_texto, nombre_atributo, valor_esperado, 'color', color_asignar)
 
 @dynamic_representation_rule()
-def asignar_color_si_area_igual_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar si el área de la geometría es inferior o igual que el valor area'
-	if not es_area(geometry):
-		return representations
+def asignar_color_si_atributo_bbdd_mayor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor mayor que valor_esperado'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_mayor_texto, nombre_atributo, valor_esperado, 'color', color_asignar)
 
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+@dynamic_representation_rule()
+def asignar_color_si_atributo_bbdd_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor nulo'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', operator.is_, nombre_atributo, None, 'color', color_asignar)
 
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) == float(area):
-		representations[0].color = texto_a_color(color_asignar)
+@dynamic_representation_rule()
+def asignar_color_si_atributo_bbdd_no_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo no tiene un valor nulo'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', operator.is_not, nombre_atributo, None, 'color', color_asignar)
 
-	return representations
+@dynamic_representation_rule()
+def asignar_color_si_multiples_atributos_bbdd_igual_valores(geometry, code_drawing, representations, nombre_codigo, atributos_y_valores, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si los atributos de BBDD coinciden con la lista atributo1 valor1 atributo2 valor2 ... atributoN valorN coinciden'
+	return aplica_regla_atributos_multiples(geometry, code_drawing, representations, nombre_codigo, 'bbdd', atributos_y_valores, 'color', color_asignar)
 
 @dynamic_representation_rule()
-def asignar_color_si_area_mayor_igual_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar si el área de la geometría es mayor o igual que el valor area'
-	if not es_area(geometry):
-		return representations
+def asignar_color_si_atributo_diccionario_atributos_menor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor inferior que valor_esperado'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_menor_texto, nombre_atributo, valor_esperado, 'color', color_asignar)
 
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+@dynamic_representation_rule()
+def asignar_color_si_atributo_diccionario_atributos_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor inferior que igual a valor_esperado'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_menor_igual_texto, nombre_atributo, valor_esperado, 'color', color_asignar)
 
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) >= float(area):
-		representations[0].color = texto_a_color(color_asignar)
+@dynamic_representation_rule()
+def asignar_color_si_atributo_diccionario_atributos_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene el valor valor_esperado'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_igual_texto, nombre_atributo, valor_esperado, 'color', color_asignar)
 
-	return representations
+@dynamic_representation_rule()
+def asignar_color_si_atributo_diccionario_atributos_mayor_o_igual(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor mayor o igual que valor_esperado'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_mayor_igual_texto, nombre_atributo, valor_esperado, 'color', color_asignar)
 
 @dynamic_representation_rule()
-def asignar_color_si_area_mayor_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar si el área de la geometría es mayor que el valor area'
-	if not es_area(geometry):
-		return representations
+def asignar_color_si_atributo_diccionario_atributos_mayor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor mayor que valor_esperado'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_mayor_texto, nombre_atributo, valor_esperado, 'color', color_asignar)
 
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+@dynamic_representation_rule()
+def asignar_color_si_atributo_diccionario_atributos_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor nulo'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', operator.is_, nombre_atributo, None, 'color', color_asignar)
 
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) > float(area):
-		representations[0].color = texto_a_color(color_asignar)
+@dynamic_representation_rule()
+def asignar_color_si_atributo_diccionario_atributos_no_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor que no sea nulo'
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', operator.is_not, nombre_atributo, None, 'color', color_asignar)
 
-	return representations
+@dynamic_representation_rule()
+def asignar_color_si_multiples_atributos_diccionario_atributos_igual_valores(geometry, code_drawing, representations, nombre_codigo, atributos_y_valores, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar al código nombre_codigo si los atributos coinciden con la lista atributo1 valor1 atributo2 valor2 ... atributoN valorN coinciden'
+	return aplica_regla_atributos_multiples(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', atributos_y_valores, 'color', color_asignar)
 
 @dynamic_representation_rule()
-def asignar_color_si_perimetro_inferior_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar si el perímetro de la geometría es inferior que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+def asignar_color_si_area_inferior_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar si el área de la geometría es inferior que el valor area'
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.lt, area, 'color', color_asignar)
 
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) < float(perimetro):
-		representations[0].color = texto_a_color(color_asignar)
+@dynamic_representation_rule()
+def asignar_color_si_area_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar si el área de la geometría es inferior que el valor area'
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.le, area, 'color', color_asignar)
 
-	return representations
+@dynamic_representation_rule()
+def asignar_color_si_area_igual_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar si el área de la geometría es inferior o igual que el valor area'
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.eq, area, 'color', color_asignar)
 
 @dynamic_representation_rule()
-def asignar_color_si_perimetro_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar si el perímetro de la geometría es inferior o igual que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
+def asignar_color_si_area_mayor_igual_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar si el área de la geometría es mayor o igual que el valor area'
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.ge, area, 'color', color_asignar)
+
+@dynamic_representation_rule()
+def asignar_color_si_area_mayor_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar si el área de la geometría es mayor que el valor area'
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.gt, area, 'color', color_asignar)
 
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) <= float(perimetro):
-		representations[0].color = texto_a_color(color_asignar)
+@dynamic_representation_rule()
+def asignar_color_si_perimetro_inferior_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar si el perímetro de la geometría es inferior que el valor perimetro'
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.lt, perimetro, 'color', color_asignar)
 
-	return representations
+@dynamic_representation_rule()
+def asignar_color_si_perimetro_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar si el perímetro de la geometría es inferior o igual que el valor perimetro'
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.le, perimetro, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_perimetro_igual_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si el perímetro de la geometría es igual que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) == float(perimetro):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.eq, perimetro, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_perimetro_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si el perímetro de la geometría es mayor o igual que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) >= float(perimetro):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.ge, perimetro, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_perimetro_mayor_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si el perímetro de la geometría es mayor que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) > float(perimetro):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.gt, perimetro, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_z_minima_inferior_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la coordenada Z mínima de la geometría tiene un valor inferior que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] < float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.lt, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_z_minima_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la coordenada Z mínima de la geometría tiene un valor inferior o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] <= float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.le, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_z_minima_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la coordenada Z mínima de la geometría tiene un valor igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] == float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.eq, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_z_minima_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la coordenada Z mínima de la geometría tiene un valor mayor o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] >= float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.ge, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_z_minima_mayor_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la coordenada Z mínima de la geometría tiene un valor mayor que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] > float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.gt, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_z_maxima_inferior_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la coordenada Z máxima de la geometría tiene un valor inferior que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] < float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.lt, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_z_maxima_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la coordenada Z máxima de la geometría tiene un valor inferior o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] <= float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.le, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_z_maxima_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la coordenada Z máxima de la geometría tiene un valor igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] == float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.eq, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_z_maxima_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la coordenada Z máxima de la geometría tiene un valor mayor o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] >= float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.ge, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_z_maxima_mayor_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la coordenada Z máxima de la geometría tiene un valor mayor que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] > float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.gt, valor, 'color', color_asignar)
 
 
 @dynamic_representation_rule()
 def asignar_color_si_altura_menor_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor menor que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] < float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.lt, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_altura_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor menor o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] <= float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.le, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_altura_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] == float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.eq, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_altura_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor mayor o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] >= float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.ge, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_altura_mayor_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor mayor que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] > float(valor):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.gt, valor, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_poligono_tiene_numero_huecos_menor_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la geometría es un polígono y tiene un número de huecos inferior que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) < int(numero_huecos):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.lt, numero_huecos, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_poligono_tiene_numero_huecos_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la geometría es un polígono y tiene un número de huecos inferior o igual que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) <= int(numero_huecos):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.le, numero_huecos, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_poligono_tiene_numero_huecos_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la geometría es un polígono y tiene un número de huecos igual que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) == int(numero_huecos):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.eq, numero_huecos, 'color', color_asignar)
 
 @dynamic_representation_rule()
-def asignar_color_si_poligono_tiene_numero_huecos_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, color_asignar):
-	'Asigna como color de dibujo el valor color_asignar si la geometría es un polígono y tiene un número de huecos mayor o igual que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) >= int(numero_huecos):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+def asignar_color_si_poligono_tiene_numero_huecos_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, color_asignar):
+	'Asigna como color de dibujo el valor color_asignar si la geometría es un polígono y tiene un número de huecos mayor o igual que numero_huecos'
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.ge, numero_huecos, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_poligono_tiene_numero_huecos_mayor_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la geometría es un polígono y tiene un número de huecos mayor que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) > int(numero_huecos):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.gt, numero_huecos, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_numero_vertices_menor_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la geometría tiene un número de vértices inferior que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) < int(numero_vertices):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.lt, numero_vertices, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_numero_vertices_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la geometría tiene un número de vértices inferior o igual que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) <= int(numero_vertices):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.le, numero_vertices, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_numero_vertices_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la geometría tiene un número de vértices igual que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) == int(numero_vertices):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.eq, numero_vertices, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_numero_vertices_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la geometría tiene un número de vértices mayor o igual que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) >= int(numero_vertices):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.ge, numero_vertices, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_si_numero_vertices_mayor_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, color_asignar):
 	'Asigna como color de dibujo el valor color_asignar si la geometría tiene un número de vértices mayor que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) > int(numero_vertices):
-		representations[0].color = texto_a_color(color_asignar)
-
-	return representations
-
-colores_atributo_bbdd = {}
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.gt, numero_vertices, 'color', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_aleatorio_segun_valor_atributo_bbdd(geometry, code_drawing, representations, nombre_codigo, nombre_atributo):
-	'Asigna un color aleatorio en función del valor de un campo. Todas las geometrías que tengan el mismo valor se representarán con el mismo color'
-	global colores_atributo_bbdd
-
+	'Asigna un color en función del valor de un campo de base de datos, derivado del propio valor (ver color_segun_valor). Todas las geometrías que tengan el mismo valor se representarán con el mismo color, en todas las sesiones'
 	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
 		return representations
 
@@ -1767,22 +3310,13 @@ def asignar_color_aleatorio_segun_valor_atributo_bbdd(geometry, code_drawing, re
 
 	valorAtributo = atributosCodigo[nombre_atributo]
 
-	if valorAtributo not in colores_atributo_bbdd:
-		r = random.randint(0, 255)
-		g = random.randint(0, 255)
-		b = random.randint(0, 255)
-		color = "#" + f"{r:02x}" + f"{g:02x}" + f"{b:02x}" + "ff"
-		colores_atributo_bbdd[valorAtributo] = color
-
-	representations[0].color = colores_atributo_bbdd[valorAtributo]
+	representations[0].color = color_segun_valor(valorAtributo)
 
 	return representations
 
 @dynamic_representation_rule()
 def asignar_color_aleatorio_segun_valor_atributo_diccionario_atributos(geometry, code_drawing, representations, nombre_codigo, nombre_atributo):
-	'Asigna un color aleatorio en función del valor de un campo. Todas las geometrías que tengan el mismo valor se representarán con el mismo color'
-	global colores_atributo_bbdd
-
+	'Asigna un color en función del valor de un campo, derivado del propio valor (ver color_segun_valor). Todas las geometrías que tengan el mismo valor se representarán con el mismo color, en todas las sesiones'
 	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
 		return representations
 
@@ -1791,14 +3325,7 @@ def asignar_color_aleatorio_segun_valor_atributo_diccionario_atributos(geometry,
 
 	valorAtributo = geometry.attributes[nombre_atributo]
 
-	if valorAtributo not in colores_atributo_bbdd:
-		r = random.randint(0, 255)
-		g = random.randint(0, 255)
-		b = random.randint(0, 255)
-		color = "#" + f"{r:02x}" + f"{g:02x}" + f"{b:02x}" + "ff"
-		colores_atributo_bbdd[valorAtributo] = color
-
-	representations[0].color = colores_atributo_bbdd[valorAtributo]
+	representations[0].color = color_segun_valor(valorAtributo)
 
 	return representations
 
@@ -1817,762 +3344,272 @@ def asignar_color_relleno(geometry, code_drawing, representations, nombre_codigo
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_bbdd_menor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor inferior que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if compara_valor_menor_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_menor_texto, nombre_atributo, valor_esperado, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_bbdd_menor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor inferior que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if compara_valor_menor_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_menor_texto, nombre_atributo, valor_esperado, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_bbdd_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor inferior que igual a valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if compara_valor_menor_igual_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_menor_igual_texto, nombre_atributo, valor_esperado, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_bbdd_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene el valor valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if compara_valor_igual_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_igual_texto, nombre_atributo, valor_esperado, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_bbdd_mayor_o_igual(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor mayor o igual que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if compara_valor_mayor_igual_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_mayor_igual_texto, nombre_atributo, valor_esperado, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_bbdd_mayor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor mayor que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if compara_valor_mayor_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_mayor_texto, nombre_atributo, valor_esperado, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_bbdd_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor nulo'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if atributosCodigo[nombre_atributo] is None:
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', operator.is_, nombre_atributo, None, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_bbdd_no_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor que no es nulo'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if atributosCodigo[nombre_atributo] is not None:
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', operator.is_not, nombre_atributo, None, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_multiples_atributos_bbdd_igual_valores(geometry, code_drawing, representations, nombre_codigo, atributos_y_valores, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si los atributos de BBDD coinciden con la lista atributo1 valor1 atributo2 valor2 ... atributoN valorN coinciden'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-	lista_atributos_y_valores = atributos_y_valores.split(' ')
-
-	for i in range(0, len(lista_atributos_y_valores), 2):
-		nombre_atributo = lista_atributos_y_valores[i]
-		valor_esperado = lista_atributos_y_valores[i + 1]
-
-		if nombre_atributo not in atributosCodigo:
-			return representations
-	
-		if compara_valor_distinto_texto(atributosCodigo[nombre_atributo], valor_esperado):
-			return representations
-	
-	representations[0].fill_type = digi3d.FillType.Color
-	representations[0].fill_color = texto_a_color(color_asignar)
-	return representations
+	return aplica_regla_atributos_multiples(geometry, code_drawing, representations, nombre_codigo, 'bbdd', atributos_y_valores, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_diccionario_atributos_menor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor inferior que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if compara_valor_menor_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_menor_texto, nombre_atributo, valor_esperado, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_diccionario_atributos_menor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor inferior que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if compara_valor_menor_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_menor_texto, nombre_atributo, valor_esperado, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_diccionario_atributos_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor inferior que igual a valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if compara_valor_menor_igual_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_menor_igual_texto, nombre_atributo, valor_esperado, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_diccionario_atributos_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene el valor valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if compara_valor_igual_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_igual_texto, nombre_atributo, valor_esperado, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_diccionario_atributos_mayor_o_igual(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor mayor o igual que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if compara_valor_mayor_igual_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_mayor_igual_texto, nombre_atributo, valor_esperado, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_diccionario_atributos_mayor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor mayor que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if compara_valor_mayor_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_mayor_texto, nombre_atributo, valor_esperado, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_diccionario_atributos_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor nulo'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if geometry.attributes[nombre_atributo] is None:
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', operator.is_, nombre_atributo, None, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_atributo_diccionario_atributos_no_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor que no es nulo'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if geometry.attributes[nombre_atributo] is not None:
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', operator.is_not, nombre_atributo, None, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_multiples_atributos_diccionario_atributos_igual_valores(geometry, code_drawing, representations, nombre_codigo, atributos_y_valores, color_asignar):
 	'Asigna como color de relleno el valor color_asignar al código nombre_codigo si los atributos coinciden con la lista atributo1 valor1 atributo2 valor2 ... atributoN valorN coinciden'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	lista_atributos_y_valores = atributos_y_valores.split(' ')
-
-	for i in range(0, len(lista_atributos_y_valores), 2):
-		nombre_atributo = lista_atributos_y_valores[i]
-		valor_esperado = lista_atributos_y_valores[i + 1]
-
-		if nombre_atributo not in geometry.attributes:
-			return representations
-	
-		if compara_valor_distinto_texto(geometry.attributes[nombre_atributo], valor_esperado):
-			return representations
-	
-	representations[0].fill_type = digi3d.FillType.Color
-	representations[0].fill_color = texto_a_color(color_asignar)
-	return representations
+	return aplica_regla_atributos_multiples(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', atributos_y_valores, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_area_inferior_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si el área de la geometría es inferior que el valor area'
-	if not es_area(geometry):
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) < float(area):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.lt, area, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_area_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si el área de la geometría es inferior que el valor area'
-	if not es_area(geometry):
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) <= float(area):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.le, area, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_area_igual_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si el área de la geometría es inferior o igual que el valor area'
-	if not es_area(geometry):
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) == float(area):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.eq, area, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_area_mayor_igual_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si el área de la geometría es mayor o igual que el valor area'
-	if not es_area(geometry):
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) >= float(area):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.ge, area, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_area_mayor_valor(geometry, code_drawing, representations, nombre_codigo, area, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si el área de la geometría es mayor que el valor area'
-	if not es_area(geometry):
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) > float(area):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.gt, area, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
-def asignar_color_relleno_si_perimetro_inferior_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, color_asignar):
-	'Asigna como color de relleno el valor color_asignar si el perímetro de la geometría es inferior que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) < float(perimetro):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+def asignar_color_relleno_si_perimetro_inferior_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, color_asignar):
+	'Asigna como color de relleno el valor color_asignar si el perímetro de la geometría es inferior que el valor perimetro'
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.lt, perimetro, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_perimetro_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si el perímetro de la geometría es inferior o igual que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) <= float(perimetro):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.le, perimetro, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_perimetro_igual_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si el perímetro de la geometría es igual que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) == float(perimetro):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.eq, perimetro, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_perimetro_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si el perímetro de la geometría es mayor o igual que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) >= float(perimetro):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.ge, perimetro, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_perimetro_mayor_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si el perímetro de la geometría es mayor que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) > float(perimetro):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.gt, perimetro, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_z_minima_inferior_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la coordenada Z mínima de la geometría tiene un valor inferior que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] < float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.lt, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_z_minima_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la coordenada Z mínima de la geometría tiene un valor inferior o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] <= float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.le, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_z_minima_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la coordenada Z mínima de la geometría tiene un valor igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] < float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.eq, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_z_minima_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la coordenada Z mínima de la geometría tiene un valor mayor o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] >= float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.ge, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_z_minima_mayor_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la coordenada Z mínima de la geometría tiene un valor mayor que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] > float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.gt, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_z_maxima_inferior_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la coordenada Z máxima de la geometría tiene un valor inferior que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] < float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.lt, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_z_maxima_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la coordenada Z máxima de la geometría tiene un valor inferior o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] <= float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.le, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_z_maxima_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la coordenada Z máxima de la geometría tiene un valor igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] == float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.eq, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_z_maxima_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la coordenada Z máxima de la geometría tiene un valor mayor o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] >= float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.ge, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_z_maxima_mayor_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la coordenada Z máxima de la geometría tiene un valor mayor que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] > float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.gt, valor, 'color_relleno', color_asignar)
 
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_altura_menor_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor menor que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] < float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.lt, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_altura_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor menor o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] <= float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.le, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_altura_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] == float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.eq, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_altura_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor mayor o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] >= float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.ge, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_altura_mayor_valor(geometry, code_drawing, representations, nombre_codigo, valor, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor mayor que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] > float(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.gt, valor, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_poligono_tiene_numero_huecos_menor_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la geometría es un polígono y tiene un número de huecos inferior que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) < int(valor):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.lt, numero_huecos, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_poligono_tiene_numero_huecos_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la geometría es un polígono y tiene un número de huecos inferior o igual que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) <= int(numero_huecos):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.le, numero_huecos, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_poligono_tiene_numero_huecos_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la geometría es un polígono y tiene un número de huecos igual que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) == int(numero_huecos):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.eq, numero_huecos, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_poligono_tiene_numero_huecos_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la geometría es un polígono y tiene un número de huecos mayor o igual que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) >= int(numero_huecos):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.ge, numero_huecos, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_poligono_tiene_numero_huecos_mayor_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la geometría es un polígono y tiene un número de huecos mayor que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) > int(numero_huecos):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.gt, numero_huecos, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_numero_vertices_menor_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la geometría tiene un número de vértices inferior que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) < int(numero_vertices):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.lt, numero_vertices, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_numero_vertices_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la geometría tiene un número de vértices inferior o igual que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) <= int(numero_vertices):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.le, numero_vertices, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_numero_vertices_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la geometría tiene un número de vértices igual que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) == int(numero_vertices):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.eq, numero_vertices, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_numero_vertices_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la geometría tiene un número de vértices mayor o igual que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) >= int(numero_vertices):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.ge, numero_vertices, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_si_numero_vertices_mayor_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, color_asignar):
 	'Asigna como color de relleno el valor color_asignar si la geometría tiene un número de vértices mayor que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) > int(numero_vertices):
-		representations[0].fill_type = digi3d.FillType.Color
-		representations[0].fill_color = texto_a_color(color_asignar)
-
-	return representations
-
-colores_relleno_atributo_bbdd = {}
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.gt, numero_vertices, 'color_relleno', color_asignar)
 
 @dynamic_representation_rule()
 def asignar_color_relleno_aleatorio_segun_valor_atributo_bbdd(geometry, code_drawing, representations, nombre_codigo, nombre_atributo):
-	'Asigna un color aleatorio en función del valor de un campo de base de datos. Todas las geometrías que tengan el mismo valor se representarán con el mismo color'
-	global colores_relleno_atributo_bbdd
-
+	'Asigna un color de relleno en función del valor de un campo de base de datos, derivado del propio valor (ver color_segun_valor). Todas las geometrías que tengan el mismo valor se representarán con el mismo color, en todas las sesiones'
 	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
 		return representations
 
@@ -2583,42 +3620,24 @@ def asignar_color_relleno_aleatorio_segun_valor_atributo_bbdd(geometry, code_dra
 
 	valorAtributo = atributosCodigo[nombre_atributo]
 
-	if valorAtributo not in colores_relleno_atributo_bbdd:
-		r = random.randint(0, 255)
-		g = random.randint(0, 255)
-		b = random.randint(0, 255)
-		color = "#" + f"{r:02x}" + f"{g:02x}" + f"{b:02x}" + "ff"
-		colores_relleno_atributo_bbdd[valorAtributo] = color
-
 	representations[0].fill_type = digi3d.FillType.Color
-	representations[0].fill_color = colores_relleno_atributo_bbdd[valorAtributo]
+	representations[0].fill_color = color_segun_valor(valorAtributo)
 
 	return representations
 
-colores_relleno_atributo = {}
-
 @dynamic_representation_rule()
 def asignar_color_relleno_aleatorio_segun_valor_atributo_diccionario_atributos(geometry, code_drawing, representations, nombre_codigo, nombre_atributo):
-	'Asigna un color aleatorio en función del valor de un campo. Todas las geometrías que tengan el mismo valor se representarán con el mismo color'
-	global colores_relleno_atributo
-
+	'Asigna un color de relleno en función del valor de un campo, derivado del propio valor (ver color_segun_valor). Todas las geometrías que tengan el mismo valor se representarán con el mismo color, en todas las sesiones'
 	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
 		return representations
 
 	if nombre_atributo not in geometry.attributes:
 		return representations
 
-	valorAtributo =  geometry.attributes[nombre_atributo]
-
-	if valorAtributo not in colores_relleno_atributo:
-		r = random.randint(0, 255)
-		g = random.randint(0, 255)
-		b = random.randint(0, 255)
-		color = "#" + f"{r:02x}" + f"{g:02x}" + f"{b:02x}" + "ff"
-		colores_relleno_atributo[valorAtributo] = color
+	valorAtributo = geometry.attributes[nombre_atributo]
 
 	representations[0].fill_type = digi3d.FillType.Color
-	representations[0].fill_color = colores_relleno_atributo[valorAtributo]
+	representations[0].fill_color = color_segun_valor(valorAtributo)
 
 	return representations
 
@@ -2630,677 +3649,264 @@ def asignar_grosor(geometry, code_drawing, representations, nombre_codigo, groso
 	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
 		return representations
 
-	representations[0].weight = int(grosor_asignar)
+	representations[0].weight = texto_a_entero(grosor_asignar)
 	return representations
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_bbdd_menor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor inferior que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if compara_valor_menor_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_menor_texto, nombre_atributo, valor_esperado, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_bbdd_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor inferior que igual a valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if compara_valor_menor_igual_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_menor_igual_texto, nombre_atributo, valor_esperado, 'grosor', grosor_asignar)
 
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_bbdd_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene el valor valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if compara_valor_igual_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_igual_texto, nombre_atributo, valor_esperado, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_bbdd_mayor_o_igual(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor mayor o igual que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if compara_valor_mayor_igual_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_mayor_igual_texto, nombre_atributo, valor_esperado, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_bbdd_mayor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor mayor que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if compara_valor_mayor_texto(atributosCodigo[nombre_atributo], valor_esperado):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', compara_valor_mayor_texto, nombre_atributo, valor_esperado, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_bbdd_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor nulo'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if atributosCodigo[nombre_atributo] is None:
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', operator.is_, nombre_atributo, None, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_bbdd_no_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo de BBDD nombre_atributo tiene un valor que no es nulo'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-
-	if nombre_atributo not in atributosCodigo:
-		return representations
-
-	if atributosCodigo[nombre_atributo] is not None:
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'bbdd', operator.is_not, nombre_atributo, None, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_multiples_atributos_bbdd_igual_valores(geometry, code_drawing, representations, nombre_codigo, atributos_y_valores, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si los atributos de BBDD coinciden con la lista atributo1 valor1 atributo2 valor2 ... atributoN valorN coinciden'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	atributosCodigo = localiza_codigo_en_geometria(geometry, nombre_codigo).attributes
-	lista_atributos_y_valores = atributos_y_valores.split(' ')
-
-	for i in range(0, len(lista_atributos_y_valores), 2):
-		nombre_atributo = lista_atributos_y_valores[i]
-		valor_esperado = lista_atributos_y_valores[i + 1]
-
-		if nombre_atributo not in atributosCodigo:
-			return representations
-	
-		if compara_valor_distinto_texto(atributosCodigo[nombre_atributo], valor_esperado):
-			return representations
-	
-	representations[0].weight = int(grosor_asignar)
-	return representations
+	return aplica_regla_atributos_multiples(geometry, code_drawing, representations, nombre_codigo, 'bbdd', atributos_y_valores, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_diccionario_atributos_menor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor inferior que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if compara_valor_menor_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_menor_texto, nombre_atributo, valor_esperado, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_diccionario_atributos_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor inferior que igual a valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if compara_valor_menor_igual_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_menor_igual_texto, nombre_atributo, valor_esperado, 'grosor', grosor_asignar)
 
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_diccionario_atributos_igual_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo nombre_atributo tiene el valor valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if compara_valor_igual_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_igual_texto, nombre_atributo, valor_esperado, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_diccionario_atributos_mayor_o_igual(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor mayor o igual que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if compara_valor_mayor_igual_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_mayor_igual_texto, nombre_atributo, valor_esperado, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_diccionario_atributos_mayor_valor(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, valor_esperado, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor mayor que valor_esperado'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if compara_valor_mayor_texto(geometry.attributes[nombre_atributo], valor_esperado):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', compara_valor_mayor_texto, nombre_atributo, valor_esperado, 'grosor', grosor_asignar)
 
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_diccionario_atributos_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor nulo'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if geometry.attributes[nombre_atributo] is None:
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', operator.is_, nombre_atributo, None, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_atributo_diccionario_atributos_no_es_nulo(geometry, code_drawing, representations, nombre_codigo, nombre_atributo, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si el atributo nombre_atributo tiene un valor que no es nulo'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if nombre_atributo not in geometry.attributes:
-		return representations
-
-	if geometry.attributes[nombre_atributo] is not None:
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_atributo(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', operator.is_not, nombre_atributo, None, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_multiples_atributos_diccionario_atributos_igual_valores(geometry, code_drawing, representations, nombre_codigo, atributos_y_valores, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar al código nombre_codigo si los atributos coinciden con la lista atributo1 valor1 atributo2 valor2 ... atributoN valorN coinciden'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	lista_atributos_y_valores = atributos_y_valores.split(' ')
-
-	for i in range(0, len(lista_atributos_y_valores), 2):
-		nombre_atributo = lista_atributos_y_valores[i]
-		valor_esperado = lista_atributos_y_valores[i + 1]
-
-		if nombre_atributo not in geometry.attributes:
-			return representations
-	
-		if compara_valor_distinto_texto(geometry.attributes[nombre_atributo], valor_esperado):
-			return representations
-	
-	representations[0].weight = int(grosor_asignar)
-	return representations
+	return aplica_regla_atributos_multiples(geometry, code_drawing, representations, nombre_codigo, 'diccionario_atributos', atributos_y_valores, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_area_inferior_valor(geometry, code_drawing, representations, nombre_codigo, area, grosor_asignar):
 	'Asigna como grosor el valor grosor_asignar si el área de la geometría es inferior que el valor area'
-	if not es_area(geometry):
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) < float(area):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.lt, area, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_area_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, area, grosor_asignar):
 	'Asigna como grosor el valor grosor_asignar si el área de la geometría es inferior que el valor area'
-	if not es_area(geometry):
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) <= float(area):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.le, area, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_area_igual_valor(geometry, code_drawing, representations, nombre_codigo, area, grosor_asignar):
 	'Asigna como grosor el valor grosor_asignar si el área de la geometría es inferior o igual que el valor area'
-	if not es_area(geometry):
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) == float(area):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.eq, area, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_area_mayor_igual_valor(geometry, code_drawing, representations, nombre_codigo, area, grosor_asignar):
 	'Asigna como grosor el valor grosor_asignar si el área de la geometría es mayor o igual que el valor area'
-	if not es_area(geometry):
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) >= float(area):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.ge, area, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_area_mayor_valor(geometry, code_drawing, representations, nombre_codigo, area, grosor_asignar):
 	'Asigna como grosor el valor grosor_asignar si el área de la geometría es mayor que el valor area'
-	if not es_area(geometry):
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.calculate_area(geometry)) > float(area):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'area', operator.gt, area, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_perimetro_inferior_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, grosor_asignar):
 	'Asigna como grosor el valor grosor_asignar si el perímetro de la geometría es inferior que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) < float(perimetro):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.lt, perimetro, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_perimetro_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, grosor_asignar):
 	'Asigna como grosor el valor grosor_asignar si el perímetro de la geometría es inferior o igual que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) <= float(perimetro):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.le, perimetro, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_perimetro_igual_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, grosor_asignar):
 	'Asigna como grosor el valor grosor_asignar si el perímetro de la geometría es igual que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) == float(perimetro):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.eq, perimetro, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_perimetro_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, grosor_asignar):
 	'Asigna como grosor el valor grosor_asignar si el perímetro de la geometría es mayor o igual que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) >= float(perimetro):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.ge, perimetro, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_perimetro_mayor_valor(geometry, code_drawing, representations, nombre_codigo, perimetro, grosor_asignar):
 	'Asigna como grosor el valor grosor_asignar si el perímetro de la geometría es mayor que el valor perimetro'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if abs(digi3d.current_view().geographic_calculator.perimeter_2d(geometry)) > float(perimetro):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'perimetro', operator.gt, perimetro, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_z_minima_inferior_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la coordenada Z mínima de la geometría tiene un valor inferior que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] < float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.lt, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_z_minima_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la coordenada Z mínima de la geometría tiene un valor inferior o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] <= float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.le, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_z_minima_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la coordenada Z mínima de la geometría tiene un valor igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] == float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.eq, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_z_minima_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la coordenada Z mínima de la geometría tiene un valor mayor o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] >= float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.ge, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_z_minima_mayor_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la coordenada Z mínima de la geometría tiene un valor mayor que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.min[2] > float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_minima', operator.gt, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_z_maxima_inferior_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la coordenada Z máxima de la geometría tiene un valor inferior que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] < float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.lt, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_z_maxima_inferior_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la coordenada Z máxima de la geometría tiene un valor inferior o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] <= float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.le, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_z_maxima_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la coordenada Z máxima de la geometría tiene un valor igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] == float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.eq, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_z_maxima_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la coordenada Z máxima de la geometría tiene un valor mayor o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] >= float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.ge, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_z_maxima_mayor_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la coordenada Z máxima de la geometría tiene un valor mayor que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] > float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'z_maxima', operator.gt, valor, 'grosor', grosor_asignar)
 
 
 @dynamic_representation_rule()
 def asignar_grosor_si_altura_menor_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor menor que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] < float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.lt, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_altura_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor menor o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] <= float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.le, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_altura_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] == float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.eq, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_altura_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor mayor o igual que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] >= float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.ge, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_altura_mayor_valor(geometry, code_drawing, representations, nombre_codigo, valor, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la altura de la geometría (z máxima - z mínima) tiene un valor mayor que valor'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if geometry.max[2] - geometry.min[2] > float(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'altura', operator.gt, valor, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_poligono_tiene_numero_huecos_menor_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la geometría es un polígono y tiene un número de huecos inferior que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) < int(valor):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.lt, numero_huecos, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_poligono_tiene_numero_huecos_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la geometría es un polígono y tiene un número de huecos inferior o igual que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) <= int(numero_huecos):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.le, numero_huecos, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_poligono_tiene_numero_huecos_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la geometría es un polígono y tiene un número de huecos igual que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) == int(numero_huecos):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.eq, numero_huecos, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_poligono_tiene_numero_huecos_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la geometría es un polígono y tiene un número de huecos mayor o igual que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) >= int(numero_huecos):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.ge, numero_huecos, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_poligono_tiene_numero_huecos_mayor_valor(geometry, code_drawing, representations, nombre_codigo, numero_huecos, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la geometría es un polígono y tiene un número de huecos mayor que numero_huecos'
-	if type(geometry) is not digi3d.Polygon:
-		return representations
-
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry.holes) > int(numero_huecos):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_huecos', operator.gt, numero_huecos, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_numero_vertices_menor_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la geometría tiene un número de vértices inferior que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) < int(numero_vertices):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.lt, numero_vertices, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_numero_vertices_menor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la geometría tiene un número de vértices inferior o igual que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) <= int(numero_vertices):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.le, numero_vertices, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_numero_vertices_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la geometría tiene un número de vértices igual que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) == int(numero_vertices):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.eq, numero_vertices, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_numero_vertices_mayor_o_igual_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la geometría tiene un número de vértices mayor o igual que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) >= int(numero_vertices):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.ge, numero_vertices, 'grosor', grosor_asignar)
 
 @dynamic_representation_rule()
 def asignar_grosor_si_numero_vertices_mayor_valor(geometry, code_drawing, representations, nombre_codigo, numero_vertices, grosor_asignar):
 	'Asigna como grosor de dibujo el valor grosor_asignar si la geometría tiene un número de vértices mayor que numero_vertices'
-	if not compara_codigos_con_comodines(code_drawing.name, nombre_codigo):
-		return representations
-
-	if len(geometry) > int(numero_vertices):
-		representations[0].weight = int(grosor_asignar)
-
-	return representations
+	return aplica_regla_metrica(geometry, code_drawing, representations, nombre_codigo, 'numero_vertices', operator.gt, numero_vertices, 'grosor', grosor_asignar)
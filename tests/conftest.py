@@ -0,0 +1,29 @@
+import builtins
+import importlib.util
+import os
+import sys
+
+import pytest
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO, 'host'))
+
+import digi3d
+
+# Digi3D.NET inyecta estos decoradores en el entorno en el que ejecuta los guiones
+builtins.quality_control = lambda *argumentos, **opciones: (lambda funcion: funcion)
+builtins.dynamic_representation_rule = lambda *argumentos, **opciones: (lambda funcion: funcion)
+
+@pytest.fixture
+def vista():
+    'Ventana de dibujo activa vacía'
+    digi3d.vista_activa = digi3d.View()
+    return digi3d.vista_activa
+
+@pytest.fixture
+def guiones(vista):
+    'Carga guiones.py de nuevo para cada prueba, de manera que no comparten índices ni caches'
+    especificacion = importlib.util.spec_from_file_location('guiones', os.path.join(DIRECTORIO, '..', 'guiones.py'))
+    modulo = importlib.util.module_from_spec(especificacion)
+    especificacion.loader.exec_module(modulo)
+    return modulo
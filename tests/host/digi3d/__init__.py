@@ -0,0 +1,119 @@
+''' Sustituto mínimo del módulo digi3d de Digi3D.NET para ejecutar las pruebas de guiones.py fuera del programa.
+    Solo implementa lo que utilizan las pruebas: geometrías con coordenadas, códigos y atributos, la ventana de dibujo activa
+    (una lista de geometrías) y las clases de error.
+'''
+import math
+
+class Vector(tuple):
+    def __sub__(self, otro):
+        return Vector(a - b for a, b in zip(self, otro))
+
+class Code:
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = attributes if attributes is not None else {}
+
+class Geometria:
+    closed_2d = False
+
+    def __init__(self, coordenadas, codigos):
+        self.coords = [tuple(c) for c in coordenadas]
+        self.codes = [Code(c) if isinstance(c, str) else c for c in codigos]
+        self.deleted = False
+        self.attributes = {}
+        self.holes = []
+
+    def __iter__(self):
+        return iter(self.coords)
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __getitem__(self, indice):
+        return self.coords[indice]
+
+    def __repr__(self):
+        return '{}({}, {})'.format(type(self).__name__, self.coords, [codigo.name for codigo in self.codes])
+
+    @property
+    def min(self):
+        return Vector(min(c[i] for c in self.coords) for i in range(3))
+
+    @property
+    def max(self):
+        return Vector(max(c[i] for c in self.coords) for i in range(3))
+
+    def maxmin_overlaps_2d(self, otra):
+        a0, a1, b0, b1 = self.min, self.max, otra.min, otra.max
+        return a0[0] <= b1[0] and b0[0] <= a1[0] and a0[1] <= b1[1] and b0[1] <= a1[1]
+
+class Point(Geometria): pass
+class Line(Geometria): pass
+class Polygon(Geometria): pass
+class Text(Geometria): pass
+class Complex(Geometria): pass
+
+class GeometryError:
+    def __init__(self, *argumentos):
+        self.argumentos = argumentos
+
+    def __repr__(self):
+        return '{}{!r}'.format(type(self).__name__, self.argumentos)
+
+    def __eq__(self, otro):
+        return type(self) is type(otro) and self.argumentos == otro.argumentos
+
+    def __hash__(self):
+        return hash((type(self), tuple(id(a) if isinstance(a, Geometria) else a for a in self.argumentos)))
+
+class GeometryWarning(GeometryError): pass
+class GeometryRelationError(GeometryError): pass
+class DatabaseFieldError(GeometryError): pass
+
+class GeographicCalculator:
+    def calculate_distance_2d(self, a, b):
+        return math.hypot(a[0] - b[0], a[1] - b[1])
+
+    def calculate_area(self, g):
+        return 1.0
+
+    def perimeter_2d(self, g):
+        return 1.0
+
+class TabCode:
+    def __init__(self, tags):
+        self.tags = set(tags)
+
+    def contains_tag(self, tag):
+        return tag in self.tags
+
+class View(list):
+    equidistance = 5
+
+    def __init__(self, *argumentos):
+        super().__init__(*argumentos)
+        self.geographic_calculator = GeographicCalculator()
+        self.digi_tab = {}
+
+    def project(self, coordenada):
+        return 0.0
+
+vista_activa = View()
+
+def current_view():
+    return vista_activa
+
+def same_coordinates(a, b):
+    return a == b
+
+def get_intersections(geometria, candidatos):
+    resultado = {}
+    for candidato in candidatos:
+        for i, p in enumerate(geometria.coords):
+            for j, q in enumerate(candidato.coords):
+                if p[:2] == q[:2]:
+                    resultado.setdefault(p[:2], {geometria: i})[candidato] = j
+    return resultado
+
+class FillType:
+    Color = 1
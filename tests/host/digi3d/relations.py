@@ -0,0 +1,40 @@
+'Relaciones de digi3d.relations simplificadas: dos geometrías están relacionadas si sus cajas envolventes se solapan'
+
+def solapan(a, b):
+    return a.maxmin_overlaps_2d(b)
+
+def no_solapan(a, b):
+    return not a.maxmin_overlaps_2d(b)
+
+class AreaArea:
+    adjacent = staticmethod(solapan)
+    completely_within = staticmethod(solapan)
+    within = staticmethod(solapan)
+    disjoint = staticmethod(no_solapan)
+    equal = staticmethod(solapan)
+    join = staticmethod(solapan)
+    overlap = staticmethod(lambda a, b: (a is not b and solapan(a, b),))
+
+class LineArea(AreaArea):
+    across = staticmethod(solapan)
+    terminates_within = staticmethod(solapan)
+    endpoint_join = staticmethod(solapan)
+
+class LineLine(LineArea):
+    endpoint_join_endpoint = staticmethod(solapan)
+    endpoint_join_excluding_endpoints = staticmethod(solapan)
+    overlap = staticmethod(solapan)
+
+    @staticmethod
+    def get_cross_vertices(a, b, solo_el_primero):
+        return [i for i, p in enumerate(a.coords) if any(p[:2] == q[:2] for q in b.coords)]
+
+class PointArea(AreaArea):
+    coincident = staticmethod(solapan)
+
+class PointLine(AreaArea):
+    coincident = staticmethod(solapan)
+    coincident_and_terminate = staticmethod(solapan)
+
+class PointPoint(AreaArea):
+    coincident = staticmethod(solapan)
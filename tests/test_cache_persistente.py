@@ -0,0 +1,43 @@
+import digi3d
+
+def test_la_cache_persistente_tiene_en_cuenta_las_etiquetas(guiones, vista, tmp_path):
+    vista.digi_tab = {'A': digi3d.TabCode(['agua']), 'B': digi3d.TabCode([])}
+    a = digi3d.Polygon([(0, 0, 0), (10, 0, 0), (10, 10, 0), (0, 0, 0)], ['A'])
+    b = digi3d.Polygon([(5, 5, 0), (15, 5, 0), (15, 15, 0), (5, 5, 0)], ['B'])
+    vista.extend([a, b])
+    controles = {'B': [('si_es_area_no_puede_solapar_otra_area', '#agua', 'Solape')]}
+    ruta = str(tmp_path / 'cache.sqlite')
+
+    # Sin la etiqueta no hay errores, y el resultado se guarda en la caché
+    vista.digi_tab['A'].tags.discard('agua')
+    cache = guiones.CachePersistente(ruta)
+    assert guiones.ejecuta_controles_de_calidad(controles, cache=cache) == []
+    cache.cierra()
+
+    # Con la etiqueta otra vez, el resultado guardado no sirve
+    vista.digi_tab['A'].tags.add('agua')
+    cache = guiones.CachePersistente(ruta)
+    assert [g for g, _, _, _ in guiones.ejecuta_controles_de_calidad(controles, cache=cache)] == [b]
+    cache.cierra()
+
+def test_la_version_sin_archivo_detecta_cambios_en_constantes_y_tablas(guiones, vista, monkeypatch):
+    # Sin el atributo __file__ no se puede leer el archivo, como cuando Digi3D.NET ejecuta guiones.py desde memoria
+    monkeypatch.delattr(guiones, '__file__')
+    version = guiones.version_guiones()
+    assert guiones.version_guiones() == version
+
+    # Las medidas de los controles aplazados no cambian la versión
+    guiones.duraciones_controles['control'] = 1.0
+    assert guiones.version_guiones() == version
+
+    # Dos versiones de una función que solo se diferencian en un mensaje
+    exec("def control_de_prueba(*argumentos):\n    return 'Un mensaje'", vars(guiones))
+    con_mensaje = guiones.version_guiones()
+    exec("def control_de_prueba(*argumentos):\n    return 'Otro mensaje'", vars(guiones))
+    assert guiones.version_guiones() != con_mensaje
+    del guiones.control_de_prueba
+
+    # Un mensaje de una tabla del módulo
+    operacion, _ = guiones.comprobaciones_diferencia_z['igual_a']
+    guiones.comprobaciones_diferencia_z['igual_a'] = (operacion, 'Otro mensaje {} {}')
+    assert guiones.version_guiones() != version
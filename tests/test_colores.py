@@ -0,0 +1,24 @@
+def test_color_segun_valor_es_fijo(guiones):
+    assert guiones.color_segun_valor(1) == '#79f2b9ff'
+    assert guiones.color_segun_valor('1') == '#79f2b9ff'
+    assert guiones.color_segun_valor(2.5) == '#f28055ff'
+    assert guiones.color_segun_valor('a') == '#7c66ccff'
+    assert guiones.color_segun_valor(None) == '#f22424ff'
+
+def test_color_segun_valor_no_depende_del_orden_de_las_secuencias(guiones):
+    assert guiones.color_segun_valor(['b', 'a']) == '#c2cc66ff'
+    assert guiones.color_segun_valor(('a', 'b')) == '#c2cc66ff'
+    assert guiones.color_segun_valor({'a', 'b'}) == '#c2cc66ff'
+
+class Objeto:
+    pass
+
+class ObjetoConTexto:
+    def __str__(self):
+        return 'texto'
+
+def test_color_segun_valor_de_otros_tipos(guiones):
+    # Sin texto propio el color depende solo del tipo, porque el texto por defecto incluye la dirección de memoria
+    assert guiones.color_segun_valor(Objeto()) == guiones.color_segun_valor(Objeto())
+    assert guiones.texto_canonico(Objeto()) == '<Objeto>'
+    assert guiones.color_segun_valor(ObjetoConTexto()) == guiones.color_segun_valor('texto')
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+import digi3d
+
+def dibujo_con_solapes_y_cruces(vista, semilla):
+    aleatorio = random.Random(semilla)
+
+    for _ in range(20):
+        x, y = aleatorio.randint(0, 40), aleatorio.randint(0, 40)
+        ancho, alto = aleatorio.randint(2, 8), aleatorio.randint(2, 8)
+        vista.append(digi3d.Polygon([(x, y, 0), (x + ancho, y, 0), (x + ancho, y + alto, 0), (x, y + alto, 0)], [aleatorio.choice(['A', 'B'])]))
+
+    # Las líneas se cruzan en los vértices que comparten (ver digi3d.relations.LineLine.get_cross_vertices)
+    vertices = [(aleatorio.randint(0, 10), aleatorio.randint(0, 10), 0) for _ in range(15)]
+    for _ in range(20):
+        vista.append(digi3d.Line(aleatorio.sample(vertices, aleatorio.randint(2, 4)), [aleatorio.choice(['L', 'M'])]))
+
+controles_por_codigo = {
+    'A': [('si_es_area_no_puede_solapar_otra_area', 'A B', 'Solape')],
+    'B': [('si_es_area_no_puede_solapar_otra_area', 'A', 'Solape')],
+    'L': [('si_es_linea_no_puede_cruzar_linea', 'L M', 'Cruce'), ('si_es_linea_debe_estar_separado_de_linea', 'L', 'Separación')],
+    'M': [('si_es_linea_no_puede_cruzar_linea', 'L', 'Cruce')],
+}
+
+def errores_por_geometria(resultados):
+    errores = {}
+    for g, code_index, nombre_control, errores_control in resultados:
+        errores.setdefault((id(g), code_index, nombre_control), []).extend(errores_control)
+    return errores
+
+@pytest.mark.parametrize('semilla', range(5))
+def test_agrupar_pares_simetricos_no_cambia_los_errores(guiones, vista, semilla):
+    dibujo_con_solapes_y_cruces(vista, semilla)
+
+    por_separado = errores_por_geometria(guiones.ejecuta_controles_de_calidad(controles_por_codigo))
+    agrupados = errores_por_geometria(guiones.ejecuta_controles_de_calidad(controles_por_codigo, agrupa_pares_simetricos=True))
+
+    assert por_separado
+    assert agrupados == por_separado
+
+def test_el_cruce_se_comunica_en_las_dos_lineas(guiones, vista):
+    a = digi3d.Line([(0, 0, 0), (5, 5, 0), (10, 10, 0)], ['L'])
+    b = digi3d.Line([(0, 10, 0), (5, 5, 0), (10, 0, 0)], ['L'])
+    vista.extend([a, b])
+
+    resultados = guiones.ejecuta_controles_de_calidad({'L': [('si_es_linea_no_puede_cruzar_linea', 'L', 'Cruce')]}, agrupa_pares_simetricos=True)
+
+    assert resultados == [
+        (a, 0, 'si_es_linea_no_puede_cruzar_linea', [digi3d.GeometryRelationError(b, 'Cruce', (5, 5, 0))]),
+        (b, 0, 'si_es_linea_no_puede_cruzar_linea', [digi3d.GeometryRelationError(a, 'Cruce', (5, 5, 0))]),
+    ]
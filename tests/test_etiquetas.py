@@ -0,0 +1,86 @@
+import digi3d
+
+def test_editar_etiqueta_sin_cambiar_numero_de_codigos(guiones, vista):
+    vista.digi_tab = {'A': digi3d.TabCode(['agua']), 'B': digi3d.TabCode([])}
+    a = digi3d.Line([(0, 0, 0), (1, 1, 0)], ['A'])
+    b = digi3d.Line([(2, 2, 0), (3, 3, 0)], ['B'])
+    vista.extend([a, b])
+
+    assert guiones.tiene_el_codigo_o_etiqueta(a, '#agua')
+    assert not guiones.tiene_el_codigo_o_etiqueta(b, '#agua')
+    assert list(guiones.geometrias_con_codigo_o_etiqueta('#agua')) == [a]
+
+    # Se mueve la etiqueta de un código a otro: la tabla de códigos sigue teniendo los mismos códigos.
+    # El cambio se tiene en cuenta al almacenar la siguiente geometría
+    vista.digi_tab['A'].tags.discard('agua')
+    vista.digi_tab['B'].tags.add('agua')
+    vista.append(digi3d.Point([(5, 5, 0)], ['C']))
+
+    assert not guiones.tiene_el_codigo_o_etiqueta(a, '#agua')
+    assert guiones.tiene_el_codigo_o_etiqueta(b, '#agua')
+    assert guiones.tiene_algun_codigo_de_etiqueta(b, 'agua')
+    assert list(guiones.geometrias_con_codigo_o_etiqueta('#agua')) == [b]
+
+def test_tabla_de_codigos_nueva_en_cada_acceso_no_acumula_resultados(guiones, vista, monkeypatch):
+    etiquetas = {'A': ['agua'], 'B': []}
+    monkeypatch.setattr(type(vista), 'digi_tab', property(lambda self: {codigo: digi3d.TabCode(e) for codigo, e in etiquetas.items()}), raising=False)
+    vista.extend([digi3d.Line([(0, 0, 0), (1, 1, 0)], ['A']), digi3d.Line([(2, 2, 0), (3, 3, 0)], ['B'])])
+
+    for _ in range(20):
+        assert len(list(guiones.geometrias_con_codigo_o_etiqueta('#agua'))) == 1
+
+    assert guiones.compila_codigo_o_etiqueta.cache_info().currsize == 1
+    assert len(guiones.estado_vista().consultas_codigo) == 1
+
+def test_la_ejecucion_por_lotes_vuelve_a_consultar_las_etiquetas(guiones, vista):
+    vista.digi_tab = {'A': digi3d.TabCode(['agua']), 'B': digi3d.TabCode([])}
+    a = digi3d.Polygon([(0, 0, 0), (10, 0, 0), (10, 10, 0), (0, 0, 0)], ['A'])
+    b = digi3d.Polygon([(5, 5, 0), (15, 5, 0), (15, 15, 0), (5, 5, 0)], ['B'])
+    vista.extend([a, b])
+    controles = {'B': [('si_es_area_no_puede_solapar_otra_area', '#agua', 'Solape')]}
+
+    assert [g for g, _, _, _ in guiones.ejecuta_controles_de_calidad(controles)] == [b]
+
+    vista.digi_tab['A'].tags.discard('agua')
+
+    assert guiones.ejecuta_controles_de_calidad(controles) == []
+
+class TablaQueCuenta(dict):
+    'Tabla de códigos que cuenta las consultas de etiquetas'
+    def __init__(self, *argumentos):
+        super().__init__(*argumentos)
+        self.consultas = 0
+
+    def __getitem__(self, nombre_codigo):
+        self.consultas += 1
+        return super().__getitem__(nombre_codigo)
+
+def test_las_etiquetas_se_consultan_una_vez_por_codigo(guiones, vista):
+    vista.digi_tab = TablaQueCuenta({'C{}'.format(i): digi3d.TabCode(['agua'] if i % 2 else []) for i in range(1500)})
+    geometrias = [digi3d.Point([(i, i, 0)], ['C{}'.format(i % 10)]) for i in range(100)]
+    vista.extend(geometrias)
+
+    for g in geometrias:
+        guiones.tiene_el_codigo_o_etiqueta(g, '#agua')
+        list(guiones.geometrias_con_codigo_o_etiqueta('#agua'))
+
+    assert vista.digi_tab.consultas == 10
+
+def test_la_ejecucion_incremental_detecta_etiquetas_editadas(guiones, vista):
+    vista.digi_tab = {'A': digi3d.TabCode([]), 'B': digi3d.TabCode([])}
+    a = digi3d.Polygon([(0, 0, 0), (10, 0, 0), (10, 10, 0), (0, 0, 0)], ['A'])
+    b = digi3d.Polygon([(5, 5, 0), (15, 5, 0), (15, 15, 0), (5, 5, 0)], ['B'])
+    vista.extend([a, b])
+    ejecucion = guiones.EjecucionIncremental({'B': [('si_es_area_no_puede_solapar_otra_area', '#agua', 'Solape')]})
+
+    assert ejecucion.ejecuta() == []
+
+    # Ninguna geometría cambia, pero el código de la otra área pasa a tener la etiqueta
+    vista.digi_tab['A'].tags.add('agua')
+
+    assert [g for g, _, _, _ in ejecucion.ejecuta()] == [b]
+    assert [g for g, _, _, _ in ejecucion.ejecuta()] == [b]
+
+    vista.digi_tab['A'].tags.discard('agua')
+
+    assert ejecucion.ejecuta() == []
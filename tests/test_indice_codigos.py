@@ -0,0 +1,24 @@
+import digi3d
+
+def test_geometria_con_el_codigo_repetido_aparece_una_vez(guiones, vista):
+    repetida = digi3d.Line([(0, 0, 0), (10, 10, 0)], ['A', 'A'])
+    otra = digi3d.Line([(0, 10, 0), (10, 0, 0)], ['A'])
+    vista.extend([repetida, otra])
+
+    assert list(guiones.geometrias_con_codigo_o_etiqueta('A')) == [repetida, otra]
+    assert list(guiones.estado_vista().geometrias_con_codigos(['A'])) == [repetida, otra]
+
+def test_cruce_con_linea_de_codigo_repetido_se_comunica_una_vez(guiones, vista):
+    linea = digi3d.Line([(0, 0, 0), (5, 5, 0), (10, 10, 0)], ['A'])
+    repetida = digi3d.Line([(0, 10, 0), (5, 5, 0), (10, 0, 0)], ['B', 'B'])
+    vista.extend([linea, repetida])
+
+    errores = guiones.si_es_linea_no_puede_cruzar_linea(linea, False, 0, 'B', 'Cruce')
+
+    assert errores == [digi3d.GeometryRelationError(repetida, 'Cruce', (5, 5, 0))]
+
+def test_la_geometria_analizada_no_cuenta_como_otra_geometria(guiones, vista):
+    area = digi3d.Polygon([(0, 0, 0), (10, 0, 0), (10, 10, 0), (0, 0, 0)], ['A'])
+    vista.append(area)
+
+    assert guiones.si_es_area_debe_ser_adyacente_area(area, False, 0, 'A', 'Sin adyacente') == digi3d.GeometryError('Sin adyacente')
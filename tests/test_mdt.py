@@ -0,0 +1,50 @@
+import digi3d
+
+class VistaConMdt(digi3d.View):
+    'Ventana de dibujo con un MDT horizontal a la cota z_mdt que cuenta las proyecciones'
+    def __init__(self, z_mdt):
+        super().__init__()
+        self.z_mdt = z_mdt
+        self.proyectadas = []
+
+    def project(self, coordenada):
+        self.proyectadas.append(tuple(coordenada))
+        return self.z_mdt
+
+def test_solo_se_proyectan_los_vertices_hasta_el_primer_error(guiones):
+    vista = digi3d.vista_activa = VistaConMdt(10.0)
+    linea = digi3d.Line([(0, 0, 10), (1, 0, 15), (2, 0, 20), (3, 0, 25)], ['A'])
+
+    errores = guiones.marcar_error_si_diferencia_z_al_proyectar_mdt_superior_a(linea, False, 0, 2)
+
+    assert errores == digi3d.GeometryError('Vértice de la geometría con una diferencia en Z con respecto al MDT de: 5.0 que es superior a: 2', (1, 0, 15))
+    assert vista.proyectadas == [(0, 0, 10), (1, 0, 15)]
+
+def test_un_cambio_de_mdt_entre_ejecuciones_no_devuelve_proyecciones_obsoletas(guiones):
+    vista = digi3d.vista_activa = VistaConMdt(10.0)
+    punto = digi3d.Point([(0, 0, 10)], ['A'])
+    vista.append(punto)
+    controles = {'A': [('marcar_error_si_diferencia_z_al_proyectar_mdt_superior_a', 2)]}
+
+    assert guiones.ejecuta_controles_de_calidad(controles) == []
+
+    vista.z_mdt = 20.0
+    resultados = guiones.ejecuta_controles_de_calidad(controles)
+
+    assert [(g, indice) for g, indice, nombre, errores in resultados] == [(punto, 0)]
+    assert guiones.cache_mdt.ejecuciones == 0
+
+def test_mdt_local_por_bloques(guiones, tmp_path):
+    ruta = tmp_path / 'mdt.asc'
+    ruta.write_text('ncols 3\nnrows 2\nxllcorner 0\nyllcorner 0\ncellsize 10\nNODATA_value -9999\n0 10 20\n-9999 30 40\n')
+    guiones.tamano_bloque_zetas = 2
+    # El primer vértice no tiene MDT debajo y el segundo está sobre el MDT. El error está en el tercero, en el segundo bloque
+    linea = digi3d.Line([(5, 5, 0), (15, 15, 10), (20, 10, 0), (25, 15, 20), (25, 5, 0)], ['A'])
+
+    guiones.establece_mdt_local(str(ruta))
+    try:
+        assert guiones.primer_vertice_con_diferencia_z_mdt(linea, lambda diferencia, distancia: diferencia > distancia, 5) == (2, 25.0)
+        assert guiones.primer_vertice_con_diferencia_z_mdt(linea, lambda diferencia, distancia: diferencia > distancia, 40) is None
+        assert [guiones.mdt_local.proyecta(c) for c in linea] == [None, 10.0, 25.0, 20.0, 40.0]
+    finally:
+        guiones.establece_mdt_local(None)
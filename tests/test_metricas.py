@@ -0,0 +1,24 @@
+import digi3d
+
+def test_solo_se_memorizan_el_area_y_el_perimetro(guiones, vista, monkeypatch):
+    calculos = []
+    monkeypatch.setattr(vista.geographic_calculator, 'calculate_area', lambda g: calculos.append(g) or 4.0)
+    g = digi3d.Polygon([(0, 0, 1), (2, 0, 1), (2, 2, 3), (0, 0, 1)], ['A'])
+    vista.append(g)
+
+    assert [guiones.metrica_geometria(g, 'area') for _ in range(3)] == [4.0, 4.0, 4.0]
+    assert calculos == [g]
+
+    # Las métricas baratas no consultan la huella de la geometría
+    monkeypatch.setattr(guiones, 'huella_geometria', None)
+    assert guiones.metrica_geometria(g, 'altura') == 2
+    assert guiones.metrica_geometria(g, 'numero_vertices') == 4
+
+def test_el_area_se_vuelve_a_calcular_al_modificar_la_geometria(guiones, vista, monkeypatch):
+    monkeypatch.setattr(vista.geographic_calculator, 'calculate_area', lambda g: float(len(g)))
+    g = digi3d.Polygon([(0, 0, 0), (2, 0, 0), (2, 2, 0), (0, 0, 0)], ['A'])
+    vista.append(g)
+
+    assert guiones.metrica_geometria(g, 'area') == 4.0
+    g.coords.insert(3, (0, 2, 0))
+    assert guiones.metrica_geometria(g, 'area') == 5.0
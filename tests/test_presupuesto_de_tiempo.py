@@ -0,0 +1,78 @@
+import inspect
+
+import digi3d
+
+def control_lento(geometry, adding_geometry, code_index, mensaje):
+    'Control de calidad de prueba que siempre detecta un error'
+    return digi3d.GeometryError(mensaje)
+
+def test_sin_presupuesto_los_controles_no_se_envuelven(guiones):
+    assert guiones.con_presupuesto_de_tiempo(control_lento) is control_lento
+    assert not hasattr(guiones.si_es_area_debe_ser_adyacente_area, '__wrapped__')
+
+def test_el_control_envuelto_conserva_sus_parametros(guiones):
+    guiones.presupuestos_controles['control_lento'] = 0.5
+    envuelto = guiones.con_presupuesto_de_tiempo(control_lento)
+
+    assert envuelto is not control_lento
+    assert list(inspect.signature(envuelto).parameters) == ['geometry', 'adding_geometry', 'code_index', 'mensaje']
+    assert envuelto.__doc__ == control_lento.__doc__
+
+def test_el_error_de_un_control_aplazado_se_comunica_despues(guiones, vista):
+    guiones.presupuestos_controles['control_lento'] = 0.0
+    envuelto = guiones.con_presupuesto_de_tiempo(control_lento)
+    primera = digi3d.Point([(0, 0, 0)], ['A'])
+    segunda = digi3d.Point([(1, 1, 0)], ['A'])
+    vista.extend([primera, segunda])
+
+    # La primera evaluación supera el presupuesto, de manera que la siguiente se aplaza
+    assert envuelto(primera, True, 0, 'Error') == digi3d.GeometryError('Error')
+    assert envuelto(segunda, True, 0, 'Error') is None
+
+    resultados = guiones.ejecuta_controles_de_calidad({})
+
+    assert resultados == [(segunda, 0, 'control_lento', [digi3d.GeometryError('Error')])]
+    assert not guiones.controles_diferidos
+
+def test_la_ejecucion_desde_el_menu_descarta_la_evaluacion_aplazada(guiones, vista):
+    guiones.presupuestos_controles['control_lento'] = 0.0
+    guiones.duraciones_controles['control_lento'] = 1.0
+    envuelto = guiones.con_presupuesto_de_tiempo(control_lento)
+    punto = digi3d.Point([(0, 0, 0)], ['A'])
+    vista.append(punto)
+
+    assert envuelto(punto, True, 0, 'Error') is None
+    assert envuelto(punto, False, 0, 'Error') == digi3d.GeometryError('Error')
+    assert guiones.recoge_errores_diferidos() == []
+
+def test_las_evaluaciones_aplazadas_se_comunican_en_la_siguiente_llamada_de_digi3d(guiones, vista):
+    guiones.presupuestos_controles['control_lento'] = 0.0
+    guiones.maximo_segundos_aplazado = -1
+    envuelto = guiones.con_presupuesto_de_tiempo(control_lento)
+    primera, segunda, tercera = [digi3d.Point([(i, i, 0)], ['A']) for i in range(3)]
+    vista.extend([primera, segunda, tercera])
+
+    assert envuelto(primera, True, 0, 'Error') == digi3d.GeometryError('Error')
+    assert envuelto(segunda, True, 0, 'Error') is None
+
+    # La evaluación aplazada de la segunda lleva esperando más de maximo_segundos_aplazado: se evalúa aunque no quede presupuesto
+    assert envuelto(tercera, True, 0, 'Error') == [digi3d.GeometryRelationError(segunda, guiones.mensaje_error_diferido.format('control_lento', 1))]
+    assert list(guiones.controles_diferidos) == [(tercera, 0, 'control_lento')]
+
+def test_un_control_aplazado_se_vuelve_a_medir(guiones, vista):
+    guiones.presupuestos_controles['control_lento'] = 0.0
+    guiones.duraciones_controles['control_lento'] = 1.0
+    guiones.maximo_aplazamientos = 2
+    envuelto = guiones.con_presupuesto_de_tiempo(control_lento)
+    puntos = [digi3d.Point([(i, i, 0)], ['A']) for i in range(3)]
+    vista.extend(puntos)
+
+    # Sin presupuesto para evaluar las aplazadas, tras dos aplazamientos el control se vuelve a evaluar al almacenar la geometría
+    assert envuelto(puntos[0], True, 0, 'Error') is None
+    assert envuelto(puntos[1], True, 0, 'Error') is None
+    assert envuelto(puntos[2], True, 0, 'Error') == digi3d.GeometryError('Error')
+
+    # La nueva medida se promedia con la estimación anterior
+    assert guiones.duraciones_controles['control_lento'] < 1.0
+    assert guiones.aplazamientos_controles['control_lento'] == 0
+    assert list(guiones.controles_diferidos) == [(puntos[0], 0, 'control_lento'), (puntos[1], 0, 'control_lento')]
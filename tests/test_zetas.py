@@ -0,0 +1,21 @@
+import operator
+
+import pytest
+
+import digi3d
+
+def test_salto_z_en_los_primeros_vertices_no_convierte_el_resto(guiones):
+    if guiones.np is None:
+        pytest.skip('requiere numpy')
+
+    linea = digi3d.Line([(i, 0, 5 if i == 2 else i) for i in range(100000)], ['A'])
+
+    assert guiones.vertices_con_salto_z(linea, operator.le) == [3]
+    assert len(guiones.zetas_geometria(linea).bloques) == 1
+
+def test_salto_z_entre_bloques(guiones):
+    guiones.tamano_bloque_zetas = 2
+    linea = digi3d.Line([(i, 0, z) for i, z in enumerate([0, 1, 2, 2, 3, 4, 3, 5])], ['A'])
+
+    assert guiones.vertices_con_salto_z(linea, operator.le, todos=True) == [3, 6]
+    assert guiones.vertices_con_z_distinta(linea, 2, todos=True) == [0, 1, 4, 5, 6, 7]